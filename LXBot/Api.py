@@ -1,37 +1,61 @@
 import requests
 import logging
+import time
+from requests.adapters import HTTPAdapter
+from metrics import API_LATENCY, API_FAILURES
 
 logger = logging.getLogger("api")
 
-def call_api(base_url, action, params, token=None):
+# 同步接口共用的 HTTP 会话，复用 keep-alive 连接，避免每次调用都重新握手
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+def post_action(base_url, action, params, token=None):
     """
-    万用Api调用函数，只要LLOB支持就可以用
+    同步Api请求的公共实现，OBApi与GoCQApi中的函数均通过它发送请求
     base_url: Bot API地址
     action: API动作
     params: 请求参数
     token: Bot Token
-    返回值：{message_id}
+    返回值：(是否成功, data)
     """
     # 设置请求头
     headers = {"Authorization": f"Bearer {token}"} if token else {}
     # 构造请求 URL
     url = f"{base_url}/{action}"
-    # 构造请求参数
-    
+
+    start = time.perf_counter()
     try:
         # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
+        response = _session.post(url, params=params, headers=headers)
         # 检查响应状态码
         if response.status_code == 200:
             data = response.json()
             if data.get("status") == "ok":
-                logger.info(f"成功执行操作{action}")
-                return data.get("data")
+                return True, data.get("data")
             else:
-                logger.error(f"API返回错误:{data.get('msg')}")
+                logger.error("API返回错误:%s", data.get('msg'))
         else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
+            logger.error("请求失败，状态码:%s", response.status_code)
     except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
\ No newline at end of file
+        logger.error("请求过程中发生错误:%s", e)
+    finally:
+        API_LATENCY.observe(time.perf_counter() - start, action)
+
+    API_FAILURES.inc(action)
+    return False, None
+
+def call_api(base_url, action, params, token=None):
+    """
+    万用Api调用函数，只要LLOB支持就可以用
+    base_url: Bot API地址
+    action: API动作
+    params: 请求参数
+    token: Bot Token
+    返回值：{message_id}
+    """
+    ok, data = post_action(base_url, action, params, token)
+    if ok:
+        logger.info("成功执行操作%s", action)
+    return data
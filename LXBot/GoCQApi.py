@@ -1,4 +1,4 @@
-import requests
+from Api import post_action
 import logging
 
 #Api操作模块尚未完工，LLOB支持的一部分Api应用面较小
@@ -14,30 +14,14 @@ def send_private_forward_msg(base_url, user_id, messages, token=None):
     token: Bot Token
     返回值：{message_id,forward_id}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/send_private_forward_msg"
     # 构造请求参数
     params = {"user_id": user_id, "message": messages}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"成功发送合并转发消息:{messages}到{user_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "send_private_forward_msg", params, token)
+    if ok:
+        logger.info("成功发送合并转发消息:%s到%s", messages, user_id)
+    return data
 
 def send_group_forward_msg(base_url, group_id, messages, token=None):
     """
@@ -48,30 +32,14 @@ def send_group_forward_msg(base_url, group_id, messages, token=None):
     token: Bot Token
     返回值：{message_id,forward_id}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/send_group_forward_msg"
     # 构造请求参数
     params = {"group_id": group_id, "message": messages}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"成功发送合并转发消息:{messages}到{group_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "send_group_forward_msg", params, token)
+    if ok:
+        logger.info("成功发送合并转发消息:%s到%s", messages, group_id)
+    return data
 
 def get_group_msg_history(base_url, message_seq, group_id, token=None):
     """
@@ -82,28 +50,12 @@ def get_group_msg_history(base_url, message_seq, group_id, token=None):
     token: Bot Token
     返回值：{messages:[{content,sender:{nickname,user_id},time}, ...]}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_group_msg_history"
     # 构造请求参数
     params = {"message_seq": message_seq, "group_id": group_id}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"成功获取群{group_id}消息历史记录")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_group_msg_history", params, token)
+    if ok:
+        logger.info("成功获取群%s消息历史记录", group_id)
+    return data
 
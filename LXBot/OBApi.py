@@ -1,4 +1,4 @@
-import requests
+from Api import post_action
 import logging
 
 logger = logging.getLogger("api")
@@ -13,30 +13,14 @@ def send_private_msg(base_url, user_id, message, auto_escape=False, token=None):
     token: Bot Token
     返回值：{message_id}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/send_private_msg"
     # 构造请求参数
     params = {"user_id": user_id, "message": message, "auto_escape": auto_escape}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"成功发送私聊消息:{message}到{user_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "send_private_msg", params, token)
+    if ok:
+        logger.info("成功发送私聊消息:%s到%s", message, user_id)
+    return data
 
 def send_group_msg(base_url, group_id, message, auto_escape=False, token=None):
     """
@@ -48,30 +32,14 @@ def send_group_msg(base_url, group_id, message, auto_escape=False, token=None):
     token: Bot Token
     返回值：{message_id}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/send_group_msg"
     # 构造请求参数
     params = {"group_id": group_id, "message": message, "auto_escape": auto_escape}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"成功发送群消息:{message}到群{group_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "send_group_msg", params, token)
+    if ok:
+        logger.info("成功发送群消息:%s到群%s", message, group_id)
+    return data
 
 def send_msg(base_url, message_type, user_id=None, group_id=None, message=None, auto_escape=False, token=None):
     """
@@ -87,43 +55,27 @@ def send_msg(base_url, message_type, user_id=None, group_id=None, message=None,
     """
     # 检查消息类型是否有效
     if message_type not in ["private", "group"]:
-        logger.error(f"消息类型错误:{message_type}")
+        logger.error("消息类型错误:%s", message_type)
         return None
     
     # 如果消息类型是私聊，则检查用户ID是否提供
     if message_type == "private" and not user_id:
-        logger.error(f"user_id为空")
+        logger.error("user_id为空")
         return None
     
     # 如果消息类型是群聊，则检查群组ID是否提供
     if message_type == "group" and not group_id:
-        logger.error(f"group_id为空")
+        logger.error("group_id为空")
         return None
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/send_msg"
     # 构造请求参数
     params = {"message_type": message_type, "user_id": user_id, "group_id": group_id, "message": message, "auto_escape": auto_escape}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"成功发送消息:{message}到{group_id or user_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "send_msg", params, token)
+    if ok:
+        logger.info("成功发送消息:%s到%s", message, group_id or user_id)
+    return data
 
 def delete_msg(base_url, message_id, token=None):
     """
@@ -133,30 +85,14 @@ def delete_msg(base_url, message_id, token=None):
     token: Bot Token
     返回值：{}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/delete_msg"
     # 构造请求参数
     params = {"message_id": message_id}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"撤回消息成功:{message_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "delete_msg", params, token)
+    if ok:
+        logger.info("撤回消息成功:%s", message_id)
+    return data
 
 def get_msg(base_url, message_id, token=None):
     """
@@ -167,30 +103,14 @@ def get_msg(base_url, message_id, token=None):
     返回值：{time, message_type, message_id, real_id, sender: {user_id, nickname, sex, age}, message}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_msg"
     # 构造请求参数
     params = {"message_id": message_id}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取消息成功:{message_id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_msg", params, token)
+    if ok:
+        logger.info("获取消息成功:%s", message_id)
+    return data
 
 def get_forward_msg(base_url, id, token=None):
     """
@@ -202,30 +122,14 @@ def get_forward_msg(base_url, id, token=None):
     {messages: [{type, data: {}}, ...]}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_forward_msg"
     # 构造请求参数
     params = {"id": id}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取合并转发内容成功:{id}")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_forward_msg", params, token)
+    if ok:
+        logger.info("获取合并转发内容成功:%s", id)
+    return data
 
 def send_like(base_url, user_id, times=1, token=None):
     """
@@ -237,30 +141,14 @@ def send_like(base_url, user_id, times=1, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/send_like"
     # 构造请求参数
     params = {"user_id": user_id, "times": times}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"给{user_id}点赞{times}次成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "send_like", params, token)
+    if ok:
+        logger.info("给%s点赞%s次成功", user_id, times)
+    return data
 
 def set_group_kick(base_url, group_id, user_id, reject_add_request=False, token=None):
     """
@@ -273,30 +161,14 @@ def set_group_kick(base_url, group_id, user_id, reject_add_request=False, token=
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_kick"
     # 构造请求参数
     params = {"group_id": group_id, "user_id": user_id, "reject_add_request": reject_add_request}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}踢出{user_id}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_kick", params, token)
+    if ok:
+        logger.info("群%s踢出%s成功", group_id, user_id)
+    return data
 
 def set_group_ban(base_url, group_id, user_id, duration=30*60, token=None):
     """
@@ -309,30 +181,14 @@ def set_group_ban(base_url, group_id, user_id, duration=30*60, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_ban"
     # 构造请求参数
     params = {"group_id": group_id, "user_id": user_id, "duration": duration}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}禁言{user_id}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_ban", params, token)
+    if ok:
+        logger.info("群%s禁言%s成功", group_id, user_id)
+    return data
 
 def set_group_anonymous_ban(base_url, group_id, anonymous_flag, duration=30*60, token=None):
     """
@@ -346,30 +202,14 @@ def set_group_anonymous_ban(base_url, group_id, anonymous_flag, duration=30*60,
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_anonymous_ban"
     # 构造请求参数
     params = {"group_id": group_id, "flag": anonymous_flag, "duration": duration}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200: 
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}匿名用户{anonymous_flag}禁言成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_anonymous_ban", params, token)
+    if ok:
+        logger.info("群%s匿名用户%s禁言成功", group_id, anonymous_flag)
+    return data
 
 def set_group_whole_ban(base_url, group_id, enable=True, token=None):
     """
@@ -381,30 +221,14 @@ def set_group_whole_ban(base_url, group_id, enable=True, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_whole_ban"
     # 构造请求参数
     params = {"group_id": group_id, "enable": enable}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}全员禁言{enable}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_whole_ban", params, token)
+    if ok:
+        logger.info("群%s全员禁言%s成功", group_id, enable)
+    return data
 
 def set_group_admin(base_url, group_id, user_id, enable=True, token=None):
     """
@@ -417,30 +241,14 @@ def set_group_admin(base_url, group_id, user_id, enable=True, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_admin"
     # 构造请求参数
     params = {"group_id": group_id, "user_id": user_id, "enable": enable}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}设置{user_id}为管理员{enable}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_admin", params, token)
+    if ok:
+        logger.info("群%s设置%s为管理员%s成功", group_id, user_id, enable)
+    return data
 
 def set_group_anonymous(base_url, group_id, enable=True, token=None):
     """
@@ -453,30 +261,14 @@ def set_group_anonymous(base_url, group_id, enable=True, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_anonymous"
     # 构造请求参数
     params = {"group_id": group_id, "enable": enable}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}允许匿名{enable}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_anonymous", params, token)
+    if ok:
+        logger.info("群%s允许匿名%s成功", group_id, enable)
+    return data
 
 def set_group_card(base_url, group_id, user_id, card=None, token=None):
     """
@@ -489,30 +281,14 @@ def set_group_card(base_url, group_id, user_id, card=None, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_card"
     # 构造请求参数
     params = {"group_id": group_id, "user_id": user_id, "card": card}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}设置{user_id}的群名片成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_card", params, token)
+    if ok:
+        logger.info("群%s设置%s的群名片成功", group_id, user_id)
+    return data
 
 def set_group_name(base_url, group_id, group_name, token=None):
     """
@@ -524,30 +300,14 @@ def set_group_name(base_url, group_id, group_name, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_name"
     # 构造请求参数
     params = {"group_id": group_id, "group_name": group_name}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}设置名称{group_name}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_name", params, token)
+    if ok:
+        logger.info("群%s设置名称%s成功", group_id, group_name)
+    return data
 
 def set_group_leave(base_url, group_id, is_dismiss=False, token=None):
     """
@@ -559,30 +319,14 @@ def set_group_leave(base_url, group_id, is_dismiss=False, token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_leave"
     # 构造请求参数
     params = {"group_id": group_id, "is_dismiss": is_dismiss}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}退出成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_leave", params, token)
+    if ok:
+        logger.info("群%s退出成功", group_id)
+    return data
 
 def set_group_special_title(base_url, group_id, user_id, special_title, duration=-1, token=None):
     """
@@ -596,30 +340,14 @@ def set_group_special_title(base_url, group_id, user_id, special_title, duration
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_special_title"
     # 构造请求参数
     params = {"group_id": group_id, "user_id": user_id, "special_title": special_title, "duration": duration}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"群{group_id}设置{user_id}的专属头衔为\"{special_title}\"成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_special_title", params, token)
+    if ok:
+        logger.info("群%s设置%s的专属头衔为\"%s\"成功", group_id, user_id, special_title)
+    return data
 
 def set_friend_add_request(base_url, flag, approve=True, reason="", token=None):
     """
@@ -632,30 +360,14 @@ def set_friend_add_request(base_url, flag, approve=True, reason="", token=None):
     返回值：{}
     """
 
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_friend_add_request"
     # 构造请求参数
     params = {"flag": flag, "approve": approve, "reason": reason}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"处理好友请求{flag}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_friend_add_request", params, token)
+    if ok:
+        logger.info("处理好友请求%s成功", flag)
+    return data
 def set_group_add_request(base_url, flag, sub_type, approve=True, reason="", token=None):
     """
     处理加群请求/邀请
@@ -669,32 +381,16 @@ def set_group_add_request(base_url, flag, sub_type, approve=True, reason="", tok
     """
     # 检查请求类型
     if sub_type not in ["add", "invite"]:
-        logger.error(f"请求类型{sub_type}错误，请使用\"add\"或\"invite\"")
+        logger.error("请求类型%s错误，请使用\"add\"或\"invite\"", sub_type)
         return None
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_group_add_request"
     # 构造请求参数
     params = {"flag": flag, "sub_type": sub_type, "approve": approve, "reason": reason}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"处理加群请求{flag}成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_group_add_request", params, token)
+    if ok:
+        logger.info("处理加群请求%s成功", flag)
+    return data
 
 def get_login_info(base_url, token=None):
     """
@@ -703,30 +399,14 @@ def get_login_info(base_url, token=None):
     token: Bot Token
     返回值：{user_id, nickname}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_login_info"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取登录信息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_login_info", params, token)
+    if ok:
+        logger.info("获取登录信息成功")
+    return data
 
 def get_stranger_info(base_url, user_id, no_cache=False, token=None):
     """
@@ -737,30 +417,14 @@ def get_stranger_info(base_url, user_id, no_cache=False, token=None):
     token: Bot Token
     返回值：{user_id, nickname, sex, age}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_stranger_info"
     # 构造请求参数
     params = {"user_id": user_id, "no_cache": no_cache}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取陌生人{user_id}信息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_stranger_info", params, token)
+    if ok:
+        logger.info("获取陌生人%s信息成功", user_id)
+    return data
 
 def get_friend_list(base_url, token=None):
     """
@@ -769,30 +433,14 @@ def get_friend_list(base_url, token=None):
     token: Bot Token
     返回值：[{user_id, nickname, remark}, ...]
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_friend_list"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取好友列表成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_friend_list", params, token)
+    if ok:
+        logger.info("获取好友列表成功")
+    return data
 
 def get_group_info(base_url, group_id, no_cache=False, token=None):
     """
@@ -803,30 +451,14 @@ def get_group_info(base_url, group_id, no_cache=False, token=None):
     token: Bot Token
     返回值：{group_id, group_name, member_count, max_member_count}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_group_info"
     # 构造请求参数
     params = {"group_id": group_id, "no_cache": no_cache}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取群{group_id}信息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_group_info", params, token)
+    if ok:
+        logger.info("获取群%s信息成功", group_id)
+    return data
 
 def get_group_list(base_url, token=None):
     """
@@ -835,30 +467,14 @@ def get_group_list(base_url, token=None):
     token: Bot Token
     返回值：[{group_id, group_name, member_count, max_member_count}, ...]
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_group_list"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取群列表成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_group_list", params, token)
+    if ok:
+        logger.info("获取群列表成功")
+    return data
 
 def get_group_member_info(base_url, group_id, user_id, no_cache=False, token=None):
     """
@@ -870,30 +486,14 @@ def get_group_member_info(base_url, group_id, user_id, no_cache=False, token=Non
     token: Bot Token
     返回值：{group_id, user_id, nickname, card, sex, age, area, join_time, last_sent_time, level, role, unfriendly, title ,title_expire_time, card_changeable}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_group_member_info"
     # 构造请求参数
     params = {"group_id": group_id, "user_id": user_id, "no_cache": no_cache}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取群{group_id}成员{user_id}信息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_group_member_info", params, token)
+    if ok:
+        logger.info("获取群%s成员%s信息成功", group_id, user_id)
+    return data
 
 def get_group_member_list(base_url, group_id, token=None):
     """
@@ -903,30 +503,14 @@ def get_group_member_list(base_url, group_id, token=None):
     token: Bot Token
     返回值：[{user_id, nickname, card, sex, age, area, join_time, last_sent_time, level, role, unfriendly, title ,title_expire_time, card_changeable}, ...]
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_group_member_list"
     # 构造请求参数
     params = {"group_id": group_id}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取群{group_id}成员列表成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_group_member_list", params, token)
+    if ok:
+        logger.info("获取群%s成员列表成功", group_id)
+    return data
 
 def get_group_honor_info(base_url, group_id, type, token=None):
     """
@@ -937,30 +521,14 @@ def get_group_honor_info(base_url, group_id, type, token=None):
     token: Bot Token
     返回值：{group_id, current_talkative: {user_id, nickname, avatar, day_count}, talkative_list: [{user_id, nickname, avatar, description}, ...], performer_list: [{user_id, nickname, avatar, description}, ...], legend_list: [{user_id, nickname, avatar, description}, ...], strong_newbie_list: [{user_id, nickname, avatar, description}, ...], emotion_list: [{user_id, nickname, avatar, description}, ...]}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL    
-    url = f"{base_url}/get_group_honor_info"
     # 构造请求参数
     params = {"group_id": group_id, "type": type}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取群{group_id}荣誉信息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_group_honor_info", params, token)
+    if ok:
+        logger.info("获取群%s荣誉信息成功", group_id)
+    return data
 
 def get_cookies(base_url, domain, token=None):
     """
@@ -970,30 +538,14 @@ def get_cookies(base_url, domain, token=None):
     token: Bot Token
     返回值：Cookies
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_cookies"
     # 构造请求参数
     params = {"domain": domain}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取Cookies成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_cookies", params, token)
+    if ok:
+        logger.info("获取Cookies成功")
+    return data
 
 def get_csrf_token(base_url, token=None):
     """
@@ -1003,30 +555,14 @@ def get_csrf_token(base_url, token=None):
     token: Bot Token
     返回值：CSRF Token
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_csrf_token"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取CSRF Token成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_csrf_token", params, token)
+    if ok:
+        logger.info("获取CSRF Token成功")
+    return data
 
 def get_credentials(base_url, token=None):
     """
@@ -1036,30 +572,14 @@ def get_credentials(base_url, token=None):
     token: Bot Token
     返回值：{cookies, csrf_token}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_credentials"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取凭证成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_credentials", params, token)
+    if ok:
+        logger.info("获取凭证成功")
+    return data
 
 def get_record(base_url, file, out_format, token=None):
     """
@@ -1070,30 +590,14 @@ def get_record(base_url, file, out_format, token=None):
     token: Bot Token
     返回值：{file}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_record"
     # 构造请求参数
     params = {"file": file, "out_format": out_format}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取语音消息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_record", params, token)
+    if ok:
+        logger.info("获取语音消息成功")
+    return data
 
 def get_image(base_url, file, token=None):
     """
@@ -1103,30 +607,14 @@ def get_image(base_url, file, token=None):
     token: Bot Token
     返回值：{file}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_image"
     # 构造请求参数
     params = {"file": file}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取图片成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_image", params, token)
+    if ok:
+        logger.info("获取图片成功")
+    return data
 
 def can_send_image(base_url, token=None):
     """
@@ -1135,29 +623,12 @@ def can_send_image(base_url, token=None):
     token: Bot Token
     返回值：{yes}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/can_send_image"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "can_send_image", params, token)
+    return data
 
 def can_send_record(base_url, token=None):
     """
@@ -1166,29 +637,12 @@ def can_send_record(base_url, token=None):
     token: Bot Token
     返回值：{yes}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/can_send_record"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "can_send_record", params, token)
+    return data
 
 def get_status(base_url, token=None):
     """
@@ -1197,29 +651,14 @@ def get_status(base_url, token=None):
     token: Bot Token
     返回值：{online, good,...}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_status"
     # 构造请求参数
     params = {}
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取插件运行状态成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_status", params, token)
+    if ok:
+        logger.info("获取插件运行状态成功")
+    return data
 
 def get_version_info(base_url, token=None):
     """
@@ -1228,30 +667,14 @@ def get_version_info(base_url, token=None):
     token: Bot Token
     返回值：{app_name, app_version, protocol_version,...}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/get_version_info"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"获取版本信息成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "get_version_info", params, token)
+    if ok:
+        logger.info("获取版本信息成功")
+    return data
 
 def set_restart(base_url, delay, token=None):
     """
@@ -1260,30 +683,14 @@ def set_restart(base_url, delay, token=None):
     token: Bot Token
     返回值：{}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/set_restart"
     # 构造请求参数
     params = {"delay": delay}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"重启API成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "set_restart", params, token)
+    if ok:
+        logger.info("重启API成功")
+    return data
 
 def clean_cache(base_url, token=None):
     """
@@ -1292,28 +699,12 @@ def clean_cache(base_url, token=None):
     token: Bot Token
     返回值：{}
     """
-    # 设置请求头
-    headers = {"Authorization": f"Bearer {token}"} if token else {}
-    # 构造请求 URL
-    url = f"{base_url}/clean_cache"
     # 构造请求参数
     params = {}
-    
-    try:
-        # 发送 HTTP POST 请求
-        response = requests.post(url, params=params, headers=headers)
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "ok":
-                logger.info(f"清理缓存成功")
-                return data.get("data")
-            else:
-                logger.error(f"API返回错误:{data.get('msg')}")
-        else:
-            logger.error(f"请求失败，状态码:{response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"请求过程中发生错误:{e}")
-    
-    return None 
+
+    # 通过共享会话发送 HTTP POST 请求
+    ok, data = post_action(base_url, "clean_cache", params, token)
+    if ok:
+        logger.info("清理缓存成功")
+    return data
 
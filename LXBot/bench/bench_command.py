@@ -0,0 +1,87 @@
+"""
+命令匹配基准测试
+比较编译后的命令表（前缀树 + Aho-Corasick + 正则）与“每个插件各自扫描一遍消息”的逐个匹配方式，
+在注册的触发器数量增长时每条消息的匹配耗时；每组命令与关键词另外带有十分之一数量的正则触发器
+
+用法（在 LXBot 目录下）: python bench/bench_command.py [--messages 2000]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command import CommandRegistry, Handler
+
+SIZES = (10, 100, 1000, 5000)
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+def build_regexes(rng, count):
+    # 形如 "单词 + 数字" 的常见正则触发器
+    return [rf"{random_word(rng, rng.randint(3, 6))}\w*\d+" for _ in range(count)]
+
+def build_messages(rng, commands, keywords, regexes, count):
+    messages = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            messages.append(f"/{rng.choice(commands)} {random_word(rng, 8)}")
+        elif kind == 1:
+            messages.append(f"{random_word(rng, 20)} {rng.choice(keywords)} {random_word(rng, 20)}")
+        elif kind == 2:
+            prefix = rng.choice(regexes).split("\\", 1)[0]
+            messages.append(f"{random_word(rng, 10)} {prefix}{rng.randint(0, 999)} {random_word(rng, 10)}")
+        else:
+            # 大部分消息不命中任何触发器
+            messages.append(" ".join(random_word(rng, rng.randint(2, 8)) for _ in range(8)))
+    return messages
+
+def naive_match(commands, keywords, patterns, text):
+    # 旧方式：每个插件各自用字符串操作检查一遍消息
+    results = []
+    for name in commands:
+        trigger = "/" + name
+        if text.startswith(trigger) and (len(text) == len(trigger) or text[len(trigger)].isspace()):
+            results.append(name)
+    for keyword in keywords:
+        if keyword in text:
+            results.append(keyword)
+    for pattern in patterns:
+        if pattern.search(text):
+            results.append(pattern.pattern)
+    return results
+
+def run(message_count):
+    rng = random.Random(42)
+    print(f"{'triggers':>10} {'compiled us/msg':>16} {'naive us/msg':>14} {'speedup':>9}")
+    for size in SIZES:
+        commands = list({random_word(rng, rng.randint(3, 10)) for _ in range(size)})
+        keywords = list({random_word(rng, rng.randint(4, 8)) for _ in range(size)})
+        regexes = build_regexes(rng, max(1, size // 10))
+        patterns = [re.compile(regex) for regex in regexes]
+        registry = CommandRegistry(("/",))
+        handler = Handler("bench", None)
+        for name in commands:
+            registry.add(("command", name, (), None), handler)
+        registry.add(("keyword", tuple(keywords)), handler)
+        for regex in regexes:
+            registry.add(("regex", regex, 0), handler)
+        registry.compile()
+        messages = build_messages(rng, commands, keywords, regexes, message_count)
+
+        compiled = min(timeit.repeat(lambda: [registry.match(m) for m in messages], number=1, repeat=3))
+        naive = min(timeit.repeat(lambda: [naive_match(commands, keywords, patterns, m) for m in messages], number=1, repeat=3))
+        compiled_us = compiled / message_count * 1e6
+        naive_us = naive / message_count * 1e6
+        print(f"{size * 2 + len(regexes):>10} {compiled_us:>16.2f} {naive_us:>14.2f} {naive_us / compiled_us:>8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="命令匹配基准测试")
+    parser.add_argument("--messages", type=int, default=2000, help="每轮匹配的消息数量")
+    run(parser.parse_args().messages)
@@ -0,0 +1,156 @@
+"""
+端到端基准测试
+在子进程中启动 fake_onebot 作为 OneBot 实现，用真实的 Bot（含 plugins 目录下的插件）连接它，
+报告事件吞吐、分发延迟分位数、Api 调用速率与内存占用，便于比较不同版本
+
+用法（在 LXBot 目录下）: python bench/bench_e2e.py [--events 10000] [--rate 0] [--api-transport http]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import Bot
+from fake_onebot import add_traffic_arguments
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def peak_rss_mb():
+    """进程的峰值常驻内存(MB)，不支持的平台返回None"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 下单位为 KB，macOS 下为字节
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+def write_config(args):
+    """在默认配置的基础上生成测试用的配置文件"""
+    config = json.load(open('config/config.json', 'r', encoding='utf-8'))
+    url = f"127.0.0.1:{args.port}"
+    config.update({
+        "ws_url": f"ws://{url}",
+        "http_url": f"http://{url}",
+        "token": "",
+        "ws_enabled": True,
+        "api_transport": args.api_transport,
+        "report_enabled": False,
+        "reverse_ws_enabled": False,
+        "metrics_enabled": False,
+        "send_start_message": False,
+        "dispatch_workers": args.workers,
+        "dispatch_queue_size": max(args.events, 1000),
+        # 去掉发送限速，测量的是框架本身的开销
+        "send_rate": 1e6, "send_burst": 1e6, "send_target_rate": 1e6, "send_target_burst": 1e6,
+    })
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    return path
+
+async def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+async def run(args):
+    fake_args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_onebot.py")]
+    for name in ("port", "events", "rate", "groups", "users", "private_ratio", "notice_ratio", "command_ratio", "seed"):
+        fake_args += ["--" + name.replace("_", "-"), str(getattr(args, name))]
+    server = subprocess.Popen(fake_args, stdout=subprocess.DEVNULL)
+    config_path = write_config(args)
+    try:
+        await wait_for_port(args.port)
+        bot = Bot(config_path=config_path)
+
+        # 记录每个事件从发出到全部插件处理完毕的时间
+        latencies = []
+        handler = bot.dispatcher.handler
+        first_sent = None
+        last_done = None
+
+        async def timed_handler(event):
+            nonlocal first_sent, last_done
+            await handler(event)
+            sent = event.get('_bench_sent')
+            if sent is not None:
+                last_done = time.monotonic()
+                first_sent = sent if first_sent is None else min(first_sent, sent)
+                latencies.append(last_done - sent)
+
+        bot.dispatcher.handler = timed_handler
+        task = asyncio.create_task(bot.start())
+        deadline = time.monotonic() + args.timeout
+        while bot.dispatcher.processed + bot.dispatcher.dropped < args.events:
+            if task.done() or time.monotonic() > deadline:
+                break
+            await asyncio.sleep(0.05)
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{args.port}/_bench/stats") as response:
+                stats = await response.json()
+        # 等待结束前 Bot 已经退出说明管线出了问题，取消前先取出异常
+        failure = task.exception() if task.done() and not task.cancelled() else None
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(config_path)
+
+    latencies.sort()
+    elapsed = (last_done - first_sent) if latencies else 0
+    api_total = sum(stats["api_calls"].values())
+    rss = peak_rss_mb()
+    print(f"事件: 发出 {stats['events_sent']}，处理 {bot.dispatcher.processed}，丢弃 {bot.dispatcher.dropped}")
+    print(f"吞吐: {len(latencies) / elapsed if elapsed else 0:10.1f} events/s")
+    print("分发延迟: p50 {:.2f}ms  p90 {:.2f}ms  p99 {:.2f}ms  max {:.2f}ms".format(
+        *(percentile(latencies, q) * 1000 for q in (0.5, 0.9, 0.99, 1.0))))
+    print(f"Api调用: {api_total} 次，{api_total / stats['api_seconds'] if stats['api_seconds'] else 0:.1f} calls/s")
+    for action, count in sorted(stats["api_calls"].items(), key=lambda item: -item[1]):
+        print(f"  {action:<30} {count}")
+    print(f"峰值内存: {rss:.1f} MB" if rss is not None else "峰值内存: 当前平台不支持统计")
+
+    # 没有处理完全部事件时结果没有意义，以非零状态退出，避免被当作有效的测量
+    if failure is not None:
+        print("Bot 异常退出:", file=sys.stderr)
+        traceback.print_exception(failure)
+        return 1
+    # 统计在 Bot 停止前读取，发出数可能还少于已处理数，以要求的事件数为准
+    expected = max(args.events, stats['events_sent'], 1)
+    if bot.dispatcher.processed < expected:
+        print(f"只处理了 {bot.dispatcher.processed}/{expected} 个事件，测量结果无效", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="端到端基准测试")
+    add_traffic_arguments(parser)
+    parser.add_argument("--api-transport", choices=("http", "ws"), default="http", help="Api调用方式")
+    parser.add_argument("--workers", type=int, default=8, help="事件分发的工作协程数")
+    parser.add_argument("--timeout", type=float, default=120, help="最长等待时间（秒）")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,82 @@
+"""
+事件解析基准测试
+比较标准库 json.loads 得到 dict 的旧路径，与快速解析库加事件对象的新路径，
+在“解析 + 分发给若干插件读取常用字段”时每个事件的耗时
+
+用法（在 LXBot 目录下）: python bench/bench_event.py [--events 20000] [--plugins 10]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event
+
+GROUP_MESSAGE = {
+    "self_id": 10001, "user_id": 20002, "time": 1700000000, "message_id": 123456, "message_seq": 123456,
+    "real_id": 123456, "message_type": "group", "sub_type": "normal",
+    "sender": {"user_id": 20002, "nickname": "测试用户", "card": "群名片", "role": "member"},
+    "raw_message": "[CQ:reply,id=123455]/roll 2d6 今天运气怎么样",
+    "font": 14, "message_format": "array", "post_type": "message", "group_id": 30003,
+    "message": [
+        {"type": "reply", "data": {"id": "123455"}},
+        {"type": "text", "data": {"text": "/roll 2d6 今天运气怎么样"}},
+    ],
+}
+
+def old_plugin(message):
+    # 旧插件的写法：层层 .get() 取字段
+    if message.get('post_type') == 'message' and message.get('message_type') == 'group':
+        return message.get('sender').get('user_id'), message.get('group_id'), message.get('raw_message')
+
+def new_plugin(message):
+    # 新写法：直接以属性读取同样的字段
+    if message.post_type == 'message' and message.message_type == 'group':
+        return message.user_id, message.group_id, message.raw_message
+
+def run(count, plugins):
+    raw = json.dumps(GROUP_MESSAGE, ensure_ascii=False).encode()
+    frames = [raw] * count
+    # 同一条消息以CQ码字符串上报，只有这种格式的 segments 会推迟到第一次访问时解析
+    cq_raw = json.dumps(dict(GROUP_MESSAGE, message=GROUP_MESSAGE["raw_message"], message_format="string"),
+                        ensure_ascii=False).encode()
+    cq_frames = [cq_raw] * count
+
+    def old_path():
+        for frame in frames:
+            data = json.loads(frame)
+            for _ in range(plugins):
+                old_plugin(data)
+
+    def new_path():
+        for frame in frames:
+            data = event.decode_event(frame)
+            for _ in range(plugins):
+                new_plugin(data)
+
+    def first_access(frames):
+        for frame in frames:
+            event.decode_event(frame).plain_text
+
+    cases = {
+        "json.loads": lambda: [json.loads(f) for f in frames],
+        f"decode_event ({event.DECODER})": lambda: [event.decode_event(f) for f in frames],
+        f"json + dict, {plugins} plugins": old_path,
+        f"{event.DECODER} + Event, {plugins} plugins": new_path,
+        f"{event.DECODER} + Event, plain_text (array)": lambda: first_access(frames),
+        f"{event.DECODER} + Event, plain_text (CQ)": lambda: first_access(cq_frames),
+    }
+    for name, case in cases.items():
+        case()  # 预热
+        seconds = min(timeit.repeat(case, number=1, repeat=5))
+        print(f"{name:<40} {seconds / count * 1e6:8.2f} us/event")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="事件解析基准测试")
+    parser.add_argument("--events", type=int, default=20000, help="解析的事件数量")
+    parser.add_argument("--plugins", type=int, default=10, help="每个事件分发给的插件数量")
+    args = parser.parse_args()
+    run(args.events, args.plugins)
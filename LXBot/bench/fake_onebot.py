@@ -0,0 +1,209 @@
+"""
+用于基准测试的本地 OneBot 实现
+提供正向 WebSocket 事件流、HTTP Api 与 WebSocket Api，按配置生成合成流量，
+并统计收到的 Api 调用；GET /_bench/stats 返回统计结果
+
+单独运行（在 LXBot 目录下）: python bench/fake_onebot.py [--port 16700] [--events 10000] [--rate 0]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from aiohttp import web, WSMsgType
+
+SELF_ID = 10001
+
+class SyntheticTraffic:
+    """
+    合成事件流
+    groups / users: 参与的群与用户数量
+    private_ratio: 私聊消息占消息的比例
+    notice_ratio: 通知事件占全部事件的比例
+    command_ratio: 以命令前缀开头的消息占消息的比例
+    """
+
+    TEXTS = [
+        "今天天气不错",
+        "[CQ:at,qq={user}] 在吗",
+        "[CQ:face,id=178]哈哈哈哈",
+        "[CQ:reply,id={message_id}]收到",
+        "[CQ:image,file=abc.image,url=https://example.com/a.jpg]",
+        "这是一条比较长的消息，" * 8,
+    ]
+    COMMANDS = ["/help", "/roll 2d6", "/metrics", "/echo 你好"]
+
+    def __init__(self, groups=50, users=500, private_ratio=0.2, notice_ratio=0.05, command_ratio=0.1, seed=0):
+        self.groups = [30000 + i for i in range(groups)]
+        self.users = [20000 + i for i in range(users)]
+        self.private_ratio = private_ratio
+        self.notice_ratio = notice_ratio
+        self.command_ratio = command_ratio
+        self.random = random.Random(seed)
+        self.message_id = 0
+
+    def next_event(self):
+        rnd = self.random
+        self.message_id += 1
+        user_id = rnd.choice(self.users)
+        group_id = rnd.choice(self.groups)
+        base = {"time": int(time.time()), "self_id": SELF_ID}
+        if rnd.random() < self.notice_ratio:
+            notice_type = rnd.choice(("group_increase", "group_decrease", "group_admin", "group_recall", "notify"))
+            return dict(base, post_type="notice", notice_type=notice_type, sub_type="approve",
+                        group_id=group_id, user_id=user_id, operator_id=user_id, message_id=self.message_id)
+        if rnd.random() < self.command_ratio:
+            raw = rnd.choice(self.COMMANDS)
+        else:
+            raw = rnd.choice(self.TEXTS).format(user=rnd.choice(self.users), message_id=self.message_id - 1)
+        event = dict(base, post_type="message", message_id=self.message_id, user_id=user_id, raw_message=raw,
+                     message=raw, font=14, sender={"user_id": user_id, "nickname": f"用户{user_id}", "role": "member"})
+        if rnd.random() < self.private_ratio:
+            event.update(message_type="private", sub_type="friend")
+        else:
+            event.update(message_type="group", sub_type="normal", group_id=group_id)
+        return event
+
+class FakeOneBot:
+    """
+    本地 OneBot 实现
+    port: 监听端口，WebSocket 事件流在 /，HTTP Api 在 /<action>
+    events: WebSocket 连接后推送的事件数量
+    rate: 每秒推送的事件数，0 表示尽快推送
+    heartbeat_interval: 心跳间隔（秒）
+    """
+
+    def __init__(self, traffic, port=16700, events=10000, rate=0, heartbeat_interval=5.0):
+        self.traffic = traffic
+        self.port = port
+        self.events = events
+        self.rate = rate
+        self.heartbeat_interval = heartbeat_interval
+        self.api_calls = {}  # 动作 -> 调用次数
+        self.api_first = None
+        self.api_last = None
+        self.sent = 0
+        self.send_started = None
+        self.send_finished = None
+        self.app = web.Application()
+        self.app.router.add_get("/", self.handle_ws)
+        self.app.router.add_get("/_bench/stats", self.handle_stats)
+        self.app.router.add_post("/{action}", self.handle_http_api)
+        self._runner = None
+        self._streaming = False
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def response_data(self, action):
+        """记录一次Api调用并返回对应的 data"""
+        now = time.monotonic()
+        if self.api_first is None:
+            self.api_first = now
+        self.api_last = now
+        self.api_calls[action] = self.api_calls.get(action, 0) + 1
+        if action == "get_login_info":
+            return {"user_id": SELF_ID, "nickname": "FakeBot"}
+        if action == "can_send_record":
+            return {"yes": True}
+        if action.startswith("send_"):
+            return {"message_id": random.randint(1, 2 ** 31)}
+        if action.endswith("_list"):
+            return []
+        return {}
+
+    async def handle_http_api(self, request):
+        action = request.match_info["action"]
+        return web.json_response({"status": "ok", "retcode": 0, "data": self.response_data(action)})
+
+    async def handle_stats(self, request):
+        return web.json_response({
+            "events_sent": self.sent,
+            "send_seconds": (self.send_finished or time.monotonic()) - self.send_started if self.send_started else 0,
+            "api_calls": self.api_calls,
+            "api_seconds": (self.api_last - self.api_first) if self.api_first is not None else 0,
+        })
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"time": int(time.time()), "self_id": SELF_ID, "post_type": "meta_event",
+                                      "meta_event_type": "lifecycle", "sub_type": "connect"}))
+        tasks = [asyncio.create_task(self.heartbeat(ws))]
+        if not self._streaming:
+            # 只向第一个连接推送合成流量
+            self._streaming = True
+            tasks.append(asyncio.create_task(self.stream(ws)))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                # 通过 WebSocket 发来的Api调用，按 echo 原样返回
+                data = json.loads(msg.data)
+                await ws.send_str(json.dumps({"status": "ok", "retcode": 0, "echo": data.get("echo"),
+                                              "data": self.response_data(data.get("action", ""))}))
+        finally:
+            for task in tasks:
+                task.cancel()
+        return ws
+
+    async def heartbeat(self, ws):
+        while not ws.closed:
+            await ws.send_str(json.dumps({"time": int(time.time()), "self_id": SELF_ID, "post_type": "meta_event",
+                                          "meta_event_type": "heartbeat", "interval": int(self.heartbeat_interval * 1000),
+                                          "status": {"online": True, "good": True}}))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def stream(self, ws):
+        # 等待 Bot 完成启动时的Api调用
+        await asyncio.sleep(0.5)
+        interval = 1 / self.rate if self.rate else 0
+        self.send_started = start = time.monotonic()
+        for index in range(self.events):
+            if interval:
+                delay = start + index * interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            event = self.traffic.next_event()
+            # 发送时刻，用于计算端到端的分发延迟（CLOCK_MONOTONIC 在进程间一致）
+            event["_bench_sent"] = time.monotonic()
+            await ws.send_str(json.dumps(event, ensure_ascii=False))
+            self.sent += 1
+            if not interval and index % 100 == 0:
+                # 尽快推送时也让出事件循环，以便回应Api调用
+                await asyncio.sleep(0)
+        self.send_finished = time.monotonic()
+
+async def serve(args):
+    traffic = SyntheticTraffic(groups=args.groups, users=args.users, private_ratio=args.private_ratio,
+                               notice_ratio=args.notice_ratio, command_ratio=args.command_ratio, seed=args.seed)
+    server = FakeOneBot(traffic, port=args.port, events=args.events, rate=args.rate)
+    await server.start()
+    print(f"Fake OneBot 已启动: ws://127.0.0.1:{args.port}  http://127.0.0.1:{args.port}", flush=True)
+    await asyncio.Event().wait()
+
+def add_traffic_arguments(parser):
+    parser.add_argument("--port", type=int, default=16700, help="监听端口")
+    parser.add_argument("--events", type=int, default=10000, help="推送的事件数量")
+    parser.add_argument("--rate", type=float, default=0, help="每秒推送的事件数，0 表示尽快推送")
+    parser.add_argument("--groups", type=int, default=50, help="群数量")
+    parser.add_argument("--users", type=int, default=500, help="用户数量")
+    parser.add_argument("--private-ratio", type=float, default=0.2, help="私聊消息比例")
+    parser.add_argument("--notice-ratio", type=float, default=0.05, help="通知事件比例")
+    parser.add_argument("--command-ratio", type=float, default=0.1, help="命令消息比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基准测试用的本地 OneBot 实现")
+    add_traffic_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
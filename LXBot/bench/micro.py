@@ -0,0 +1,166 @@
+"""
+热点路径微基准测试
+测量事件解析、execute_on_message 分发给 1/10/100 个插件、ColoredFormatter 格式化日志、
+构造并序列化 OBApi 请求的单次耗时，并与保存的基线比较，超出容差时以非零状态退出
+每项取 --repeat 轮中最快的一轮，分发基准波动较大，使用 TOLERANCES 中更宽的容差
+
+基线与机器相关，换机器或确认性能变化后用 --update 重新生成
+用法（在 LXBot 目录下）: python bench/micro.py [--tolerance 0.25] [--repeat 15] [--update] [--only fanout]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import requests
+import Api
+import event
+from bot import Bot
+from guard import stop_sweeper
+from log import ColoredFormatter
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+GROUP_MESSAGE = {
+    "self_id": 10001, "user_id": 20002, "time": 1700000000, "message_id": 123456, "message_seq": 123456,
+    "real_id": 123456, "message_type": "group", "sub_type": "normal",
+    "sender": {"user_id": 20002, "nickname": "测试用户", "card": "群名片", "role": "member"},
+    "raw_message": "[CQ:at,qq=10001] 今天天气怎么样", "font": 14, "message_format": "array",
+    "post_type": "message", "group_id": 30003,
+    "message": [
+        {"type": "at", "data": {"qq": "10001"}},
+        {"type": "text", "data": {"text": " 今天天气怎么样"}},
+    ],
+}
+
+class NoopPlugin:
+    """只读取几个常用字段的插件"""
+    async def on_message(self, message, bot):
+        if message.get('message_type') == 'group':
+            return message.get('group_id'), message.get('raw_message')
+
+def bench_decode():
+    raw = json.dumps(GROUP_MESSAGE, ensure_ascii=False).encode()
+    return lambda: event.decode_event(raw)
+
+def bench_fanout(plugins):
+    bot = Bot()
+    # 只保留测试用的插件
+    bot.loaded_plugins = {f"P_bench{i}_Plugin": NoopPlugin() for i in range(plugins)}
+    bot.router.compile(bot.loaded_plugins)
+    bot.commands.clear()
+    bot.commands.compile()
+    message = event.make_event(dict(GROUP_MESSAGE))
+    loop = asyncio.new_event_loop()
+
+    async def dispatch():
+        for _ in range(100):
+            await bot.execute_on_message(message)
+
+    def close():
+        # 先停止 guard 的超时检查任务再关闭事件循环，避免留下未结束的任务
+        loop.run_until_complete(stop_sweeper())
+        loop.close()
+
+    # 一次调用分发 100 个事件，换算为单个事件的耗时
+    return lambda: loop.run_until_complete(dispatch()), 100, close
+
+def bench_formatter():
+    formatter = ColoredFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s', datefmt='%H:%M:%S')
+    record = logging.LogRecord("api", logging.INFO, __file__, 1, "成功发送群消息:%s到群%s",
+                               ("今天天气怎么样", 30003), None)
+    return lambda: formatter.format(record)
+
+def bench_obapi_request():
+    # 与 Api.post_action 相同的方式构造请求，不实际发送
+    params = {"group_id": 30003, "message": "[CQ:at,qq=20002] 今天天气怎么样", "auto_escape": False}
+    headers = {"Authorization": "Bearer token"}
+
+    def build():
+        request = requests.Request("POST", "http://127.0.0.1:3000/send_group_msg", params=params, headers=headers)
+        return Api._session.prepare_request(request)
+    return build
+
+BENCHMARKS = {
+    "decode_group_message": bench_decode,
+    "fanout_1_plugin": lambda: bench_fanout(1),
+    "fanout_10_plugins": lambda: bench_fanout(10),
+    "fanout_100_plugins": lambda: bench_fanout(100),
+    "colored_formatter": bench_formatter,
+    "obapi_request_build": bench_obapi_request,
+}
+
+# 分发基准要经过整个事件循环，同一版本多次运行的波动就有约 ±30%，单独放宽容差
+TOLERANCES = {
+    "fanout_1_plugin": 0.5,
+    "fanout_10_plugins": 0.5,
+    "fanout_100_plugins": 0.5,
+}
+
+def measure(factory, repeat):
+    """
+    返回单次操作的耗时（纳秒），取 repeat 轮中最快的一轮
+    factory 返回要计时的函数，或 (函数, 每次调用包含的操作数[, 结束后调用的清理函数])
+    """
+    case = factory()
+    ops, close = 1, None
+    if isinstance(case, tuple):
+        case, ops, *rest = case
+        close = rest[0] if rest else None
+    try:
+        timer = timeit.Timer(case)
+        # 每轮至少运行 0.2 秒
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number))
+    finally:
+        if close is not None:
+            close()
+    return best / number / ops * 1e9
+
+def main(args):
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        baselines = json.load(open(BASELINE_PATH, 'r', encoding='utf-8'))
+    results = {}
+    regressions = []
+    print(f"每项取 {args.repeat} 轮中最快的一轮 (N={args.repeat})")
+    for name, factory in BENCHMARKS.items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = value = measure(factory, args.repeat)
+        baseline = baselines.get(name)
+        if baseline:
+            change = value / baseline - 1
+            tolerance = max(args.tolerance, TOLERANCES.get(name, 0))
+            status = "REGRESSION" if change > tolerance else "ok"
+            if status != "ok":
+                regressions.append(name)
+            print(f"{name:<24} {value:12.1f} ns/op  基线 {baseline:12.1f}  {change:+7.1%} (容差 {tolerance:.0%})  {status}")
+        else:
+            print(f"{name:<24} {value:12.1f} ns/op  无基线")
+
+    if args.update:
+        baselines.update({name: round(value, 1) for name, value in results.items()})
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=4, ensure_ascii=False)
+            f.write("\n")
+        print(f"基线已写入 {BASELINE_PATH}")
+        return 0
+    if regressions:
+        print(f"性能退化超过容差: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="热点路径微基准测试")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的变慢比例，超过时以非零状态退出")
+    parser.add_argument("--repeat", type=int, default=15, help="每项测量的轮数，取最快的一轮")
+    parser.add_argument("--update", action="store_true", help="把本次结果写入基线")
+    parser.add_argument("--only", default="", help="只运行名称包含该字符串的基准")
+    sys.exit(main(parser.parse_args()))
@@ -1,53 +1,295 @@
 import json
 import asyncio
-import websockets
-import requests
 import logging
-from OBApi import *
+from client import AsyncOneBotClient
+from transport import HttpTransport, WebSocketTransport
+from dispatcher import EventDispatcher
+from router import EventRouter, SUBTYPE_FIELDS, is_self_event
+from command import CommandRegistry
+from cache import ApiCache
+from scheduler import SendScheduler, PRIORITY_ADMIN, PRIORITY_REPLY
+from coalescer import MessageCoalescer
+from server import ReportServer, ReverseWebSocketServer, MetricsServer
+from supervisor import ConnectionSupervisor
+from metrics import REGISTRY, EVENTS_TOTAL
+from guard import PluginGuard, CircuitBreaker
+from profiler import Profiler
+from watchdog import LoopWatchdog
+from recorder import FrameRecorder
+from procpool import PluginProcessPool
+from threadpool import PluginThreadPool
+from shard import ShardSupervisor
 import datetime
 import importlib
 import os
+import signal
 
 # 创建一个日志记录器，用于记录BOT的运行信息
 logger = logging.getLogger("LXBotFrame")
+# 心跳日志使用单独的记录器，便于单独限速
+heartbeat_logger = logging.getLogger("LXBotFrame.heartbeat")
 
 class Bot:
-    def __init__(self):
+    def __init__(self, config_path='config/config.json'):
         # 从配置文件中加载配置
-        self.config = json.load(open('configs/config.json', 'r', encoding='utf-8'))
+        self.config_path = config_path
+        self.config = json.load(open(config_path, 'r', encoding='utf-8'))
         self.token = self.config['token']
         self.admins = self.config['admin']
         self.ws_url = self.config['ws_url']
         self.http_url = self.config['http_url']
         self.report_port = self.config['report_port']
+        self.ws_enabled = self.config.get('ws_enabled', True)
+        self.report_enabled = self.config.get('report_enabled', False)
         self.send_start_message = self.config['send_start_message']
         self.send_start_message_to_admin = self.config['send_start_message_to_admin']
         self.base_url = self.http_url
+        # WebSocket Api传输层，接收循环会把Api响应帧交给它
+        self.ws_transport = WebSocketTransport(timeout=self.config.get('api_timeout', 30),
+                                               offline_timeout=self.config.get('ws_offline_buffer_timeout', 60),
+                                               max_buffered=self.config.get('ws_offline_buffer_size', 1000))
+        # WebSocket连接守护，负责断线重连与心跳检测
+        self.supervisor = ConnectionSupervisor(self, first_retry=self.config.get('ws_reconnect_first_retry', 0.5),
+                                               base_delay=self.config.get('ws_reconnect_base_delay', 1.0),
+                                               max_delay=self.config.get('ws_reconnect_max_delay', 60.0),
+                                               stall_factor=self.config.get('ws_heartbeat_stall_factor', 2.5))
+        # 异步Api客户端，根据配置选择走 HTTP 还是 WebSocket
+        self.api_transport = self.config.get('api_transport', 'http')
+        if self.api_transport == 'ws':
+            transport = self.ws_transport
+        else:
+            transport = HttpTransport(self.http_url, token=self.token,
+                                      limit=self.config.get('api_pool_limit', 100),
+                                      limit_per_host=self.config.get('api_pool_limit_per_host', 32),
+                                      timeout=self.config.get('api_timeout', 30))
+        # 异步Api客户端，带查询缓存、发送调度器与消息合并器
+        self.api = self.create_client(transport)
+        self.sender = self.api.scheduler
+        self.coalescer = self.api.coalescer
+        self.clients = {}  # 反向WebSocket连接的账号 -> 该账号的Api客户端
+        # 事件分发器，接收循环只负责入队，插件在工作协程中并发执行
+        self.dispatcher = EventDispatcher(self.execute_on_message,
+                                          workers=self.config.get('dispatch_workers', 8),
+                                          queue_size=self.config.get('dispatch_queue_size', 1000),
+                                          lag_warning=self.config.get('dispatch_lag_warning', 1.0),
+                                          drop_policy=self.config.get('dispatch_drop_policy', 'newest'))
+        # 收到群成员变动等通知时同步更新缓存
+        self.dispatcher.observers.append(self.update_cache)
+        self.router = EventRouter()  # 根据插件声明的订阅生成的事件路由表
+        self.commands = CommandRegistry(self.config.get('command_prefixes', ['/']))  # 插件注册的命令与关键词
+        # HTTP POST 上报接收服务器，可与 WebSocket 同时使用
+        self.report_server = None
+        if self.report_enabled:
+            self.report_server = ReportServer(self, host=self.config.get('report_host', '127.0.0.1'),
+                                              port=self.report_port,
+                                              secret=self.config.get('report_secret', ''),
+                                              quick_operation_timeout=self.config.get('quick_operation_timeout', 1.0))
+        # 反向WebSocket服务器，由OneBot实现主动连接，支持多个账号
+        self.reverse_ws_server = None
+        if self.config.get('reverse_ws_enabled', False):
+            self.reverse_ws_server = ReverseWebSocketServer(self, host=self.config.get('reverse_ws_host', '127.0.0.1'),
+                                                            port=self.config.get('reverse_ws_port', 18081),
+                                                            path=self.config.get('reverse_ws_path', '/onebot/v11/ws'))
+        # 运行指标，队列深度等当前值在导出时读取
+        REGISTRY.gauge("lxbot_dispatch_pending", "待处理事件数", func=lambda: self.dispatcher.stats()['pending'])
+        REGISTRY.gauge("lxbot_send_queue_depth", "发送队列中等待的消息数", func=self.send_queue_depth)
+        REGISTRY.gauge("lxbot_ws_reconnects_total", "WebSocket重连次数", func=lambda: self.supervisor.reconnects, kind="counter")
+        REGISTRY.gauge("lxbot_plugin_breaker_open", "插件是否处于熔断状态", ("plugin",),
+                       func=lambda: {(name,): int(guard.breaker.is_open) for name, guard in self.guards.items()})
+        # 本地 /metrics 指标接口
+        self.metrics_server = None
+        if self.config.get('metrics_enabled', False):
+            self.metrics_server = MetricsServer(REGISTRY, host=self.config.get('metrics_host', '127.0.0.1'),
+                                                port=self.config.get('metrics_port', 18082))
+        # 按需开启的性能剖析器，可由管理员命令或 SIGUSR1 信号触发
+        self.profiler = Profiler(self, output_dir=os.path.dirname(self.config.get('log_file', 'logs/lxbot.log')) or 'logs',
+                                 mode=self.config.get('profile_mode', 'sample'),
+                                 interval=self.config.get('profile_sample_interval', 0.005))
+        # 事件循环阻塞监视器，找出在事件循环中执行阻塞代码的插件
+        self.watchdog = None
+        if self.config.get('loop_watchdog_enabled', True):
+            self.watchdog = LoopWatchdog(self, interval=self.config.get('loop_watchdog_interval', 0.1),
+                                         threshold=self.config.get('loop_lag_threshold', 0.5))
+        # 原始帧录制器，录制的文件可以用 replay.py 回放
+        self.recorder = None
+        if self.config.get('record_enabled', False):
+            self.recorder = FrameRecorder(self.config.get('record_path', 'logs/capture.gz'),
+                                          flush_interval=self.config.get('record_flush_interval', 1.0))
+        # 耗CPU插件的进程池，只有插件声明了在进程池中执行的方法时才会启动
+        self.process_pool = PluginProcessPool(self, size=self.config.get('process_pool_size', 2),
+                                              start_method=self.config.get('process_pool_start_method', 'spawn'))
+        # 同步(阻塞)插件处理函数的线程池，避免旧插件阻塞事件循环
+        self.thread_pool = PluginThreadPool(self, size=self.config.get('thread_pool_size', 8))
+        # 分片模式：本进程只保持连接，插件在按会话分片的多个工作进程中执行
+        self.shards = None
+        self.shard_index = None  # 在分片工作进程中为分片编号
+        if self.config.get('shard_workers', 0):
+            self.shards = ShardSupervisor(self, workers=self.config['shard_workers'],
+                                          start_method=self.config.get('shard_start_method', 'spawn'),
+                                          max_buffer=self.config.get('shard_max_buffer', 8 * 1024 * 1024))
+        self.quick_operations = {}  # 等待HTTP响应的上报事件 -> 快速操作
         self.loaded_plugins = {}  # 保存加载的插件实例
+        self.guards = {}  # 插件类名 -> 插件的执行保护(超时、并发上限与熔断)
         self.unloaded_plugin_files = []  # 保存卸载的插件文件名称
         self.invalid_plugin_files = []  # 保存不含插件类的文件名称
+        self._stop_event = None  # stop() 设置的事件，asyncio.Event 需要在事件循环中创建
+
+    def stop(self):
+        """请求停止运行，start() 会在关闭连接、停止各组件后返回"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def _wait_stopped(self, *aws):
+        """
+        等待 stop() 被调用或任一等待对象完成
+        aws: 任务或协程，先完成的任务抛出的异常会继续抛出，传入的协程在返回前取消
+        返回值：是否因 stop() 而结束
+        """
+        stopping = asyncio.ensure_future(self._stop_event.wait())
+        owned = [asyncio.ensure_future(aw) for aw in aws if asyncio.iscoroutine(aw)]
+        waiting = [aw for aw in aws if not asyncio.iscoroutine(aw)] + owned
+        try:
+            done, _ = await asyncio.wait([stopping, *waiting], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+            for task in owned:
+                task.cancel()
+        for task in done:
+            if task is not stopping:
+                task.result()
+        return stopping in done
 
     async def start(self):
-        # 获取登录信息并记录
-        login_info = get_login_info(self.http_url, token=self.token)
-        logger.info("Bot 账号: {}".format(login_info['user_id']))
-        logger.info("Bot 昵称: {}".format(login_info['nickname']))
-        logger.info("日期: {}".format(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-        can_send_r = can_send_record(self.base_url, token=self.token)
-        logger.info("Bot 发送语音消息权限: {}".format(can_send_r["yes"]))
-        
-        # 如果配置中需要发送启动消息，则发送给管理员
-        if self.send_start_message:
-            for admin in self.send_start_message_to_admin:
-                send_private_msg(self.base_url, admin, "LXBot启动成功！", token=self.token)
-                logger.info(f"向管理员 {admin} 发送启动通知")
-        # 初次加载插件
-        await self.load_plugins_from_folder("plugins")
-        logger.info("\n-----成功加载的插件-----\n{}".format("\n".join(self.loaded_plugins.keys()))+
-                    "\n-----未加载的插件文件-----\n{}".format("\n".join(self.unloaded_plugin_files))+
-                    "\n-----不含插件类的文件-----\n{}".format("\n".join(self.invalid_plugin_files)))
-        # 启动WebSocket服务器
-        await self.websocket_server()
+        self._stop_event = asyncio.Event()
+        if self.shards is not None:
+            # 插件由各分片工作进程加载
+            await self.shards.start()
+        else:
+            # 初次加载插件
+            await self.load_plugins_from_folder("plugins")
+            logger.info("\n-----成功加载的插件-----\n{}".format("\n".join(self.loaded_plugins.keys()))+
+                        "\n-----未加载的插件文件-----\n{}".format("\n".join(self.unloaded_plugin_files))+
+                        "\n-----不含插件类的文件-----\n{}".format("\n".join(self.invalid_plugin_files)))
+            if self.process_pool.plugins:
+                await self.process_pool.start()
+            self.dispatcher.start()
+        if self.sender is not None:
+            self.sender.start()
+        if self.watchdog is not None:
+            self.watchdog.start()
+        if self.recorder is not None:
+            self.recorder.start()
+        # 收到 SIGUSR1 时开始一次性能剖析，收到 SIGTERM 时正常停止，Windows 下没有这些信号处理
+        if hasattr(signal, 'SIGUSR1'):
+            try:
+                loop = asyncio.get_running_loop()
+                loop.add_signal_handler(signal.SIGUSR1, self.profiler.trigger, self.config.get('profile_duration', 30))
+                loop.add_signal_handler(signal.SIGTERM, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        # 先启动事件接收，WebSocket传输模式下的Api调用需要WebSocket连接
+        tasks = []
+        if self.ws_enabled:
+            tasks.append(asyncio.create_task(self.websocket_server()))
+        elif self.api_transport == 'ws':
+            logger.error("Api调用方式为 ws 但未启用 WebSocket 连接，Api调用将无法完成")
+        try:
+            if self.report_server is not None:
+                await self.report_server.start()
+            if self.reverse_ws_server is not None:
+                await self.reverse_ws_server.start()
+            if self.metrics_server is not None:
+                await self.metrics_server.start()
+            if not self.ws_enabled and self.api_transport == 'ws':
+                # 只有反向WebSocket连接时，bot.api 属于第一个连接的账号，等它连接后再记录登录信息
+                logger.info("等待OneBot实现通过反向WebSocket连接")
+                if await self._wait_stopped(self.api.transport.connected.wait()):
+                    return
+            # 获取登录信息并记录
+            login_info = await self.api.get_login_info()
+            logger.info("Bot 账号: {}".format(login_info['user_id']))
+            logger.info("Bot 昵称: {}".format(login_info['nickname']))
+            if self.coalescer is not None:
+                self.coalescer.self_id = login_info['user_id']
+            logger.info("日期: {}".format(datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            can_send_r = await self.api.can_send_record()
+            logger.info("Bot 发送语音消息权限: {}".format(can_send_r["yes"]))
+
+            # 如果配置中需要发送启动消息，则发送给管理员
+            if self.send_start_message:
+                for admin in self.send_start_message_to_admin:
+                    await self.api.send_private_msg(admin, "LXBot启动成功！", priority=PRIORITY_ADMIN)
+                    logger.info(f"向管理员 {admin} 发送启动通知")
+            # 保持运行，直到 stop() 被调用、任务被取消或WebSocket连接任务异常退出
+            await self._wait_stopped(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.report_server is not None:
+                await self.report_server.stop()
+            if self.reverse_ws_server is not None:
+                await self.reverse_ws_server.stop()
+            if self.metrics_server is not None:
+                await self.metrics_server.stop()
+            if self.watchdog is not None:
+                await self.watchdog.stop()
+            if self.recorder is not None:
+                self.recorder.stop()
+            if self.shards is not None:
+                await self.shards.stop()
+            await self.dispatcher.stop()
+            await self.process_pool.stop()
+            await self.thread_pool.stop()
+            if self.sender is not None:
+                await self.sender.stop()
+            await self.api.close()
+
+    def create_client(self, transport, self_id=None):
+        """
+        按配置创建Api客户端，每个账号各自拥有查询缓存、发送调度器与消息合并器
+        transport: 传输层
+        self_id: 账号QQ号，用于合并转发节点
+        """
+        # 群信息、成员信息等查询结果的缓存
+        api_cache = None
+        if self.config.get('api_cache_enabled', True):
+            api_cache = ApiCache(self.config.get('api_cache_ttl'), maxsize=self.config.get('api_cache_maxsize', 4096))
+        client = AsyncOneBotClient(transport, cache=api_cache)
+        # 发送调度器，发送消息时按优先级排队并限速
+        if self.config.get('send_scheduler_enabled', True):
+            client.scheduler = SendScheduler(client,
+                                             rate=self.config.get('send_rate', 5),
+                                             burst=self.config.get('send_burst', 10),
+                                             target_rate=self.config.get('send_target_rate', 1),
+                                             target_burst=self.config.get('send_target_burst', 3),
+                                             max_inflight=self.config.get('send_max_inflight', 8))
+        # 消息合并器，把短时间内发往同一会话的多条消息合并发送
+        if self.config.get('send_coalesce_enabled', False):
+            client.coalescer = MessageCoalescer(client.dispatch_send,
+                                                window=self.config.get('send_coalesce_window', 0.3),
+                                                forward_threshold=self.config.get('send_coalesce_forward_threshold', 600),
+                                                max_length=self.config.get('send_coalesce_max_length', 3000),
+                                                forward_name=self.config.get('send_coalesce_forward_name', 'LXBot'))
+            client.coalescer.self_id = self_id
+        return client
+
+    def api_for(self, event):
+        """返回应当用来响应该事件的Api客户端，多账号时按事件的 self_id 选择"""
+        if self.clients:
+            return self.clients.get(event.get('self_id'), self.api)
+        return self.api
+
+    def send_queue_depth(self):
+        """所有账号发送队列中等待的消息总数"""
+        # 只有反向WebSocket连接时 bot.api 同时也是第一个账号的客户端
+        clients = [self.api, *(client for client in self.clients.values() if client is not self.api)]
+        return sum(client.scheduler.depth for client in clients if client.scheduler is not None)
+
+    def update_cache(self, event):
+        """根据通知事件更新对应账号的查询缓存"""
+        cache = self.api_for(event).cache
+        if cache is not None:
+            cache.on_event(event)
 
     async def load_plugins_from_folder(self, folder_path):
         # 遍历指定文件夹中的插件文件
@@ -67,13 +309,18 @@ class Bot:
                         # 实例化插件并存储到字典中
                         plugin_instance = plugin_class()
                         self.loaded_plugins[class_name] = plugin_instance
+                        # 标记为在进程池中执行的方法替换为包装
+                        self.process_pool.register(class_name, plugin_instance)
+                        # 同步处理函数与标记为阻塞的处理函数替换为线程池包装
+                        self.thread_pool.register(class_name, plugin_instance)
                         logger.info(f"插件已加载: {class_name}")
 
                         # 获取插件的 interval 参数（如果存在）
                         interval = getattr(plugin_instance, 'interval', None)
 
-                        # 调用插件的 on_load 方法（如果存在），并在后台运行
-                        if hasattr(plugin_instance, 'on_load'):
+                        # 调用插件的 on_load 方法（如果存在），并在后台运行；
+                        # 分片模式下只在第一个工作进程中调用，避免定时任务重复执行
+                        if hasattr(plugin_instance, 'on_load') and not self.shard_index:
                             asyncio.create_task(plugin_instance.on_load(self, interval))
                     else:
                         self.invalid_plugin_files.append(filename)
@@ -81,49 +328,117 @@ class Bot:
                     # 将卸载的插件文件名加入到列表中
                     self.unloaded_plugin_files.append(filename)
 
-    async def execute_on_message(self, message):
-        tasks = []
-        # 遍历已加载的插件，调用各自的 on_message 方法（如果存在）
+        # 根据插件声明的订阅重新生成路由表与命令表
+        self.guards = {}
+        self.router.compile(self.loaded_plugins)
+        self.commands.clear()
         for class_name, plugin_instance in self.loaded_plugins.items():
-            if hasattr(plugin_instance, 'on_message'):
-                tasks.append(plugin_instance.on_message(message, self))
-        
-        # 执行所有插件的消息处理
-        await asyncio.gather(*tasks)
+            self.commands.register_plugin(class_name, plugin_instance)
+        self.commands.compile()
+
+    async def execute_on_message(self, message):
+        # 只调用订阅了该类事件的插件的 on_message 方法
+        tasks = [self.run_plugin(class_name, handler(message, self), message) for class_name, handler in self.router.route(message)]
+        # 消息只扫描一次命令表，只调用命中的命令处理函数；Bot自己发出的消息不触发命令
+        if message.get('post_type') == 'message' and not is_self_event(message):
+            for handler, args in self.commands.match(message.get('raw_message') or '', message.get('group_id')):
+                tasks.append(self.run_plugin(handler.plugin, handler.func(message, args, self), message))
+
+        # 执行所有插件的消息处理，单个插件的异常或超时不影响其他插件
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def guard_for(self, name):
+        """
+        插件的执行保护，第一次用到时按配置创建
+        插件可以用 handler_timeout 与 max_concurrency 属性覆盖全局的超时与并发上限
+        """
+        guard = self.guards.get(name)
+        if guard is None:
+            plugin = self.loaded_plugins.get(name)
+            guard = PluginGuard(name, timeout=getattr(plugin, 'handler_timeout', self.config.get('plugin_timeout', 30)),
+                                concurrency=getattr(plugin, 'max_concurrency', self.config.get('plugin_concurrency', 0)),
+                                breaker=CircuitBreaker(threshold=self.config.get('plugin_breaker_threshold', 5),
+                                                       cooldown=self.config.get('plugin_breaker_cooldown', 60)))
+            self.guards[name] = guard
+        return guard
+
+    def run_plugin(self, name, coro, event):
+        """
+        执行一个插件处理函数，超时、异常、熔断与耗时记录由插件的执行保护处理
+        返回值：可等待的协程，直接返回执行保护的协程而不再包一层
+        """
+        guard = self.guards.get(name)
+        if guard is None:
+            guard = self.guard_for(name)
+        return guard.run(coro, event)
+
+    def handle_event(self, data, waiter=None):
+        """
+        WebSocket 与 HTTP 上报共用的事件入口
+        waiter: 可选的 Future，事件处理完毕后被设置结果
+        返回值：事件是否已交给分发器
+        """
+        post_type = data.get('post_type')
+        EVENTS_TOTAL.inc(post_type, data.get(SUBTYPE_FIELDS.get(post_type, '')))
+        if post_type == 'meta_event':
+            # 处理生命周期元事件
+            if data.get('meta_event_type') == 'lifecycle':
+                logger.info('接收到生命周期元事件包')
+                return False
+            if data.get('meta_event_type') == 'heartbeat':
+                heartbeat_logger.info('接收到心跳包,看来LXBot还活着呢。')
+                return False
+        # 分片模式下交给所属会话的工作进程
+        if self.shards is not None:
+            return self.shards.put(data, waiter)
+        # 交给分发器处理，接收方不等待插件执行完毕
+        return self.dispatcher.put(data, waiter)
+
+    def begin_quick_operation(self, event):
+        """开始收集一个HTTP上报事件的快速操作，返回收集用的字典"""
+        operation = {}
+        self.quick_operations[id(event)] = operation
+        return operation
+
+    def end_quick_operation(self, event):
+        """HTTP响应即将发出，停止收集快速操作"""
+        self.quick_operations.pop(id(event), None)
+
+    def set_quick_operation(self, event, **operation):
+        """
+        为HTTP上报事件设置快速操作，如 reply、at_sender、delete、kick、ban、approve
+        返回值：是否设置成功，事件不是HTTP上报或响应已经发出时返回False
+        """
+        pending = self.quick_operations.get(id(event))
+        if pending is None:
+            return False
+        pending.update(operation)
+        return True
+
+    async def reply(self, event, message, at_sender=False):
+        """
+        回复事件来源的会话，HTTP上报的事件优先通过快速操作回复，省去一次Api调用
+        回复以 PRIORITY_REPLY 排在普通消息与广播之前，管理员的私聊以 PRIORITY_ADMIN 最先发送
+        返回值：Api返回值，通过快速操作回复时为None
+        """
+        pending = self.quick_operations.get(id(event))
+        if pending is not None and 'reply' not in pending:
+            pending['reply'] = message
+            if event.get('message_type') == 'group':
+                pending['at_sender'] = at_sender
+            return None
+        api = self.api_for(event)
+        if event.get('message_type') == 'group':
+            if at_sender and isinstance(message, str):
+                message = f"[CQ:at,qq={event.get('user_id')}] {message}"
+            return await api.send_group_msg(event.get('group_id'), message, priority=PRIORITY_REPLY)
+        priority = PRIORITY_ADMIN if self.is_admin(event.get('user_id')) else PRIORITY_REPLY
+        return await api.send_private_msg(event.get('user_id'), message, priority=priority)
+
+    def is_admin(self, user_id):
+        """判断QQ号是否为配置中的管理员，配置中的QQ号可以是字符串或数字"""
+        return str(user_id) in {str(admin) for admin in self.admins}
 
     async def websocket_server(self):
-        logger.info("消息接收服务器启动中...")
-        logger.info(f"尝试连接到 WebSocket 地址: {self.ws_url}\n")
-        try:
-            # 建立WebSocket连接
-            async with websockets.connect(self.ws_url, extra_headers={"Authorization": f"Bearer {self.token}"}) as websocket:
-                logger.info(f"成功连接到 OneBot WebSocket 地址: {self.ws_url}\n")
-                logger.info("开始接收消息\n")
-                # 持续接收消息
-                while True:
-                    message = await websocket.recv()
-                    logger.debug(f"收到 WebSocket 消息原文: {message}")
-                    
-                    try:
-                        # 解析收到的消息
-                        data = json.loads(message)
-                        if data['post_type'] == 'meta_event':
-                            # 处理生命周期元事件
-                            if data['meta_event_type'] == 'lifecycle':
-                                logger.info('接收到生命周期元事件包')
-                                continue
-                            if data['meta_event_type'] == 'heartbeat':
-                                logger.info('接收到心跳包,看来LXBot还活着呢。')
-                                continue
-                            
-                        # 处理插件消息
-                        await self.execute_on_message(data)
-                    except json.JSONDecodeError:
-                        logger.error("无法解析 WebSocket 消息的 JSON 数据")
-                    except Exception as e:
-                        logger.error(f"处理 WebSocket 消息时出错: {e}")
-
-        except Exception as e:
-            logger.error(f"WebSocket 连接失败: {e}, 10秒后重连")
-            await asyncio.sleep(10)  # 等待10秒后重连
-            await self.websocket_server()  # 重新启动WebSocket服务器
+        # 由连接守护负责连接、接收与断线重连
+        await self.supervisor.run()
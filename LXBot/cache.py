@@ -0,0 +1,168 @@
+import time
+import logging
+from collections import OrderedDict
+from metrics import REGISTRY
+
+logger = logging.getLogger("api.cache")
+
+CACHE_LOOKUPS = REGISTRY.counter("lxbot_api_cache_lookups_total", "Api查询结果缓存的查找次数", ("action", "result"))
+CACHE_EVICTIONS = REGISTRY.counter("lxbot_api_cache_evictions_total", "缓存已满时淘汰的最久未使用条目数", ("action",))
+
+# 缓存未命中时的返回值，以区分缓存的None
+MISSING = object()
+
+# 各类可缓存资源的默认存活时间（秒）
+DEFAULT_TTLS = {
+    "get_stranger_info": 3600,
+    "get_friend_list": 300,
+    "get_group_info": 300,
+    "get_group_member_info": 120,
+    "get_group_member_list": 300,
+}
+
+class TTLCache:
+    """带过期时间的 LRU 缓存"""
+
+    def __init__(self, ttl, maxsize=4096):
+        """
+        ttl: 条目存活时间（秒）
+        maxsize: 最多保存的条目数量，超出时淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (过期时间, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key):
+        """读取条目但不影响统计与淘汰顺序"""
+        entry = self._data.get(key)
+        return MISSING if entry is None else entry[1]
+
+    def set(self, key, value):
+        """保存条目，返回值：是否因超出容量淘汰了最久未使用的条目"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+            return True
+        return False
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def pop_where(self, predicate):
+        """删除所有键满足条件的条目"""
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+def _copy(value):
+    # 缓存的是 JSON 解码结果，只需逐层复制 dict 与 list，比 copy.deepcopy 快得多
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+class ApiCache:
+    """
+    Api查询结果缓存
+    按Api动作分别缓存，收到群成员变动等通知事件时删除或就地修改相关条目；
+    存入与取出时都会复制，插件修改拿到的结果不会影响缓存
+    """
+
+    def __init__(self, ttls=None, maxsize=4096):
+        """
+        ttls: Api动作 -> 存活时间（秒），未指定的使用默认值，设为0表示不缓存该动作
+        maxsize: 每类资源最多缓存的条目数量
+        """
+        ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.caches = {action: TTLCache(ttl, maxsize) for action, ttl in ttls.items() if ttl > 0}
+
+    def get(self, action, key):
+        """
+        读取缓存的查询结果
+        返回值：结果的副本，未命中时为 MISSING
+        """
+        cache = self.caches.get(action)
+        if cache is None:
+            return MISSING
+        value = cache.get(key)
+        if value is MISSING:
+            CACHE_LOOKUPS.inc(action, "miss")
+            return MISSING
+        CACHE_LOOKUPS.inc(action, "hit")
+        return _copy(value)
+
+    def set(self, action, key, value):
+        """保存查询结果的副本"""
+        cache = self.caches.get(action)
+        if cache is not None and cache.set(key, _copy(value)):
+            CACHE_EVICTIONS.inc(action)
+
+    def _pop(self, action, key):
+        cache = self.caches.get(action)
+        if cache is not None:
+            cache.pop(key)
+
+    def _patch_member(self, group_id, user_id, field, value):
+        # 同时修改单个成员信息与成员列表中的对应条目
+        cache = self.caches.get("get_group_member_info")
+        if cache is not None:
+            member = cache.peek((group_id, user_id))
+            if member is not MISSING and member is not None:
+                member[field] = value
+        cache = self.caches.get("get_group_member_list")
+        if cache is not None:
+            members = cache.peek(group_id)
+            if members is not MISSING and members is not None:
+                for member in members:
+                    if member.get("user_id") == user_id:
+                        member[field] = value
+
+    def on_event(self, event):
+        """根据通知事件使相关缓存失效或就地更新"""
+        if event.get("post_type") != "notice":
+            return
+        notice_type = event.get("notice_type")
+        group_id = event.get("group_id")
+        user_id = event.get("user_id")
+        if notice_type in ("group_increase", "group_decrease"):
+            self._pop("get_group_member_info", (group_id, user_id))
+            self._pop("get_group_member_list", group_id)
+            self._pop("get_group_info", group_id)
+            if notice_type == "group_decrease" and user_id == event.get("self_id"):
+                # Bot自己离开了群，丢弃该群的所有成员信息
+                cache = self.caches.get("get_group_member_info")
+                if cache is not None:
+                    cache.pop_where(lambda key: key[0] == group_id)
+        elif notice_type == "group_admin":
+            self._patch_member(group_id, user_id, "role", "admin" if event.get("sub_type") == "set" else "member")
+        elif notice_type == "group_card":
+            self._patch_member(group_id, user_id, "card", event.get("card_new", ""))
+        elif notice_type == "friend_add":
+            self._pop("get_friend_list", None)
+
+    def stats(self):
+        """返回各类资源的命中、未命中与淘汰次数，同样的计数也记录在 metrics.REGISTRY 中"""
+        return {action: {"hits": cache.hits, "misses": cache.misses, "evictions": cache.evictions, "size": len(cache)}
+                for action, cache in self.caches.items()}
@@ -0,0 +1,484 @@
+import logging
+import time
+from cache import MISSING
+from metrics import API_LATENCY, API_FAILURES
+from scheduler import PRIORITY_NORMAL
+
+logger = logging.getLogger("api")
+access_logger = logging.getLogger("LXBotFrame.access")
+
+def send_target(action, params):
+    """发送类动作的目标会话，与各发送方法传给调度器的目标一致"""
+    if action in ("send_group_msg", "send_group_forward_msg") or (action == "send_msg" and params.get("message_type") == "group"):
+        return ('group', params.get("group_id"))
+    return ('user', params.get("user_id"))
+
+class AsyncOneBotClient:
+    """
+    异步OneBot Api客户端
+    请求经由可替换的传输层发出（HTTP 连接池或 OneBot WebSocket），不会阻塞事件循环
+    OBApi 与 GoCQApi 中的同步函数在这里都有同名的异步版本
+    """
+
+    def __init__(self, transport, cache=None):
+        """
+        transport: 传输层，HttpTransport 或 WebSocketTransport
+        cache: 查询结果缓存 ApiCache，为None时不缓存
+        """
+        self.transport = transport
+        self.cache = cache
+        self.scheduler = None  # 发送调度器 SendScheduler，为None时直接发送
+        self.coalescer = None  # 消息合并器 MessageCoalescer，为None时不合并
+        self.record = True  # 是否记录Api耗时、失败次数与访问日志，分片工作进程的调用由主进程记录
+
+    async def close(self):
+        """关闭传输层"""
+        await self.transport.close()
+
+    async def call_api(self, action, params=None):
+        """
+        万用Api调用函数，只要LLOB支持就可以用
+        action: API动作
+        params: 请求参数
+        返回值：API返回的data字段，失败时为None
+        """
+        return self.unwrap(action, await self.request(action, params))
+
+    async def request(self, action, params=None):
+        """
+        发出一次Api调用，记录耗时、失败次数与访问日志，不经过发送调度器
+        分片模式下主进程用它转发工作进程的查询类调用
+        返回值：完整的OneBot响应包，请求失败时为None
+        """
+        if not self.record:
+            return await self.transport.request(action, params or {})
+        start = time.perf_counter()
+        data = await self.transport.request(action, params or {})
+        latency = time.perf_counter() - start
+        API_LATENCY.observe(latency, action)
+        if data is None or data.get("status") != "ok":
+            API_FAILURES.inc(action)
+        if access_logger.isEnabledFor(logging.INFO):
+            access_logger.info("调用Api %s 耗时 %.3fs", action, latency,
+                               extra={'action': action, 'latency': round(latency, 6)})
+        return data
+
+    def unwrap(self, action, data):
+        """
+        从OneBot响应包中取出结果
+        data: 传输层返回的响应包，请求失败时为None
+        返回值：API返回的data字段，失败时为None
+        """
+        if data is None:
+            return None
+        if data.get("status") == "ok":
+            logger.debug("成功执行操作%s", action)
+            return data.get("data")
+        logger.error("API返回错误:%s", data.get('msg'))
+        return None
+
+    async def send(self, action, params, priority=PRIORITY_NORMAL):
+        """
+        按动作名发送消息，与各发送方法一样经过消息合并器与发送调度器，目标会话由参数得出
+        分片模式下主进程用它转发工作进程的发送类调用
+        action: 发送类动作，如 send_group_msg
+        params: 请求参数
+        priority: 发送优先级，scheduler 中的 PRIORITY_* 常量
+        返回值：API返回的data字段，失败时为None
+        """
+        return await self._send(action, params, send_target(action, params), priority)
+
+    async def _send(self, action, params, target, priority=PRIORITY_NORMAL):
+        # 发送类动作先经过消息合并器，再交给发送调度器按优先级排队限速
+        if self.coalescer is not None:
+            return await self.coalescer.submit(action, params, target, priority)
+        return await self.dispatch_send(action, params, target, priority)
+
+    async def dispatch_send(self, action, params, target, priority=PRIORITY_NORMAL):
+        if self.scheduler is None:
+            return await self.call_api(action, params)
+        return await self.scheduler.submit(action, params, target, priority)
+
+    async def _cached_call(self, action, key, params, no_cache):
+        # no_cache 为True时跳过缓存直接请求，但仍用新结果刷新缓存
+        if self.cache is None:
+            return await self.call_api(action, params)
+        if not no_cache:
+            data = self.cache.get(action, key)
+            if data is not MISSING:
+                return data
+        data = await self.call_api(action, params)
+        if data is not None:
+            self.cache.set(action, key, data)
+        return data
+
+    async def send_private_msg(self, user_id, message, auto_escape=False, priority=PRIORITY_NORMAL):
+        """
+        发送私聊消息
+        user_id: 接收者QQ号
+        message: 要发送的消息
+        auto_escape：是否解析CQ码
+        priority: 发送优先级，scheduler 中的 PRIORITY_* 常量，管理员消息与回复排在广播之前
+        返回值：{message_id}
+        """
+        return await self._send("send_private_msg", {"user_id": user_id, "message": message, "auto_escape": auto_escape}, ('user', user_id), priority)
+
+    async def send_group_msg(self, group_id, message, auto_escape=False, priority=PRIORITY_NORMAL):
+        """
+        发送群消息
+        group_id: 群号
+        message: 要发送的消息
+        auto_escape：是否解析CQ码
+        priority: 发送优先级，scheduler 中的 PRIORITY_* 常量，管理员消息与回复排在广播之前
+        返回值：{message_id}
+        """
+        return await self._send("send_group_msg", {"group_id": group_id, "message": message, "auto_escape": auto_escape}, ('group', group_id), priority)
+
+    async def send_msg(self, message_type, user_id=None, group_id=None, message=None, auto_escape=False, priority=PRIORITY_NORMAL):
+        """
+        发送消息
+        message_type: 消息类型，private或group
+        user_id: 接收者QQ号，当message_type为private时必填
+        group_id: 群号，当message_type为group时必填
+        message: 要发送的消息
+        auto_escape：是否解析CQ码
+        priority: 发送优先级，scheduler 中的 PRIORITY_* 常量，管理员消息与回复排在广播之前
+        返回值：{message_id}
+        """
+        target = ('group', group_id) if message_type == "group" else ('user', user_id)
+        return await self._send("send_msg", {"message_type": message_type, "user_id": user_id, "group_id": group_id, "message": message, "auto_escape": auto_escape}, target, priority)
+
+    async def delete_msg(self, message_id):
+        """
+        撤回消息
+        message_id: 消息ID
+        返回值：{}
+        """
+        return await self.call_api("delete_msg", {"message_id": message_id})
+
+    async def get_msg(self, message_id):
+        """
+        获取消息
+        message_id: 消息ID
+        返回值：{time, message_type, message_id, real_id, sender: {user_id, nickname, sex, age}, message}
+        """
+        return await self.call_api("get_msg", {"message_id": message_id})
+
+    async def get_forward_msg(self, id):
+        """
+        获取合并转发内容
+        id: 合并转发ID
+        返回值：
+        {messages: [{type, data: {}}, ...]}
+        """
+        return await self.call_api("get_forward_msg", {"id": id})
+
+    async def send_like(self, user_id, times=1):
+        """
+        给好友资料卡点赞
+        user_id: 好友QQ号
+        times: 点赞次数
+        返回值：{}
+        """
+        return await self.call_api("send_like", {"user_id": user_id, "times": times})
+
+    async def set_group_kick(self, group_id, user_id, reject_add_request=False):
+        """
+        群组踢人
+        group_id: 群号
+        user_id: 被踢者QQ号
+        reject_add_request: 是否拒绝被踢者的加群请求
+        返回值：{}
+        """
+        return await self.call_api("set_group_kick", {"group_id": group_id, "user_id": user_id, "reject_add_request": reject_add_request})
+
+    async def set_group_ban(self, group_id, user_id, duration=30 * 60):
+        """
+        群组单人禁言
+        group_id: 群号
+        user_id: 被禁言者QQ号
+        duration: 禁言时长，单位秒，0表示取消禁言
+        返回值：{}
+        """
+        return await self.call_api("set_group_ban", {"group_id": group_id, "user_id": user_id, "duration": duration})
+
+    async def set_group_anonymous_ban(self, group_id, anonymous_flag, duration=30 * 60):
+        """
+        群组匿名用户禁言
+        TIPS: LLOB并不支持该功能
+        group_id: 群号
+        anonymous_flag: 匿名用户的flag，在调用获取群成员信息时获得
+        duration: 禁言时长，单位秒，0表示取消禁言
+        返回值：{}
+        """
+        return await self.call_api("set_group_anonymous_ban", {"group_id": group_id, "flag": anonymous_flag, "duration": duration})
+
+    async def set_group_whole_ban(self, group_id, enable=True):
+        """
+        群组全员禁言
+        group_id: 群号
+        enable: 是否开启全员禁言，True为开启，False为关闭
+        返回值：{}
+        """
+        return await self.call_api("set_group_whole_ban", {"group_id": group_id, "enable": enable})
+
+    async def set_group_admin(self, group_id, user_id, enable=True):
+        """
+        设置群组管理员
+        group_id: 群号
+        user_id: 被设置管理员的QQ号
+        enable: 是否设置为管理员，True为设置，False为取消
+        返回值：{}
+        """
+        return await self.call_api("set_group_admin", {"group_id": group_id, "user_id": user_id, "enable": enable})
+
+    async def set_group_anonymous(self, group_id, enable=True):
+        """
+        设置群组匿名
+        TIPS: LLOB并不支持该功能
+        group_id: 群号
+        enable: 是否允许匿名聊天，True为允许，False为禁止
+        返回值：{}
+        """
+        return await self.call_api("set_group_anonymous", {"group_id": group_id, "enable": enable})
+
+    async def set_group_card(self, group_id, user_id, card=None):
+        """
+        设置群组名片
+        group_id: 群号
+        user_id: 被设置名片的QQ号
+        card: 群名片内容，不填或为空字符串表示删除名片
+        返回值：{}
+        """
+        return await self.call_api("set_group_card", {"group_id": group_id, "user_id": user_id, "card": card})
+
+    async def set_group_name(self, group_id, group_name):
+        """
+        设置群组名称
+        group_id: 群号
+        group_name: 新的群名称
+        返回值：{}
+        """
+        return await self.call_api("set_group_name", {"group_id": group_id, "group_name": group_name})
+
+    async def set_group_leave(self, group_id, is_dismiss=False):
+        """
+        退出群组
+        group_id: 群号
+        is_dismiss: 是否解散，如果登录号是群主，则仅在此项为 True 时能够解散
+        返回值：{}
+        """
+        return await self.call_api("set_group_leave", {"group_id": group_id, "is_dismiss": is_dismiss})
+
+    async def set_group_special_title(self, group_id, user_id, special_title, duration=-1):
+        """
+        设置群组专属头衔
+        group_id: 群号
+        user_id: 被设置头衔的QQ号
+        special_title: 专属头衔，不填或为空字符串表示删除头衔
+        duration: 专属头衔有效期，单位秒，-1表示永久，不填或为0表示取消头衔
+        返回值：{}
+        """
+        return await self.call_api("set_group_special_title", {"group_id": group_id, "user_id": user_id, "special_title": special_title, "duration": duration})
+
+    async def set_friend_add_request(self, flag, approve=True, reason=''):
+        """
+        处理加好友请求
+        flag: 加好友请求的 flag
+        approve: 是否同意请求，True 为同意，False 为拒绝
+        reason: 处理理由，仅在拒绝时有效
+        返回值：{}
+        """
+        return await self.call_api("set_friend_add_request", {"flag": flag, "approve": approve, "reason": reason})
+
+    async def set_group_add_request(self, flag, sub_type, approve=True, reason=''):
+        """
+        处理加群请求/邀请
+        flag: 加群请求的 flag
+        sub_type: 请求类型，"add" 或 "invite"
+        approve: 是否同意请求，True 为同意，False 为拒绝
+        reason: 处理理由，仅在拒绝时有效
+        返回值：{}
+        """
+        return await self.call_api("set_group_add_request", {"flag": flag, "sub_type": sub_type, "approve": approve, "reason": reason})
+
+    async def get_login_info(self):
+        """
+        获取登录信息
+        返回值：{user_id, nickname}
+        """
+        return await self.call_api("get_login_info", {})
+
+    async def get_stranger_info(self, user_id, no_cache=False):
+        """
+        获取陌生人信息
+        user_id: QQ号
+        no_cache: 是否使用缓存，False 为使用缓存，True 为不使用缓存
+        返回值：{user_id, nickname, sex, age}
+        """
+        return await self._cached_call("get_stranger_info", user_id, {"user_id": user_id, "no_cache": no_cache}, no_cache)
+
+    async def get_friend_list(self, no_cache=False):
+        """
+        获取好友列表
+        no_cache: 是否跳过本地缓存
+        返回值：[{user_id, nickname, remark}, ...]
+        """
+        return await self._cached_call("get_friend_list", None, {}, no_cache)
+
+    async def get_group_info(self, group_id, no_cache=False):
+        """
+        获取群信息
+        group_id: 群号
+        no_cache: 是否使用缓存，False 为使用缓存，True 为不使用缓存
+        返回值：{group_id, group_name, member_count, max_member_count}
+        """
+        return await self._cached_call("get_group_info", group_id, {"group_id": group_id, "no_cache": no_cache}, no_cache)
+
+    async def get_group_list(self):
+        """
+        获取群列表
+        返回值：[{group_id, group_name, member_count, max_member_count}, ...]
+        """
+        return await self.call_api("get_group_list", {})
+
+    async def get_group_member_info(self, group_id, user_id, no_cache=False):
+        """
+        获取群成员信息
+        group_id: 群号
+        user_id: QQ号
+        no_cache: 是否使用缓存，False 为使用缓存，True 为不使用缓存
+        返回值：{group_id, user_id, nickname, card, sex, age, area, join_time, last_sent_time, level, role, unfriendly, title ,title_expire_time, card_changeable}
+        """
+        return await self._cached_call("get_group_member_info", (group_id, user_id), {"group_id": group_id, "user_id": user_id, "no_cache": no_cache}, no_cache)
+
+    async def get_group_member_list(self, group_id, no_cache=False):
+        """
+        获取群成员列表
+        group_id: 群号
+        no_cache: 是否跳过本地缓存
+        返回值：[{user_id, nickname, card, sex, age, area, join_time, last_sent_time, level, role, unfriendly, title ,title_expire_time, card_changeable}, ...]
+        """
+        return await self._cached_call("get_group_member_list", group_id, {"group_id": group_id}, no_cache)
+
+    async def get_group_honor_info(self, group_id, type):
+        """
+        获取群荣誉信息
+        group_id: 群号
+        type: 类型，[talkative,performer,legend,strong_newbie,emotion,all]
+        返回值：{group_id, current_talkative: {user_id, nickname, avatar, day_count}, talkative_list: [{user_id, nickname, avatar, description}, ...], performer_list: [{user_id, nickname, avatar, description}, ...], legend_list: [{user_id, nickname, avatar, description}, ...], strong_newbie_list: [{user_id, nickname, avatar, description}, ...], emotion_list: [{user_id, nickname, avatar, description}, ...]}
+        """
+        return await self.call_api("get_group_honor_info", {"group_id": group_id, "type": type})
+
+    async def get_cookies(self, domain):
+        """
+        获取Cookies
+        domain: 域名
+        返回值：Cookies
+        """
+        return await self.call_api("get_cookies", {"domain": domain})
+
+    async def get_csrf_token(self):
+        """
+        获取CSRF Token
+        TIPS: LLOB并不支持该功能
+        返回值：CSRF Token
+        """
+        return await self.call_api("get_csrf_token", {})
+
+    async def get_credentials(self):
+        """
+        获取 QQ 相关接口凭证
+        TIPS: LLOB并不支持该功能
+        返回值：{cookies, csrf_token}
+        """
+        return await self.call_api("get_credentials", {})
+
+    async def get_record(self, file, out_format):
+        """
+        获取语音消息    
+        file: 语音文件名
+        out_format: 语音格式
+        返回值：{file}
+        """
+        return await self.call_api("get_record", {"file": file, "out_format": out_format})
+
+    async def get_image(self, file):
+        """
+        获取图片    
+        file: 图片文件名
+        返回值：{file}
+        """
+        return await self.call_api("get_image", {"file": file})
+
+    async def can_send_image(self):
+        """
+        检查机器人是否可以发送图片
+        返回值：{yes}
+        """
+        return await self.call_api("can_send_image", {})
+
+    async def can_send_record(self):
+        """
+        检查机器人是否可以发送语音
+        返回值：{yes}
+        """
+        return await self.call_api("can_send_record", {})
+
+    async def get_status(self):
+        """
+        获取插件运行状态
+        返回值：{online, good,...}
+        """
+        return await self.call_api("get_status", {})
+
+    async def get_version_info(self):
+        """
+        获取版本信息
+        返回值：{app_name, app_version, protocol_version,...}
+        """
+        return await self.call_api("get_version_info", {})
+
+    async def set_restart(self, delay):
+        """
+        重启API
+        返回值：{}
+        """
+        return await self.call_api("set_restart", {"delay": delay})
+
+    async def clean_cache(self):
+        """
+        清理缓存
+        返回值：{}
+        """
+        return await self.call_api("clean_cache", {})
+
+    # 以下为 GoCQ 扩展接口
+    async def send_private_forward_msg(self, user_id, messages, priority=PRIORITY_NORMAL):
+        """
+        发送合并转发
+        user_id: 接收者QQ号
+        message: 要发送的消息
+        priority: 发送优先级，scheduler 中的 PRIORITY_* 常量，管理员消息与回复排在广播之前
+        返回值：{message_id,forward_id}
+        """
+        return await self._send("send_private_forward_msg", {"user_id": user_id, "message": messages}, ('user', user_id), priority)
+
+    async def send_group_forward_msg(self, group_id, messages, priority=PRIORITY_NORMAL):
+        """
+        发送合并转发
+        group_id: 接收者QQ群号
+        message: 要发送的消息
+        priority: 发送优先级，scheduler 中的 PRIORITY_* 常量，管理员消息与回复排在广播之前
+        返回值：{message_id,forward_id}
+        """
+        return await self._send("send_group_forward_msg", {"group_id": group_id, "message": messages}, ('group', group_id), priority)
+
+    async def get_group_msg_history(self, message_seq, group_id):
+        """
+        获取群消息历史记录
+        message_seq: 消息序列号
+        group_id: 群号
+        返回值：{messages:[{content,sender:{nickname,user_id},time}, ...]}
+        """
+        return await self.call_api("get_group_msg_history", {"message_seq": message_seq, "group_id": group_id})
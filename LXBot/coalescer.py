@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import re
+from message import parse_message
+from scheduler import PRIORITY_NORMAL
+
+logger = logging.getLogger("LXBotFrame.coalescer")
+
+# 可以合并的发送动作 -> 合并后改用的合并转发动作
+FORWARD_ACTIONS = {
+    "send_group_msg": "send_group_forward_msg",
+    "send_private_msg": "send_private_forward_msg",
+}
+
+# 切分文本时不能从中间切开的片段：CQ码与转义字符
+_UNSPLITTABLE = re.compile(r"\[CQ:[^\[\]]*\]|&(?:amp|#91|#93|#44);")
+
+def message_size(message):
+    """估算消息长度，字符串按字符数计算，消息段数组按文本长度计算，非文本段各计1"""
+    if isinstance(message, str):
+        return len(message)
+    size = 0
+    for segment in [message] if isinstance(message, dict) else message:
+        if segment.get("type") == "text":
+            size += len(segment.get("data", {}).get("text", ""))
+        else:
+            size += 1
+    return size
+
+def merge_messages(messages, separator="\n"):
+    """把多条消息合并成一条，全部为字符串时直接拼接，否则合并为消息段数组，字符串按CQ码解析"""
+    if all(isinstance(message, str) for message in messages):
+        return separator.join(messages)
+    merged = []
+    for i, message in enumerate(messages):
+        if i:
+            merged.append({"type": "text", "data": {"text": separator}})
+        merged.extend(parse_message(message))
+    return merged
+
+def _cut(line, max_length):
+    """把超长的一行硬切成不超过 max_length 的若干段，只在CQ码与转义字符之外切开"""
+    pieces = []
+    current = ""
+    position = 0
+    matches = list(_UNSPLITTABLE.finditer(line))
+    for match in matches + [None]:
+        text = line[position:match.start()] if match else line[position:]
+        while len(current) + len(text) > max_length:
+            take = max(max_length - len(current), 0)
+            pieces.append(current + text[:take])
+            current, text = "", text[take:]
+        current += text
+        if match:
+            atom = match.group()
+            if current and len(current) + len(atom) > max_length:
+                pieces.append(current)
+                current = ""
+            # 本身就超长的CQ码单独成段，不切开
+            current += atom
+            position = match.end()
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_text(text, max_length):
+    """按行把过长的文本切分成不超过 max_length 的若干段，CQ码不会被切开"""
+    chunks = []
+    current = []
+    length = 0
+    for line in text.split("\n"):
+        if len(line) > max_length:
+            # 单行本身就超长时硬切
+            if current:
+                chunks.append("\n".join(current))
+                current, length = [], 0
+            *pieces, line = _cut(line, max_length)
+            chunks.extend(pieces)
+        if current and length + len(line) + 1 > max_length:
+            chunks.append("\n".join(current))
+            current, length = [], 0
+        current.append(line)
+        length += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def split_segments(segments, max_length):
+    """把过长的消息段数组切分成长度不超过 max_length 的若干段数组，文本段按 split_text 切分，其他消息段不切开"""
+    chunks = []
+    current = []
+    length = 0
+    for segment in segments:
+        if segment.get("type") == "text":
+            pieces = [{"type": "text", "data": {"text": piece}}
+                      for piece in split_text(segment.get("data", {}).get("text", ""), max_length)]
+        else:
+            pieces = [segment]
+        for piece in pieces:
+            size = message_size([piece])
+            if current and length + size > max_length:
+                chunks.append(current)
+                current, length = [], 0
+            current.append(piece)
+            length += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+class _Buffered:
+    __slots__ = ('action', 'params', 'future', 'priority')
+
+    def __init__(self, action, params, future, priority):
+        self.action = action
+        self.params = params
+        self.future = future
+        self.priority = priority
+
+class MessageCoalescer:
+    """
+    消息合并器
+    在发送调度器之前按会话缓冲一小段时间内的消息，合并成一条消息发出；
+    合并了多条消息且过长时改为一条合并转发消息，超过最大长度的消息（字符串或消息段数组）会被切分成多个转发节点
+    """
+
+    def __init__(self, send, window=0.3, forward_threshold=600, max_length=3000, forward_name="LXBot"):
+        """
+        send: 实际发送的协程函数 send(action, params, target, priority)
+        window: 缓冲时间（秒）
+        forward_threshold: 合并了至少两条消息且总长度超过该值时改用合并转发，单条消息只在超过 max_length 时改用
+        max_length: 单条消息的最大长度，超过时切分为多个转发节点
+        forward_name: 合并转发节点显示的发送者名称
+        """
+        self.send = send
+        self.window = window
+        self.forward_threshold = forward_threshold
+        self.max_length = max_length
+        self.forward_name = forward_name
+        self.self_id = None  # 合并转发节点的发送者QQ号，登录后由Bot设置
+        self._buffers = {}  # 会话 -> [_Buffered]
+        self._locks = {}  # 会话 -> [asyncio.Lock, 未完成批次数]，保证同一会话的批次按顺序发出
+        # 统计信息
+        self.submitted = 0
+        self.batches = 0
+
+    def submit(self, action, params, target, priority=PRIORITY_NORMAL):
+        """
+        缓冲一个发送动作
+        priority: 发送优先级，合并后的消息取这一批中最高的优先级
+        返回值：Future，结果为合并后那条消息的Api返回值
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.submitted += 1
+        item = _Buffered(action, params, future, priority)
+        mergeable = action in FORWARD_ACTIONS and not params.get("auto_escape")
+        buffer = self._buffers.get(target)
+        if not mergeable:
+            # 无法合并的消息先把已缓冲的消息发出，再单独发送，保持顺序
+            if buffer:
+                self._flush(target)
+            self._schedule(target, [item])
+            return future
+        if buffer is None:
+            buffer = self._buffers[target] = []
+            loop.call_later(self.window, self._flush, target)
+        buffer.append(item)
+        return future
+
+    def _flush(self, target):
+        items = self._buffers.pop(target, None)
+        if items:
+            self._schedule(target, items)
+
+    def _schedule(self, target, items):
+        entry = self._locks.get(target)
+        if entry is None:
+            entry = self._locks[target] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        asyncio.create_task(self._send_batch(target, items, entry))
+
+    def _build(self, items):
+        """决定一批消息的发送方式，返回值：(action, params)"""
+        first = items[0]
+        if first.action not in FORWARD_ACTIONS:
+            return first.action, first.params
+        messages = [item.params["message"] for item in items]
+        sizes = [message_size(message) for message in messages]
+        if max(sizes) <= self.max_length:
+            if len(items) == 1:
+                return first.action, first.params
+            if sum(sizes) <= self.forward_threshold:
+                return first.action, dict(first.params, message=merge_messages(messages))
+
+        nodes = []
+        for message, size in zip(messages, sizes):
+            if size <= self.max_length:
+                nodes.append(self._node(message))
+            elif isinstance(message, str):
+                nodes.extend(self._node(chunk) for chunk in split_text(message, self.max_length))
+            else:
+                nodes.extend(self._node(chunk) for chunk in split_segments(parse_message(message), self.max_length))
+        params = {key: value for key, value in first.params.items() if key in ("group_id", "user_id")}
+        params["message"] = nodes
+        return FORWARD_ACTIONS[first.action], params
+
+    def _node(self, content):
+        return {"type": "node", "data": {"name": self.forward_name, "uin": str(self.self_id or ""), "content": content}}
+
+    async def _send_batch(self, target, items, entry):
+        async with entry[0]:
+            try:
+                action, params = self._build(items)
+                if len(items) > 1:
+                    logger.debug("合并 %s 条消息为一次 %s 发送到 %s", len(items), action, target)
+                self.batches += 1
+                data = await self.send(action, params, target, min(item.priority for item in items))
+            except Exception as e:
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+            else:
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_result(data)
+        entry[1] -= 1
+        if not entry[1]:
+            del self._locks[target]
+
+    def stats(self):
+        return {"submitted": self.submitted, "batches": self.batches, "buffered_targets": len(self._buffers)}
@@ -0,0 +1,233 @@
+import re
+import logging
+from collections import deque
+
+logger = logging.getLogger("LXBotFrame.command")
+
+# 命令触发器在插件方法上的标记属性名
+TRIGGER_ATTR = '_lx_triggers'
+
+def _mark(func, trigger):
+    triggers = getattr(func, TRIGGER_ATTR, None)
+    if triggers is None:
+        triggers = []
+        setattr(func, TRIGGER_ATTR, triggers)
+    triggers.append(trigger)
+    return func
+
+def on_command(name, aliases=(), prefixes=None):
+    """
+    注册命令，消息以 前缀+命令名 开头且其后为空白或结尾时触发
+    name: 命令名
+    aliases: 命令别名
+    prefixes: 命令前缀，为None时使用配置中的 command_prefixes
+    处理函数签名：async def handler(self, event, args, bot)
+    """
+    return lambda func: _mark(func, ('command', name, tuple(aliases), prefixes))
+
+def on_keyword(*keywords):
+    """
+    注册关键词，消息中包含任意一个关键词时触发
+    处理函数签名：async def handler(self, event, args, bot)
+    """
+    return lambda func: _mark(func, ('keyword', keywords))
+
+def on_regex(pattern, flags=0):
+    """
+    注册正则表达式，消息中能搜索到该表达式时触发
+    处理函数签名：async def handler(self, event, args, bot)
+    """
+    return lambda func: _mark(func, ('regex', pattern, flags))
+
+class CommandArgs:
+    """传给命令处理函数的解析结果"""
+    __slots__ = ('trigger', 'text', 'argv', 'match')
+
+    def __init__(self, trigger, text, match=None):
+        self.trigger = trigger  # 命中的命令名、关键词或正则表达式
+        self.text = text  # 命令名之后的参数文本，关键词与正则触发时为整条消息
+        self.argv = text.split()  # 按空白拆分后的参数列表
+        self.match = match  # 正则触发时为 re.Match 对象
+
+    def __repr__(self):
+        return f"CommandArgs(trigger={self.trigger!r}, text={self.text!r})"
+
+class Handler:
+    """注册到命令表中的一个处理函数"""
+    __slots__ = ('plugin', 'func', 'groups')
+
+    def __init__(self, plugin, func, groups=None):
+        self.plugin = plugin  # 插件类名
+        self.func = func
+        self.groups = groups  # 插件声明的群白名单
+
+class CommandTrie:
+    """命令前缀树，一次从头扫描即可找到最长匹配的命令"""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, word, value):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(value)
+
+    def match(self, text):
+        """
+        返回值：(命令末尾位置, [value, ...])，没有命中时为 (0, None)
+        命令之后必须是空白或消息结尾，避免 /help 命中 /helper
+        """
+        node = self.root
+        best_end, best = 0, None
+        length = len(text)
+        for i, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node and (i + 1 == length or text[i + 1].isspace()):
+                best_end, best = i + 1, node[None]
+        return best_end, best
+
+class AhoCorasick:
+    """Aho-Corasick 多关键词自动机，扫描一遍消息即可找出所有出现的关键词"""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            state = next_state
+        self.output[state] = self.output[state] + (keyword,)
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """返回值：消息中出现过的关键词集合"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+class CommandRegistry:
+    """
+    框架级命令表
+    插件用 on_command / on_keyword / on_regex 装饰处理函数，加载时统一编译成
+    一棵命令前缀树和一个关键词自动机，每条消息只扫描一次；正则触发器逐个匹配
+    """
+
+    def __init__(self, prefixes=('/',)):
+        """
+        prefixes: 默认命令前缀
+        """
+        self.prefixes = tuple(prefixes)
+        self.commands = []  # (命令名, 别名, 前缀, Handler)
+        self.keywords = {}  # 关键词 -> [Handler]
+        self.regexes = []  # (re.Pattern, Handler)
+        self._trie = None
+        self._automaton = None
+
+    def clear(self):
+        self.commands.clear()
+        self.keywords.clear()
+        self.regexes.clear()
+        self._trie = None
+
+    def register_plugin(self, class_name, plugin_instance):
+        """扫描插件实例上带有触发器标记的方法并注册，插件声明的群白名单同样生效"""
+        groups = getattr(plugin_instance, 'groups', None)
+        if groups is not None:
+            groups = frozenset([groups] if isinstance(groups, (str, int)) else groups)
+        for attr_name in dir(type(plugin_instance)):
+            triggers = getattr(getattr(type(plugin_instance), attr_name, None), TRIGGER_ATTR, None)
+            if not triggers:
+                continue
+            handler = Handler(class_name, getattr(plugin_instance, attr_name), groups)
+            for trigger in triggers:
+                self.add(trigger, handler)
+
+    def add(self, trigger, handler):
+        """注册单个触发器"""
+        kind = trigger[0]
+        if kind == 'command':
+            _, name, aliases, prefixes = trigger
+            self.commands.append((name, aliases, prefixes, handler))
+        elif kind == 'keyword':
+            for keyword in trigger[1]:
+                self.keywords.setdefault(keyword, []).append(handler)
+        elif kind == 'regex':
+            self.regexes.append((re.compile(trigger[1], trigger[2]), handler))
+        self._trie = None
+
+    def compile(self):
+        """把已注册的触发器编译成匹配结构"""
+        self._trie = CommandTrie()
+        for name, aliases, prefixes, handler in self.commands:
+            for prefix in (self.prefixes if prefixes is None else prefixes):
+                for word in (name,) + tuple(aliases):
+                    self._trie.insert(prefix + word, (name, handler))
+        self._automaton = AhoCorasick(self.keywords) if self.keywords else None
+        logger.debug("命令表已编译: %s 个命令, %s 个关键词, %s 个正则", len(self.commands), len(self.keywords), len(self.regexes))
+
+    def match(self, text, group_id=None):
+        """
+        找出一条消息命中的所有处理函数
+        返回值：[(Handler, CommandArgs), ...]
+        """
+        if self._trie is None:
+            self.compile()
+        results = []
+
+        end, values = self._trie.match(text)
+        if values:
+            rest = text[end:].strip()
+            for name, handler in values:
+                results.append((handler, CommandArgs(name, rest)))
+
+        if self._automaton is not None:
+            # 同一个处理函数命中多个关键词时只调用一次
+            seen = set()
+            for keyword in self._automaton.search(text):
+                for handler in self.keywords[keyword]:
+                    if id(handler) not in seen:
+                        seen.add(id(handler))
+                        results.append((handler, CommandArgs(keyword, text)))
+
+        # 合并成一个大正则会丢失各自的 flags，且前瞻分组在正则较多时反而慢得多，这里逐个匹配
+        for pattern, handler in self.regexes:
+            match = pattern.search(text)
+            if match:
+                results.append((handler, CommandArgs(pattern.pattern, text, match)))
+
+        return [(handler, args) for handler, args in results
+                if handler.groups is None or group_id is None or group_id in handler.groups]
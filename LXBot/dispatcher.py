@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from collections import deque
+from metrics import REGISTRY
+
+logger = logging.getLogger("LXBotFrame.dispatcher")
+
+EVENTS_DROPPED = REGISTRY.counter("lxbot_events_dropped_total", "队列已满时丢弃的事件数", ("post_type",))
+
+# 队列已满时的丢弃策略：newest 丢弃新到的事件，oldest 丢弃最早入队、尚未开始处理的事件
+DROP_POLICIES = ('newest', 'oldest')
+
+def conversation_key(event):
+    """
+    计算事件所属的会话，同一会话内的事件按到达顺序处理
+    群事件按 group_id 区分，其余按 user_id 区分，两者都没有的事件不受顺序约束
+    """
+    group_id = event.get('group_id')
+    if group_id is not None:
+        return ('group', group_id)
+    user_id = event.get('user_id')
+    if user_id is not None:
+        return ('user', user_id)
+    return None
+
+class EventDispatcher:
+    """
+    并发事件分发器
+    接收循环只负责把事件放入有界队列，由固定数量的工作协程取出处理；
+    不同会话的事件并行处理，同一会话的事件仍按顺序依次交给插件
+    队列已满时按 drop_policy 丢弃事件而不是等待：Api响应与事件走同一个连接，
+    接收循环若等待队列空位，等待Api响应的插件就永远等不到响应，工作协程也无法腾出位置
+    """
+
+    def __init__(self, handler, workers=8, queue_size=1000, lag_warning=1.0, drop_policy='newest', drop_report_interval=10.0):
+        """
+        handler: 处理单个事件的协程函数
+        workers: 工作协程数量
+        queue_size: 等待处理的事件上限（包括同一会话中排在正在处理的事件之后的事件）
+        lag_warning: 事件排队时间超过该值（秒）时输出警告
+        drop_policy: 队列已满时的丢弃策略，见 DROP_POLICIES
+        drop_report_interval: 持续丢弃事件时，每隔该秒数汇总输出一条警告
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"未知的丢弃策略: {drop_policy}，可选值: {', '.join(DROP_POLICIES)}")
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.lag_warning = lag_warning
+        self.drop_policy = drop_policy
+        self.drop_report_interval = drop_report_interval
+        self._queue = None
+        self._active = {}  # 正在处理中的会话 -> 该会话后续到达的事件
+        self._pending = 0  # 队列与会话积压中的事件总数
+        self._tasks = []
+        self._last_warning = 0.0
+        self._unreported_drops = 0  # 还没有输出警告的丢弃数
+        self._drop_timer = None  # 汇总丢弃数的定时器，没有在丢弃事件时为None
+        self.observers = []  # 事件入队前同步调用的回调，如缓存失效处理
+        # 统计信息
+        self.processed = 0
+        self.dropped = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+
+    def start(self):
+        """启动工作协程"""
+        # 会话积压中的事件也计入上限，队列中的事件数不会超过 queue_size，放入时不会失败
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("事件分发器已启动，工作协程数: %s，队列上限: %s", self.workers, self.queue_size)
+
+    async def stop(self):
+        """停止所有工作协程"""
+        if self._drop_timer is not None:
+            self._drop_timer.cancel()
+            self._drop_timer = None
+            self._unreported_drops = 0
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def put(self, event, waiter=None):
+        """
+        投递一个事件，不会阻塞接收循环
+        waiter: 可选的 Future，事件处理完毕后被设置结果
+        返回值：是否成功入队，队列已满且丢弃的是这个事件时返回False
+        """
+        for observer in self.observers:
+            try:
+                observer(event)
+            except Exception as e:
+                logger.error("事件观察者执行出错: %s", e)
+        if self._pending >= self.queue_size:
+            if self.drop_policy == 'oldest' and not self._queue.empty():
+                # 丢弃最早入队、还没开始处理的事件，为新事件腾出位置；
+                # 积压在会话中的事件已经排好顺序，不在丢弃范围内
+                _, oldest, _, oldest_waiter = self._queue.get_nowait()
+                self._pending -= 1
+                self._drop(oldest, oldest_waiter)
+            else:
+                self._drop(event, waiter)
+                return False
+        self._pending += 1
+        self._queue.put_nowait((conversation_key(event), event, asyncio.get_running_loop().time(), waiter))
+        return True
+
+    def _drop(self, event, waiter):
+        self.dropped += 1
+        EVENTS_DROPPED.inc(event.get('post_type'))
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        # 过载时每个事件都输出警告会淹没日志，开始丢弃时输出一条，之后每隔一段时间汇总一次
+        if self._drop_timer is None:
+            logger.warning("事件队列已满(%s)，按 %s 策略丢弃事件", self.queue_size, self.drop_policy)
+            self._drop_timer = asyncio.get_running_loop().call_later(self.drop_report_interval, self._report_drops)
+        else:
+            self._unreported_drops += 1
+
+    def _report_drops(self):
+        count = self._unreported_drops
+        self._unreported_drops = 0
+        if count:
+            # 仍在过载，继续定时汇总
+            logger.warning("过去 %gs 内因队列已满又丢弃了 %s 个事件，累计丢弃 %s 个", self.drop_report_interval, count, self.dropped)
+            self._drop_timer = asyncio.get_running_loop().call_later(self.drop_report_interval, self._report_drops)
+        else:
+            # 一个周期内没有再丢弃，下次丢弃时重新输出
+            self._drop_timer = None
+
+    def stats(self):
+        """返回队列深度与排队延迟等统计信息"""
+        return {
+            "pending": self._pending,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "active_conversations": len(self._active),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "lag_last": self.lag_last,
+            "lag_max": self.lag_max,
+        }
+
+    async def _worker(self):
+        while True:
+            key, event, enqueued, waiter = await self._queue.get()
+            if key is None:
+                await self._process(event, enqueued, waiter)
+                continue
+            backlog = self._active.get(key)
+            if backlog is not None:
+                # 该会话正在被其他工作协程处理，排到它的积压队列后面
+                backlog.append((event, enqueued, waiter))
+                continue
+            backlog = self._active[key] = deque()
+            try:
+                await self._process(event, enqueued, waiter)
+                while backlog:
+                    await self._process(*backlog.popleft())
+            finally:
+                del self._active[key]
+
+    async def _process(self, event, enqueued, waiter=None):
+        loop = asyncio.get_running_loop()
+        lag = loop.time() - enqueued
+        self.lag_last = lag
+        if lag > self.lag_max:
+            self.lag_max = lag
+        if lag > self.lag_warning and loop.time() - self._last_warning > 10:
+            self._last_warning = loop.time()
+            logger.warning("事件排队延迟 %.3fs，当前积压 %s 个事件", lag, self._pending)
+        try:
+            await self.handler(event)
+        except Exception as e:
+            logger.error("处理事件时出错: %s", e)
+        finally:
+            self._pending -= 1
+            self.processed += 1
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
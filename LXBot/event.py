@@ -0,0 +1,138 @@
+import json
+import logging
+from message import parse_message
+
+logger = logging.getLogger("LXBotFrame.event")
+
+# 优先使用更快的 JSON 解析库，都没有安装时退回标准库
+try:
+    import orjson
+
+    def decode(raw):
+        """解析一帧 JSON 数据"""
+        return orjson.loads(raw)
+
+    DECODER = "orjson"
+except ImportError:
+    try:
+        import msgspec
+
+        _decoder = msgspec.json.Decoder()
+
+        def decode(raw):
+            """解析一帧 JSON 数据"""
+            return _decoder.decode(raw.encode() if isinstance(raw, str) else raw)
+
+        DECODER = "msgspec"
+        DecodeError = (ValueError, msgspec.DecodeError)
+    except ImportError:
+        decode = json.loads
+        DECODER = "json"
+
+if DECODER != "msgspec":
+    # orjson 与标准库的解析错误都是 ValueError 的子类
+    DecodeError = ValueError
+
+def _field(name):
+    # 以属性方式读取字段，不存在时返回None
+    return property(lambda self: self.get(name))
+
+class Event(dict):
+    """
+    OneBot 上报事件
+    仍然是一个 dict，旧插件的 event.get('user_id') 写法照常可用；
+    常用字段也可以用 event.user_id 这样的属性方式读取，不存在时返回None
+    """
+    __slots__ = ()
+
+    # 常用字段可以直接以属性读取，其余字段仍用 dict 的方式读取；
+    # 这里刻意不定义 __getattr__，否则所有属性访问（包括 dict.get）都会变慢
+    time = _field('time')
+    self_id = _field('self_id')
+    post_type = _field('post_type')
+    sub_type = _field('sub_type')
+    user_id = _field('user_id')
+    group_id = _field('group_id')
+
+class MessageEvent(Event):
+    """
+    消息事件
+    message 为CQ码字符串时，第一次访问 segments 才解析为消息段列表；
+    为消息段数组时 JSON 解析已经生成了列表，segments 直接返回它，没有可以推迟的工作
+    """
+    __slots__ = ('_segments', '_plain_text')
+
+    message_type = _field('message_type')
+    message_id = _field('message_id')
+    raw_message = _field('raw_message')
+    sender = _field('sender')
+
+    @property
+    def segments(self):
+        try:
+            return self._segments
+        except AttributeError:
+            self._segments = _to_segments(self.get('message'))
+            return self._segments
+
+    @property
+    def plain_text(self):
+        """消息中的纯文本部分"""
+        try:
+            return self._plain_text
+        except AttributeError:
+            self._plain_text = "".join(segment["data"].get("text", "") for segment in self.segments
+                                       if segment["type"] == "text")
+            return self._plain_text
+
+    @property
+    def is_group(self):
+        return self.get('message_type') == 'group'
+
+class NoticeEvent(Event):
+    """通知事件"""
+    __slots__ = ()
+
+    notice_type = _field('notice_type')
+
+class RequestEvent(Event):
+    """请求事件"""
+    __slots__ = ()
+
+    request_type = _field('request_type')
+
+class MetaEvent(Event):
+    """元事件"""
+    __slots__ = ()
+
+    meta_event_type = _field('meta_event_type')
+
+EVENT_CLASSES = {
+    'message': MessageEvent,
+    'message_sent': MessageEvent,
+    'notice': NoticeEvent,
+    'request': RequestEvent,
+    'meta_event': MetaEvent,
+}
+
+def make_event(data):
+    """把解析出的 dict 包装为对应的事件类型，Api响应等非事件数据原样返回"""
+    event_class = EVENT_CLASSES.get(data.get('post_type'))
+    return data if event_class is None else event_class(data)
+
+def event_id(event):
+    """事件的标识，用于在日志中关联同一事件；消息取 message_id，请求取 flag"""
+    value = event.get('message_id') or event.get('flag')
+    if value is None:
+        value = "{}:{}:{}".format(event.get('post_type'), event.get('self_id'), event.get('time'))
+    return str(value)
+
+def decode_event(raw):
+    """解析一帧数据并包装为事件对象"""
+    return make_event(decode(raw))
+
+def _to_segments(message):
+    # 消息段数组直接使用(不复制)，CQ码字符串形式的消息经缓存的解析器转换
+    if isinstance(message, list):
+        return message
+    return parse_message(message)
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from event import event_id
+from metrics import REGISTRY, PLUGIN_ERRORS, PLUGIN_LATENCY
+
+logger = logging.getLogger("LXBotFrame.guard")
+access_logger = logging.getLogger("LXBotFrame.access")
+
+PLUGIN_TIMEOUTS = REGISTRY.counter("lxbot_plugin_timeouts_total", "插件处理超时被取消的次数", ("plugin",))
+PLUGIN_BREAKER_TRIPS = REGISTRY.counter("lxbot_plugin_breaker_trips_total", "插件熔断次数", ("plugin",))
+PLUGIN_SKIPPED = REGISTRY.counter("lxbot_plugin_skipped_total", "熔断期间跳过的事件数", ("plugin",))
+
+class CircuitBreaker:
+    """
+    熔断器
+    连续失败 threshold 次后断开 cooldown 秒，期间不再调用；
+    冷却结束后放行一次试探调用，成功则恢复，失败则再次断开
+    """
+
+    def __init__(self, threshold=5, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0  # 连续失败次数
+        self.open_until = None  # 断开状态的结束时间，None 表示闭合
+        self.trial = False  # 是否有试探调用正在进行
+
+    @property
+    def is_open(self):
+        return self.open_until is not None
+
+    def allow(self):
+        """返回值：本次是否允许调用"""
+        if self.open_until is None:
+            return True
+        if self.trial or time.monotonic() < self.open_until:
+            return False
+        self.trial = True
+        return True
+
+    def record_success(self):
+        """返回值：是否由断开恢复为闭合"""
+        recovered = self.open_until is not None
+        self.failures = 0
+        self.open_until = None
+        self.trial = False
+        return recovered
+
+    def record_failure(self):
+        """返回值：是否因本次失败而断开"""
+        self.failures += 1
+        if self.trial or (self.open_until is None and self.threshold and self.failures >= self.threshold):
+            self.trial = False
+            self.open_until = time.monotonic() + self.cooldown
+            return True
+        return False
+
+class TimeoutSweeper:
+    """
+    统一检查插件处理是否超时
+    每次处理只登记所在任务的截止时间，由一个后台任务每隔 resolution 秒取消已超时的任务；
+    相比为每次处理创建计时器(wait_for / asyncio.timeout)开销小得多，代价是超时最多晚 resolution 秒
+    """
+
+    def __init__(self, resolution=0.5):
+        self.resolution = resolution
+        self.deadlines = {}  # 任务 -> 截止时间(time.perf_counter)
+        self.expired = set()  # 因超时被取消的任务
+        self._task = None
+        self._loop = None  # 检查任务所在的事件循环，检查任务退出后为None
+
+    def watch(self, deadline):
+        """
+        登记当前任务的截止时间
+        deadline: time.perf_counter() 的截止值，调用方通常已经取过开始时间，省去再读一次时钟
+        返回值：当前任务，处理结束后传给 unwatch
+        """
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task(loop)
+        self.deadlines[task] = deadline
+        # 检查任务没有运行，或运行在已经停止的事件循环中(例如先后运行多个事件循环)时，在当前循环中启动
+        if self._loop is not loop:
+            self._loop = loop
+            self._task = loop.create_task(self._sweep())
+        return task
+
+    def unwatch(self, task):
+        """返回值：该任务是否因超时被取消"""
+        self.deadlines.pop(task, None)
+        if task in self.expired:
+            self.expired.discard(task)
+            return True
+        return False
+
+    async def _sweep(self):
+        # 先等待一个周期再检查：大多数处理在一个周期内就已结束，
+        # 若先检查，检查任务会在每次处理后立即退出，下次登记时又要重新创建；
+        # 一个周期内没有需要检查的任务时退出，下次登记时再启动
+        # 事件循环关闭时未结束的协程会在循环外被关闭，这里提前取得当前任务
+        current = asyncio.current_task()
+        try:
+            while True:
+                await asyncio.sleep(self.resolution)
+                if not self.deadlines:
+                    break
+                now = time.perf_counter()
+                for task, deadline in list(self.deadlines.items()):
+                    if now >= deadline and task not in self.expired:
+                        self.expired.add(task)
+                        task.cancel()
+        finally:
+            if self._task is current:
+                self._task = None
+                self._loop = None
+
+    async def stop(self):
+        """停止当前事件循环中的检查任务，关闭事件循环前调用"""
+        task = self._task
+        if task is None or self._loop is not asyncio.get_running_loop():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+_sweeper = TimeoutSweeper()
+
+async def stop_sweeper():
+    """停止超时检查任务，用于自行创建并关闭事件循环的场景(如基准测试)"""
+    await _sweeper.stop()
+
+class PluginGuard:
+    """
+    单个插件的执行保护：超时取消、并发上限与熔断
+    name: 插件类名
+    timeout: 单次处理的时间上限（秒），0 表示不限
+    concurrency: 同时处理的事件数上限，0 表示不限
+    """
+
+    def __init__(self, name, timeout=30.0, concurrency=0, breaker=None):
+        self.name = name
+        self.timeout = timeout or None
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self.breaker = breaker or CircuitBreaker()
+        self._observe = PLUGIN_LATENCY.bind(name)
+
+    async def run(self, coro, event=None):
+        """
+        执行插件的一次处理，异常与超时只记录，不向外抛出，并记录耗时
+        每个事件、每个插件都会经过这里，因此只用一层协程，未设置的超时与并发上限不产生开销
+        event: 正在处理的事件，用于日志
+        返回值：是否实际执行（熔断期间为False）
+        """
+        breaker = self.breaker
+        if breaker.open_until is not None and not breaker.allow():
+            # 熔断期间直接丢弃这次调用
+            coro.close()
+            PLUGIN_SKIPPED.inc(self.name)
+            return False
+        start = time.perf_counter()
+        semaphore = self.semaphore
+        if semaphore is not None:
+            await semaphore.acquire()
+        task = None
+        if self.timeout:
+            task = _sweeper.watch(start + self.timeout)
+        try:
+            await coro
+        except asyncio.CancelledError:
+            if task is None or not _sweeper.unwatch(task):
+                raise
+            # 取消来自超时检查而不是外部，撤销这次取消，让调用方照常继续
+            if hasattr(task, 'uncancel'):
+                task.uncancel()
+            task = None
+            PLUGIN_TIMEOUTS.inc(self.name)
+            logger.warning("插件 %s 处理超过 %ss，已取消", self.name, self.timeout)
+            self._failed()
+        except Exception as e:
+            PLUGIN_ERRORS.inc(self.name)
+            logger.error("插件 %s 处理事件时出错: %s", self.name, e, exc_info=True)
+            self._failed()
+        else:
+            if (breaker.failures or breaker.open_until is not None) and breaker.record_success():
+                logger.info("插件 %s 已恢复，重新开始分发事件", self.name)
+        finally:
+            if task is not None:
+                _sweeper.unwatch(task)
+            if semaphore is not None:
+                semaphore.release()
+        latency = time.perf_counter() - start
+        self._observe(latency)
+        if access_logger.isEnabledFor(logging.INFO):
+            access_logger.info("插件 %s 处理事件耗时 %.3fs", self.name, latency,
+                               extra={'event_id': event_id(event), 'plugin': self.name, 'latency': round(latency, 6)})
+        return True
+
+    def _failed(self):
+        if self.breaker.record_failure():
+            PLUGIN_BREAKER_TRIPS.inc(self.name)
+            logger.warning("插件 %s 连续失败 %s 次，暂停分发 %ss", self.name, self.breaker.failures, self.breaker.cooldown)
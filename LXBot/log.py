@@ -1,7 +1,29 @@
 from colorama import Fore, Style
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
+import atexit
+import copy
+import glob
+import gzip
 import logging
 import json
 import datetime
+import os
+import queue
+import shutil
+import sys
+import time
+
+# 默认的日志限速配置：记录器名 -> 每秒最多输出的条数
+DEFAULT_RATE_LIMITS = {
+    "LXBotFrame.heartbeat": 0.1,
+    "api": 20,
+}
+
+# 访问日志：插件处理与Api调用各一条，带 event_id/plugin/action/latency 字段
+# 不受 log_level 影响，只写入日志文件，可用配置 log_access 关闭
+ACCESS_LOGGER = "LXBotFrame.access"
+access_logger = logging.getLogger(ACCESS_LOGGER)
 
 class ColoredFormatter(logging.Formatter):
 
@@ -15,6 +37,8 @@ class ColoredFormatter(logging.Formatter):
     }
 
     def format(self, record):
+        # 复制一份记录再着色，避免颜色代码被写进其他处理器(如日志文件)
+        record = copy.copy(record)
         # 根据日志级别获取对应颜色
         level_color = self.COLOR_MAPPING.get(record.levelname, Fore.WHITE)
         # 给日志级别添加颜色
@@ -24,38 +48,251 @@ class ColoredFormatter(logging.Formatter):
         # 返回格式化后的记录
         return super().format(record)
 
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，便于直接导入日志检索系统"""
+
+    # 通过 extra 传入时会被一并输出的字段
+    EXTRA_FIELDS = ('event_id', 'plugin', 'action', 'latency')
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class CompressedRotatingFileHandler(BaseRotatingHandler):
+    """
+    按大小和时间轮转的日志文件处理器
+    轮转出的文件在单独的线程中压缩为 .gz，只保留最新的 backup_count 个
+    filename: 当前日志文件路径
+    max_bytes: 单个文件的最大字节数，0 表示不按大小轮转
+    interval: 轮转间隔(秒)，0 表示不按时间轮转
+    backup_count: 保留的压缩文件个数，0 表示全部保留
+    """
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=0, encoding='utf-8'):
+        super().__init__(filename, 'a', encoding=encoding)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.rollover_at = time.time() + interval if interval else None
+        # 压缩在单独的线程中进行，不阻塞日志写入
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-gzip")
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.stream.tell() >= self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            root, ext = os.path.splitext(self.baseFilename)
+            rotated = "{}_{}{}".format(root, datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S'), ext)
+            # 同一秒内多次轮转时追加序号
+            index = 1
+            while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+                rotated = "{}_{}_{}{}".format(root, datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S'), index, ext)
+                index += 1
+            os.replace(self.baseFilename, rotated)
+            self._compressor.submit(self._compress, rotated)
+        self.stream = self._open()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+    def _compress(self, path):
+        try:
+            with open(path, 'rb') as src, gzip.open(path + ".gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+            self._prune()
+        except OSError as e:
+            # 日志线程里出错只能输出到标准错误
+            print(f"压缩日志文件 {path} 失败: {e}", file=sys.stderr)
+
+    def _prune(self):
+        """删除超出保留个数的旧日志"""
+        if self.backup_count <= 0:
+            return
+        root, ext = os.path.splitext(self.baseFilename)
+        archives = sorted(glob.glob(glob.escape(root) + "_*" + ext + ".gz"), key=os.path.getmtime)
+        for path in archives[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        super().close()
+        self._compressor.shutdown(wait=True)
+
+class RateLimitFilter(logging.Filter):
+    """
+    按记录器限速的过滤器，超出速率的 DEBUG/INFO 日志被丢弃，WARNING 及以上始终保留
+    limits: 记录器名 -> 每秒最多输出的条数，子记录器沿用最近的父记录器配置
+    """
+
+    def __init__(self, limits):
+        super().__init__()
+        self.limits = dict(limits)
+        self._rates = {}  # 记录器名 -> 生效的速率(无限速为 None)
+        self._buckets = {}  # 配置名 -> [令牌数, 上次补充时间, 已丢弃条数]
+
+    def _limit_for(self, name):
+        """查找记录器生效的限速配置，结果按记录器名缓存"""
+        try:
+            return self._rates[name]
+        except KeyError:
+            pass
+        key = name
+        while key and key not in self.limits:
+            key = key.rpartition('.')[0]
+        result = (key, self.limits[key]) if key else None
+        self._rates[name] = result
+        return result
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        limit = self._limit_for(record.name)
+        if limit is None:
+            return True
+        key, rate = limit
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [1.0, now, 0]
+        # 令牌桶容量为 1 秒的配额，至少允许一条
+        bucket[0] = min(max(rate, 1.0), bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            # 提示此前被限速丢弃的条数
+            record.msg = f"{record.getMessage()} (已省略 {bucket[2]} 条同类日志)"
+            record.args = None
+            bucket[2] = 0
+        return True
+
+class ExcludeFilter(logging.Filter):
+    """丢弃指定记录器的日志，用于让访问日志只写入日志文件"""
+
+    def __init__(self, name):
+        super().__init__()
+        self.excluded = name
+
+    def filter(self, record):
+        return record.name != self.excluded
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    只把日志记录放入队列，格式化与写入都交给后台线程的 QueueListener
+    日志参数会在后台线程中才被格式化，不要传入之后还会被修改的对象
+    """
+
+    def prepare(self, record):
+        return record
+
+_listener = None
+
 def setup_logging():
     """设置日志记录，包括文件日志和控制台日志"""
+    global _listener
     # 从配置文件中加载日志配置
     config = json.load(open('config/config.json', 'r', encoding='utf-8'))
     log_level = config['log_level'].upper()  # 获取日志级别并转换为大写
-    # 设置日志文件名，包含当前的日期和时间
-    log_filename = "logs/log_{}.log".format(datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S'))
+    # 当前写入的日志文件，轮转出的文件以轮转时间命名并压缩
+    log_filename = config.get('log_file', 'logs/lxbot.log')
+    os.makedirs(os.path.dirname(log_filename) or '.', exist_ok=True)
 
     # 移除所有已存在的日志处理器
+    stop_logging()
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
 
-    # 创建文件处理器
-    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
+    # 创建文件处理器，按大小和时间轮转
+    file_handler = CompressedRotatingFileHandler(
+        log_filename,
+        max_bytes=config.get('log_max_bytes', 10 * 1024 * 1024),
+        interval=config.get('log_rotate_interval', 86400),
+        backup_count=config.get('log_backup_count', 14),
+    )
     file_handler.setLevel("DEBUG")  # 设置文件处理器的日志级别为DEBUG
-    # 添加格式化器到文件处理器
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    # 添加格式化器到文件处理器，json 模式下每行一条 JSON
+    if config.get('log_format', 'text') == 'json':
+        file_handler.setFormatter(JsonFormatter(datefmt='%Y-%m-%dT%H:%M:%S'))
+    else:
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
 
     # 设置根日志记录器的日志级别
     logging.getLogger().setLevel(log_level)
-    # 添加文件处理器到根日志记录器
-    logging.getLogger().addHandler(file_handler)
+    # 访问日志单独设置为 INFO，根日志级别更高时也照常写入文件
+    access_logger.setLevel(logging.INFO if config.get('log_access', True) else logging.CRITICAL + 1)
 
     # 创建控制台处理器
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)  # 设置控制台处理器的日志级别
     # 添加格式化器到控制台处理器
     console_handler.setFormatter(ColoredFormatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s', datefmt='%H:%M:%S'))
+    console_handler.addFilter(ExcludeFilter(ACCESS_LOGGER))
+
+    # 调用方只把记录放进队列，格式化和磁盘/控制台 I/O 由后台线程完成，不阻塞事件循环
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(config.get('log_rate_limits', DEFAULT_RATE_LIMITS)))
+    logging.getLogger().addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """停止后台日志线程，写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+class ForwardHandler(logging.Handler):
+    """把其他进程发来的日志记录交给本进程同名的日志记录器，与本进程的日志一起限流、格式化与写出"""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def setup_worker_logging(log_queue, level, access_level=logging.NOTSET):
+    """
+    在子进程中设置日志，所有记录经 log_queue 交给主进程写出
+    log_queue: multiprocessing.Queue，主进程用带 ForwardHandler 的 QueueListener 读取
+    level: 日志级别，与主进程相同
+    access_level: 访问日志的级别，与主进程相同
+    """
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    logging.getLogger().setLevel(level)
+    access_logger.setLevel(access_level)
+    logging.getLogger().addHandler(QueueHandler(log_queue))
 
-    # 刷新文件处理器
-    file_handler.flush()
-    # 添加控制台处理器到根日志记录器
-    logging.getLogger().addHandler(console_handler)
+# 进程退出前确保队列中的日志全部写出
+atexit.register(stop_logging)
 
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = logging.getLogger(__name__)
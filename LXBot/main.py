@@ -1,10 +1,10 @@
 from bot import Bot
 import asyncio
-from log import setup_logging,logger
-
-setup_logging()
+from log import setup_logging,stop_logging,logger
 
 if __name__ == '__main__':
+    # 只在主进程中设置日志，进程池以 spawn 方式启动的工作进程会重新导入本模块
+    setup_logging()
 
     bot = Bot()
 
@@ -14,4 +14,5 @@ if __name__ == '__main__':
         logger.critical("Critical error occurred: {}".format(e))
     finally:
         logger.info("LXBot停止运行了呢，似乎发生了非常严重的错误呢.")
+        stop_logging()
         
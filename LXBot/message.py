@@ -0,0 +1,149 @@
+import re
+from functools import lru_cache
+
+# CQ码中需要转义的字符，参数值中额外转义逗号
+_ESCAPE_TEXT = str.maketrans({"&": "&amp;", "[": "&#91;", "]": "&#93;"})
+_ESCAPE_PARAM = str.maketrans({"&": "&amp;", "[": "&#91;", "]": "&#93;", ",": "&#44;"})
+_UNESCAPE = re.compile(r"&(amp|#91|#93|#44);")
+_UNESCAPE_MAP = {"amp": "&", "#91": "[", "#93": "]", "#44": ","}
+# 参数中不允许出现 [，未闭合的 [CQ: 只会扫描到下一个 [ 为止，避免大量未闭合的CQ码时回溯成平方复杂度
+_CQ_CODE = re.compile(r"\[CQ:([A-Za-z0-9_.\-]+)((?:,[^,\[\]]*)*)\]")
+
+def escape(text, escape_comma=False):
+    """转义CQ码中的特殊字符，escape_comma 为True时同时转义逗号（用于参数值）"""
+    return text.translate(_ESCAPE_PARAM if escape_comma else _ESCAPE_TEXT)
+
+def unescape(text):
+    """反转义CQ码中的特殊字符"""
+    if "&" not in text:
+        return text
+    return _UNESCAPE.sub(lambda m: _UNESCAPE_MAP[m.group(1)], text)
+
+@lru_cache(maxsize=4096)
+def _parse_cq(text):
+    # 解析结果以元组缓存，常见的命令与表情等重复消息不必重复解析
+    segments = []
+    position = 0
+    for match in _CQ_CODE.finditer(text):
+        start = match.start()
+        if start > position:
+            segments.append(("text", (("text", unescape(text[position:start])),)))
+        data = []
+        for param in match.group(2)[1:].split(",") if match.group(2) else ():
+            key, _, value = param.partition("=")
+            data.append((key, unescape(value)))
+        segments.append((match.group(1), tuple(data)))
+        position = match.end()
+    if position < len(text):
+        segments.append(("text", (("text", unescape(text[position:])),)))
+    return tuple(segments)
+
+def parse_cq(text):
+    """
+    把CQ码字符串解析为消息段数组
+    返回值：[{type, data}, ...]，每次调用返回新的列表，可以放心修改
+    """
+    return [{"type": type_, "data": dict(data)} for type_, data in _parse_cq(text)]
+
+def parse_message(message):
+    """把CQ码字符串或消息段数组统一转换为消息段数组"""
+    if message is None:
+        return []
+    if isinstance(message, str):
+        return parse_cq(message)
+    if isinstance(message, dict):
+        return [message]
+    return list(message)
+
+def segment_to_cq(segment):
+    """把单个消息段转换为CQ码字符串"""
+    type_ = segment["type"]
+    data = segment.get("data") or {}
+    if type_ == "text":
+        return escape(data.get("text", ""))
+    if not data:
+        return f"[CQ:{type_}]"
+    params = ",".join(f"{key}={escape(str(value), True)}" for key, value in data.items() if value is not None)
+    return f"[CQ:{type_},{params}]"
+
+def to_cq(message):
+    """把消息段数组转换为CQ码字符串"""
+    if isinstance(message, str):
+        return message
+    return "".join([segment_to_cq(segment) for segment in parse_message(message)])
+
+class MessageSegment:
+    """常用消息段的构造函数，返回 OneBot 消息段数组格式的 dict"""
+
+    @staticmethod
+    def text(text):
+        return {"type": "text", "data": {"text": text}}
+
+    @staticmethod
+    def face(id):
+        return {"type": "face", "data": {"id": str(id)}}
+
+    @staticmethod
+    def at(qq):
+        return {"type": "at", "data": {"qq": str(qq)}}
+
+    @staticmethod
+    def reply(id):
+        return {"type": "reply", "data": {"id": str(id)}}
+
+    @staticmethod
+    def image(file, **kwargs):
+        return {"type": "image", "data": dict(file=file, **kwargs)}
+
+    @staticmethod
+    def record(file, **kwargs):
+        return {"type": "record", "data": dict(file=file, **kwargs)}
+
+class Message(list):
+    """
+    出站消息构造器
+    本身是一个消息段数组，可以直接作为 message 参数发送；链式调用只追加消息段，
+    最后统一生成CQ码或数组，避免反复拼接字符串
+    """
+
+    def __init__(self, message=None):
+        super().__init__(parse_message(message))
+
+    def append_segment(self, segment):
+        # 相邻的纯文本段不在这里合并，避免反复拼接长字符串
+        self.append(segment)
+        return self
+
+    def text(self, text):
+        return self.append_segment(MessageSegment.text(text))
+
+    def face(self, id):
+        return self.append_segment(MessageSegment.face(id))
+
+    def at(self, qq):
+        return self.append_segment(MessageSegment.at(qq))
+
+    def reply(self, id):
+        return self.append_segment(MessageSegment.reply(id))
+
+    def image(self, file, **kwargs):
+        return self.append_segment(MessageSegment.image(file, **kwargs))
+
+    def record(self, file, **kwargs):
+        return self.append_segment(MessageSegment.record(file, **kwargs))
+
+    def __add__(self, other):
+        result = Message(self)
+        result.extend(parse_message(other))
+        return result
+
+    def extract_plain_text(self):
+        """消息中的纯文本部分"""
+        return "".join([segment["data"].get("text", "") for segment in self if segment["type"] == "text"])
+
+    def to_cq(self):
+        """转换为CQ码字符串"""
+        return to_cq(self)
+
+    def __str__(self):
+        return self.to_cq()
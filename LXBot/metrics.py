@@ -0,0 +1,317 @@
+import bisect
+import threading
+
+# 耗时直方图默认的分桶上界（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    只增不减的计数器
+    线程池、同步 OBApi 与看门狗线程也会更新指标，更新与导出都在锁内进行
+    """
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # 标签值元组 -> 计数
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, value=1):
+        """按标签值计数，标签值按声明顺序传入"""
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def get(self, *labels):
+        return self.values.get(labels, 0)
+
+    def total(self):
+        with self._lock:
+            return sum(self.values.values())
+
+    def items(self):
+        """返回 (标签值元组, 计数) 列表的快照"""
+        with self._lock:
+            return list(self.values.items())
+
+    def render(self):
+        for labels, value in self.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+class Gauge:
+    """
+    当前值，可以直接设置，也可以在导出时调用 func 读取
+    func: 无参数的函数，返回数值或 标签值元组 -> 数值 的字典
+    kind: 导出时声明的类型，累计值(如重连次数)由回调读取时可声明为 counter
+    """
+
+    def __init__(self, name, help, labels=(), func=None, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.func = func
+        self.kind = kind
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self.values[labels] = value
+
+    def collect(self):
+        """返回 标签值元组 -> 数值"""
+        if self.func is None:
+            with self._lock:
+                return dict(self.values)
+        value = self.func()
+        if isinstance(value, dict):
+            return value
+        return {} if value is None else {(): value}
+
+    def render(self):
+        for labels, value in self.collect().items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+class Histogram:
+    """
+    固定分桶的直方图，记录一次观测只需一次二分查找和两次加法，可以常开
+    与 Counter 相同，观测与导出都在锁内进行
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # 标签值元组 -> [各桶计数(最后一个为+Inf), 总和]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        """记录一次观测值，标签值按声明顺序传入"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self.values.get(labels)
+            if child is None:
+                child = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            child[0][index] += 1
+            child[1] += value
+
+    def bind(self, *labels):
+        """
+        返回绑定了标签值的记录函数 observe(value)，省去每次打包与查找标签值，用于每个事件都要记录的热点路径
+        绑定时即创建该标签值的序列，导出时没有观测值的序列计数为 0
+        """
+        buckets = self.buckets
+        lock = self._lock
+        with lock:
+            child = self.values.get(labels)
+            if child is None:
+                child = self.values[labels] = [[0] * (len(buckets) + 1), 0.0]
+        counts = child[0]
+
+        def observe(value):
+            index = bisect.bisect_left(buckets, value)
+            with lock:
+                counts[index] += 1
+                child[1] += value
+        return observe
+
+    def add(self, counts, total, *labels):
+        """累加另一个进程中同名直方图的各桶计数与总和，分桶不一致时忽略"""
+        if len(counts) != len(self.buckets) + 1:
+            return
+        with self._lock:
+            child = self.values.get(labels)
+            if child is None:
+                child = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            for index, count in enumerate(counts):
+                child[0][index] += count
+            child[1] += total
+
+    def count(self, *labels):
+        with self._lock:
+            child = self.values.get(labels)
+            return sum(child[0]) if child else 0
+
+    def sum(self, *labels):
+        with self._lock:
+            child = self.values.get(labels)
+            return child[1] if child else 0.0
+
+    def items(self):
+        """返回 (标签值元组, (各桶计数, 总和)) 列表的快照"""
+        with self._lock:
+            return [(labels, (list(counts), total)) for labels, (counts, total) in self.values.items()]
+
+    def quantile(self, q, *labels):
+        """
+        根据分桶估算分位数，桶内按线性插值
+        返回值：估算值，没有观测值时为None
+        """
+        with self._lock:
+            child = self.values.get(labels)
+            if not child:
+                return None
+            counts = list(child[0])
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    # 落在 +Inf 桶中，只能给出最后一个边界
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self):
+        for labels, (counts, total) in self.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="{}"'.format(_format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+class MetricsRegistry:
+    """指标注册表，同名指标只会创建一次"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=(), func=None, kind="gauge"):
+        metric = self._get_or_create(Gauge, name, help, labels, func, kind)
+        if func is not None:
+            # 重新创建 Bot 时以新的回调为准
+            metric.func = func
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def snapshot(self, exclude=()):
+        """
+        计数器与直方图当前值的快照，用于把工作进程的指标汇总到主进程
+        exclude: 跳过名称以这些前缀开头的指标
+        返回值：指标名 -> {标签值元组: 计数 或 (各桶计数, 总和)}
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        exclude = tuple(exclude)
+        return {metric.name: dict(metric.items()) for metric in metrics
+                if isinstance(metric, (Counter, Histogram)) and not (exclude and metric.name.startswith(exclude))}
+
+    def merge(self, delta):
+        """把 metrics_delta 得到的增量累加到同名指标上，本进程中没有的指标被忽略"""
+        for name, changes in delta:
+            metric = self.metrics.get(name)
+            if isinstance(metric, Counter):
+                for labels, value in changes:
+                    metric.inc(*labels, value=value)
+            elif isinstance(metric, Histogram):
+                for labels, (counts, total) in changes:
+                    metric.add(counts, total, *labels)
+
+    def render(self):
+        """按 Prometheus 文本格式导出所有指标"""
+        lines = []
+        with self._lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top=5):
+        """生成适合在聊天中发送的简要统计"""
+        events = sorted(EVENTS_TOTAL.items(), key=lambda item: -item[1])[:top]
+        lines = ["事件: " + (", ".join("{}={}".format("/".join(v for v in labels if v), value)
+                                      for labels, value in events) or "无")]
+        for title, histogram, errors in (("插件", PLUGIN_LATENCY, PLUGIN_ERRORS), ("Api", API_LATENCY, API_FAILURES)):
+            # 预先绑定的标签值在没有观测值时也有序列，跳过这些空序列
+            busiest = [labels for labels, (counts, _) in sorted(histogram.items(), key=lambda item: -item[1][1]) if any(counts)][:top]
+            lines.append(f"{title}耗时(总计/次数/p95/错误):")
+            for labels in busiest:
+                p95 = histogram.quantile(0.95, *labels)
+                lines.append("  {}: {:.3f}s/{}/{:.3f}s/{}".format(labels[0], histogram.sum(*labels), histogram.count(*labels),
+                                                              p95 or 0.0, errors.get(*labels)))
+            if not busiest:
+                lines.append("  无")
+        for name in ("lxbot_dispatch_pending", "lxbot_send_queue_depth", "lxbot_ws_reconnects_total"):
+            metric = self.metrics.get(name)
+            if metric is not None:
+                lines.append(f"{metric.help}: {sum(metric.collect().values())}")
+        return "\n".join(lines)
+
+def metrics_delta(new, old):
+    """
+    两次 snapshot 之间的增量
+    返回值：可以 JSON 编码的 [[指标名, [[标签值列表, 增量], ...]], ...]，直方图的增量为 [各桶计数, 总和]
+    """
+    delta = []
+    for name, values in new.items():
+        previous = old.get(name, {})
+        changes = []
+        for labels, value in values.items():
+            before = previous.get(labels)
+            if isinstance(value, tuple):
+                counts, total = value
+                if before is not None:
+                    if before[0] == counts:
+                        continue
+                    counts = [count - earlier for count, earlier in zip(counts, before[0])]
+                    total -= before[1]
+                elif not any(counts):
+                    continue
+                changes.append([list(labels), [counts, total]])
+            else:
+                change = value - (before or 0)
+                if change:
+                    changes.append([list(labels), change])
+        if changes:
+            delta.append([name, changes])
+    return delta
+
+# 全局注册表，OBApi 等模块级函数也能直接记录
+REGISTRY = MetricsRegistry()
+
+EVENTS_TOTAL = REGISTRY.counter("lxbot_events_total", "收到的事件数", ("post_type", "detail_type"))
+PLUGIN_LATENCY = REGISTRY.histogram("lxbot_plugin_latency_seconds", "插件处理单个事件的耗时", ("plugin",))
+PLUGIN_ERRORS = REGISTRY.counter("lxbot_plugin_errors_total", "插件处理事件时抛出的异常数", ("plugin",))
+API_LATENCY = REGISTRY.histogram("lxbot_api_latency_seconds", "Api调用耗时", ("action",))
+API_FAILURES = REGISTRY.counter("lxbot_api_failures_total", "失败的Api调用数", ("action",))
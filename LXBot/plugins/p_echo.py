@@ -1,12 +1,16 @@
 import logging
 import asyncio
-from OBApi import send_private_msg
 
 logger = logging.getLogger("LXBot.Plugin.echo")
 
 class P_echo_Plugin:
+    # 只订阅私聊消息，并忽略Bot自己发出的消息，避免复读自己
+    post_types = {'message'}
+    message_types = {'private'}
+    handle_self = False
+
     async def on_message(self, message, bot):
         message_type=message.get('message_type')
         #logger.info(f"Got message: {message}")
         if message_type == 'private':
-            send_private_msg(bot.base_url, message.get("sender").get("user_id"), message.get("raw_message") ,bot.token)
\ No newline at end of file
+            await bot.reply(message, message.get("raw_message"))
\ No newline at end of file
@@ -0,0 +1,14 @@
+import logging
+from command import on_command
+from metrics import REGISTRY
+
+logger = logging.getLogger("LXBot.Plugin.metrics")
+
+class P_metrics_Plugin:
+    # 只提供命令，不订阅普通消息
+    @on_command('metrics', aliases=('状态',))
+    async def show_metrics(self, message, args, bot):
+        # 只有管理员可以查看运行指标
+        if not bot.is_admin(message.get('user_id')):
+            return
+        await bot.reply(message, REGISTRY.summary())
@@ -0,0 +1,31 @@
+import logging
+import asyncio
+from command import on_command
+
+logger = logging.getLogger("LXBot.Plugin.profile")
+
+class P_profile_Plugin:
+    # 只提供命令，不订阅普通消息
+    @on_command('profile', aliases=('剖析',))
+    async def start_profile(self, message, args, bot):
+        """
+        /profile [秒数] [sample|cprofile]
+        只有管理员可以使用，结果保存在日志目录并回复摘要
+        """
+        if not bot.is_admin(message.get('user_id')):
+            return
+        if bot.profiler.running:
+            await bot.reply(message, "性能剖析正在进行中")
+            return
+        seconds = int(args.argv[0]) if args.argv and args.argv[0].isdigit() else 30
+        mode = args.argv[1] if len(args.argv) > 1 else None
+        await bot.reply(message, f"开始性能剖析，时长 {seconds} 秒")
+        # 在后台等待剖析结束，不占用事件处理协程
+        self._task = asyncio.create_task(self.report(message, bot, seconds, mode))
+
+    async def report(self, message, bot, seconds, mode):
+        try:
+            summary = await bot.profiler.run(seconds, mode)
+        except (RuntimeError, ValueError) as e:
+            summary = str(e)
+        await bot.reply(message, summary)
@@ -0,0 +1,38 @@
+import logging
+import random
+from command import on_command
+from procpool import run_in_process
+
+logger = logging.getLogger("LXBot.Plugin.dice")
+
+USAGE = "用法: /roll [个数]d[面数] [次数]，例如 /roll 2d6 1000"
+MAX_DICE = 100  # 每次掷骰的骰子个数上限
+MAX_SIDES = 1000  # 骰子面数上限
+MAX_ROLLS = 1000000  # 一条命令总共掷骰的次数上限，限制工作进程的占用时间
+
+# 进程池插件示例：改名为 p_dice.py 后启用
+class P_dice_Plugin:
+    @on_command('roll')
+    @run_in_process
+    def roll(self, message, args):
+        """
+        /roll 2d6 [次数]
+        多次模拟掷骰并统计平均值，计算在工作进程中进行，返回值会作为回复发出
+        """
+        spec = args.argv[0].lower() if args.argv else "1d6"
+        count, _, sides = spec.partition('d')
+        # 输入不合法时回复用法，不抛出异常，避免触发插件熔断
+        if not (count or '1').isdecimal() or not (sides or '6').isdecimal():
+            return USAGE
+        count, sides = int(count or 1), int(sides or 6)
+        if not 1 <= count <= MAX_DICE or not 1 <= sides <= MAX_SIDES:
+            return f"骰子个数应在 1~{MAX_DICE} 之间，面数应在 1~{MAX_SIDES} 之间\n{USAGE}"
+        if len(args.argv) > 1 and not args.argv[1].isdecimal():
+            return USAGE
+        trials = int(args.argv[1]) if len(args.argv) > 1 else 100000
+        trials = max(1, min(trials, MAX_ROLLS // count))
+        spec = f"{count}d{sides}"
+        total = 0
+        for _ in range(trials):
+            total += sum(random.randint(1, sides) for _ in range(count))
+        return f"{spec} 掷 {trials} 次的平均值: {total / trials:.3f}"
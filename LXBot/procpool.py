@@ -0,0 +1,179 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from command import CommandArgs
+from event import make_event
+from metrics import REGISTRY
+
+logger = logging.getLogger("LXBotFrame.procpool")
+
+# 插件方法上的进程池标记属性名
+PROCESS_ATTR = '_lx_process'
+
+PROCESS_TASKS = REGISTRY.counter("lxbot_process_tasks_total", "在进程池中执行的插件处理次数", ("plugin",))
+PROCESS_RESTARTS = REGISTRY.counter("lxbot_process_pool_restarts_total", "进程池因工作进程崩溃而重建的次数")
+
+def run_in_process(func):
+    """
+    标记插件方法在进程池中执行，适合图片生成、文本分析、模拟计算等耗CPU的处理
+    被标记的方法是普通函数，运行在工作进程里的另一个插件实例上，拿不到 bot：
+      on_message 的签名为 def on_message(self, event)
+      命令处理函数的签名为 def handler(self, event, args)，args.match 恒为None
+    返回值会回到主进程：消息(字符串或消息段列表)会回复到事件来源的会话，
+    {"action": ..., "params": ...} 或由它组成的列表会依次作为Api调用执行
+    插件类也可以声明 process_pool = True，使 on_message 在进程池中执行
+    """
+    setattr(func, PROCESS_ATTR, True)
+    return func
+
+def is_api_calls(result):
+    """返回值是否为要执行的Api调用"""
+    if isinstance(result, dict):
+        return 'action' in result
+    return isinstance(result, list) and bool(result) and all(isinstance(item, dict) and 'action' in item for item in result)
+
+async def deliver_result(bot, event, result):
+    """把在主事件循环以外执行的处理函数的返回值通过正常的Api路径发出"""
+    if result is None:
+        return
+    if is_api_calls(result):
+        api = bot.api_for(event)
+        for call in [result] if isinstance(result, dict) else result:
+            await api.call_api(call['action'], call.get('params') or {})
+    else:
+        await bot.reply(event, result)
+
+# 以下在工作进程中运行
+_instances = {}
+
+def _instance(module_name, class_name):
+    key = (module_name, class_name)
+    plugin_instance = _instances.get(key)
+    if plugin_instance is None:
+        module = importlib.import_module(module_name)
+        plugin_instance = _instances[key] = getattr(module, class_name)()
+    return plugin_instance
+
+def _init_worker(plugins):
+    """工作进程启动时预先导入并实例化插件，第一次调用不必等待"""
+    for module_name, class_name in plugins:
+        try:
+            _instance(module_name, class_name)
+        except Exception as e:
+            logger.error("工作进程加载插件 %s 失败: %s", class_name, e)
+
+def _ping():
+    return True
+
+def _call(module_name, class_name, method_name, event, command_args):
+    plugin_instance = _instance(module_name, class_name)
+    func = getattr(plugin_instance, method_name)
+    event = make_event(event)
+    if command_args is None:
+        return func(event)
+    return func(event, CommandArgs(*command_args))
+
+class PluginProcessPool:
+    """
+    插件进程池
+    被标记的插件方法在加载时替换为协程包装，包装把事件的副本发往工作进程执行，
+    再把返回值交给主进程的正常Api路径发送；工作进程崩溃时整个进程池会被重建
+    """
+
+    def __init__(self, bot, size=2, start_method="spawn"):
+        """
+        bot: Bot 实例
+        size: 工作进程数
+        start_method: 工作进程的启动方式，spawn 不会继承主进程的连接与线程
+        """
+        self.bot = bot
+        self.size = size
+        self.start_method = start_method
+        self.plugins = []  # 需要在工作进程中加载的 (模块名, 插件类名)
+        self.executor = None
+        self._restarting = None
+
+    def register(self, class_name, plugin_instance):
+        """
+        把插件中标记为在进程池中执行的方法替换为协程包装
+        返回值：是否有方法被替换
+        """
+        plugin_class = type(plugin_instance)
+        methods = [name for name in dir(plugin_class) if getattr(getattr(plugin_class, name, None), PROCESS_ATTR, False)]
+        if getattr(plugin_instance, 'process_pool', False) and hasattr(plugin_instance, 'on_message') and 'on_message' not in methods:
+            methods.append('on_message')
+        if not methods:
+            return False
+        self.plugins.append((plugin_class.__module__, plugin_class.__name__))
+        for method_name in methods:
+            setattr(plugin_instance, method_name, self._wrap(class_name, plugin_class, method_name))
+        logger.info("插件 %s 的 %s 将在进程池中执行", class_name, ", ".join(methods))
+        return True
+
+    def _wrap(self, class_name, plugin_class, method_name):
+        async def wrapper(event, *args):
+            # 最后一个参数是 bot，命令处理函数在它之前还有 args
+            command_args = (args[0].trigger, args[0].text) if len(args) > 1 else None
+            PROCESS_TASKS.inc(class_name)
+            result = await self.submit(_call, plugin_class.__module__, plugin_class.__name__, method_name,
+                                       dict(event), command_args)
+            await deliver_result(self.bot, event, result)
+        return wrapper
+
+    async def start(self):
+        """创建进程池并预热所有工作进程"""
+        self.executor = ProcessPoolExecutor(max_workers=self.size,
+                                            mp_context=multiprocessing.get_context(self.start_method),
+                                            initializer=_init_worker, initargs=(self.plugins,))
+        loop = asyncio.get_running_loop()
+        # 同时提交与进程数相同的任务，使所有工作进程都被启动并完成初始化
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _ping) for _ in range(self.size)))
+        logger.info("插件进程池已启动，工作进程数: %s", self.size)
+
+    async def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def submit(self, func, *args):
+        """在进程池中执行，进程池还没有启动时先启动，进程池已损坏时重建后重试一次"""
+        loop = asyncio.get_running_loop()
+        if self.executor is None:
+            # 没有先调用 start 时(例如嵌入使用)在这里启动，不能让 run_in_executor 退回到线程池中执行
+            if self._restarting is None:
+                logger.warning("插件进程池尚未启动，在第一次提交时启动")
+            await self._start_shared()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            await self._restart(executor)
+        # 若仍然失败(例如正是这次处理让工作进程崩溃)，异常交给调用方
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            await self._restart(executor)
+            raise
+
+    async def _restart(self, broken):
+        """工作进程崩溃后重建进程池，同时失败的多个调用只重建一次"""
+        if self.executor is not broken:
+            return
+        if self._restarting is None:
+            logger.error("插件进程池的工作进程意外退出，正在重建进程池")
+            PROCESS_RESTARTS.inc()
+            broken.shutdown(wait=False, cancel_futures=True)
+        await self._start_shared()
+
+    async def _start_shared(self):
+        """启动进程池，同时等待启动的多个调用共用一次启动"""
+        if self._restarting is None:
+            self._restarting = asyncio.ensure_future(self.start())
+        try:
+            await asyncio.shield(self._restarting)
+        finally:
+            self._restarting = None
@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import cProfile
+import datetime
+import inspect
+import logging
+import os
+import pstats
+import sys
+import threading
+
+logger = logging.getLogger("LXBotFrame.profiler")
+
+# 这些模块中的公开函数视为一次Api动作
+API_MODULES = ('OBApi.py', 'GoCQApi.py', 'client.py')
+
+def _is_api_frame(filename, name):
+    return os.path.basename(filename) in API_MODULES and not name.startswith('_') and name != 'call_api'
+
+def plugin_files(loaded_plugins):
+    """插件源文件路径 -> 插件类名"""
+    files = {}
+    for class_name, plugin_instance in loaded_plugins.items():
+        try:
+            filename = inspect.getfile(type(plugin_instance))
+        except (TypeError, OSError):
+            continue
+        # 调用栈里的文件名可能是相对路径，两种写法都记录
+        files[filename] = class_name
+        files[os.path.abspath(filename)] = class_name
+    return files
+
+def walk_stack(frame, files):
+    """
+    由内向外遍历调用栈，由内向外找到的第一个插件与Api函数即为这段栈的归属
+    files: plugin_files() 的返回值
+    返回值：(由外到内的 "模块:函数" 列表, 插件类名, Api函数名, 事件类型)，找不到的项为None
+    """
+    stack = []
+    plugin = action = event_type = None
+    while frame is not None:
+        code = frame.f_code
+        stack.append("{}:{}".format(os.path.splitext(os.path.basename(code.co_filename))[0], code.co_name))
+        if code.co_name == 'run' and os.path.basename(code.co_filename) == 'guard.py':
+            # PluginGuard.run 的局部变量中有插件的执行保护与正在处理的事件
+            frame_locals = frame.f_locals
+            guard = frame_locals.get('self')
+            plugin = plugin or getattr(guard, 'name', None)
+            event = frame_locals.get('event')
+            if event_type is None and isinstance(event, dict):
+                event_type = "{}/{}".format(event.get('post_type'), event.get('message_type') or event.get('notice_type') or event.get('request_type'))
+        elif plugin is None and code.co_filename in files:
+            plugin = files[code.co_filename]
+        if action is None and _is_api_frame(code.co_filename, code.co_name):
+            action = code.co_name
+        frame = frame.f_back
+    stack.reverse()
+    return stack, plugin, action, event_type
+
+class Profiler:
+    """
+    按需开启的性能剖析器，未运行时不安装任何钩子，没有额外开销
+    sample 模式由辅助线程定时采集事件循环线程的调用栈，输出火焰图可用的折叠栈；
+    cprofile 模式在事件循环线程上运行 cProfile，输出 pstats 文件
+    两种模式都会把耗时归到插件类与Api动作上
+    """
+
+    def __init__(self, bot, output_dir="logs", mode="sample", interval=0.005):
+        """
+        bot: Bot 实例
+        output_dir: 剖析结果的输出目录
+        mode: 默认模式，sample 或 cprofile
+        interval: sample 模式的采样间隔（秒）
+        """
+        self.bot = bot
+        self.output_dir = output_dir
+        self.mode = mode
+        self.interval = interval
+        self.running = False
+        self._task = None
+
+    def trigger(self, seconds=30, mode=None):
+        """在后台开始一次剖析，供信号处理函数调用"""
+        if self.running:
+            logger.warning("性能剖析正在进行中")
+            return
+        self._task = asyncio.create_task(self.run(seconds, mode))
+
+    async def run(self, seconds=30, mode=None):
+        """
+        剖析接下来 seconds 秒内事件循环线程上的耗时
+        返回值：剖析结果摘要
+        """
+        if self.running:
+            raise RuntimeError("性能剖析正在进行中")
+        mode = mode or self.mode
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"未知的剖析模式: {mode}")
+        self.running = True
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, "profile_{}".format(datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S')))
+        logger.info("开始性能剖析，模式: %s，时长: %ss", mode, seconds)
+        try:
+            if mode == "cprofile":
+                summary = await self._run_cprofile(seconds, prefix)
+            else:
+                summary = await self._run_sampling(seconds, prefix)
+        finally:
+            self.running = False
+        logger.info("性能剖析结束\n%s", summary)
+        return summary
+
+    async def _run_cprofile(self, seconds, prefix):
+        profile = cProfile.Profile()
+        # cProfile 只剖析调用 enable 的线程，这里就是事件循环线程
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        path = prefix + ".pstats"
+        profile.dump_stats(path)
+
+        files = plugin_files(self.bot.loaded_plugins)
+        plugins = collections.Counter()
+        actions = collections.Counter()
+        stats = pstats.Stats(profile).stats
+        for (filename, line, name), (cc, nc, tottime, cumtime, callers) in stats.items():
+            plugin = files.get(filename)
+            if plugin is not None:
+                # 插件自身代码的耗时
+                plugins[plugin] += tottime
+            if filename and _is_api_frame(filename, name):
+                actions[name] += cumtime
+        return self._summary(path, "秒", plugins, actions)
+
+    async def _run_sampling(self, seconds, prefix):
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        loop.call_later(seconds, stop.set)
+        # 采样的是事件循环所在的线程
+        stacks, plugins, actions, event_types = await asyncio.to_thread(
+            self._sample, threading.get_ident(), stop, plugin_files(self.bot.loaded_plugins))
+
+        path = prefix + ".collapsed"
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write("{} {}\n".format(";".join(stack), count))
+        summary = self._summary(path, "次采样", plugins, actions)
+        if event_types:
+            summary += "\n事件类型: " + ", ".join(f"{key}={count}" for key, count in event_types.most_common(5))
+        return summary
+
+    def _sample(self, thread_id, stop, files):
+        """在辅助线程中定时采集指定线程的调用栈"""
+        stacks = collections.Counter()
+        plugins = collections.Counter()
+        actions = collections.Counter()
+        event_types = collections.Counter()
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack, plugin, action, event_type = walk_stack(frame, files)
+            stacks[tuple(stack)] += 1
+            if plugin is not None:
+                plugins[plugin] += 1
+            if action is not None:
+                actions[action] += 1
+            if event_type is not None:
+                event_types[event_type] += 1
+        return stacks, plugins, actions, event_types
+
+    def _summary(self, path, unit, plugins, actions):
+        lines = [f"结果已保存到 {path}"]
+        for title, counter in (("插件耗时:", plugins), ("Api动作耗时:", actions)):
+            lines.append(title)
+            lines += ["  {}: {}{}".format(name, round(value, 3), unit) for name, value in counter.most_common(10)] or ["  无"]
+        return "\n".join(lines)
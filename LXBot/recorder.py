@@ -0,0 +1,95 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger("LXBotFrame.recorder")
+
+_STOP = object()
+
+class FrameRecorder:
+    """
+    原始帧录制器，把收到的每一帧连同时间戳追加写入 gzip 压缩文件
+    接收循环只把帧放进队列，序列化、压缩与磁盘写入都在后台线程中成批完成；
+    每次打开都以追加方式写入新的 gzip 成员，可以用 read_frames 连续读出
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=1000):
+        """
+        path: 录制文件路径，通常以 .gz 结尾
+        flush_interval: 最长多久把缓冲写入磁盘（秒）
+        batch_size: 缓冲多少帧后立即写入
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.recorded = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="frame-recorder", daemon=True)
+        self._thread.start()
+        logger.info("开始录制原始帧到 %s", self.path)
+
+    def stop(self):
+        """写完剩余的帧并关闭文件"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def record(self, raw):
+        """记录一帧，raw 为收到的原始文本或字节"""
+        self._queue.put((time.time(), raw))
+
+    def _write_loop(self):
+        with gzip.open(self.path, 'ab') as f:
+            running = True
+            while running:
+                try:
+                    items = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                # 取出当前已排队的帧，成批写入
+                while len(items) < self.batch_size:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = []
+                for item in items:
+                    if item is _STOP:
+                        running = False
+                        continue
+                    timestamp, raw = item
+                    if isinstance(raw, bytes):
+                        raw = raw.decode('utf-8', errors='replace')
+                    lines.append(json.dumps([timestamp, raw], ensure_ascii=False))
+                if lines:
+                    f.write(("\n".join(lines) + "\n").encode('utf-8'))
+                    # 同步刷新压缩流，进程异常退出时已写入的帧仍可读出
+                    f.flush()
+                    self.recorded += len(lines)
+
+def read_frames(path):
+    """
+    读出录制文件中的所有帧
+    返回值：依次产生 (时间戳, 原始帧文本) 的生成器
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                try:
+                    timestamp, raw = json.loads(line)
+                except ValueError:
+                    # 进程被强制结束时最后一行可能不完整
+                    break
+                yield timestamp, raw
+        except EOFError:
+            # 最后一个 gzip 成员没有正常结束
+            pass
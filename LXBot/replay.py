@@ -0,0 +1,137 @@
+"""
+回放录制的原始帧
+把 FrameRecorder 录制的事件按原速、N 倍速或最快速度送入分发器，插件照常执行，
+发出的Api调用（包括同步 OBApi）都由桩实现直接返回成功，不会真的发送
+
+用法（在 LXBot 目录下）: python replay.py capture.gz [--speed 1] [--config config/config.json]
+--speed 0 表示不等待，以最快速度回放
+"""
+import argparse
+import asyncio
+import json
+import requests
+from requests.adapters import BaseAdapter
+import Api
+from bot import Bot
+from event import decode_event, DecodeError
+from metrics import REGISTRY
+from recorder import read_frames
+
+def stub_data(action):
+    """Api桩的返回数据"""
+    if action == "get_login_info":
+        return {"user_id": 0, "nickname": "replay"}
+    if action == "can_send_record":
+        return {"yes": True}
+    if action.startswith("send_"):
+        return {"message_id": 0}
+    if action.endswith("_list"):
+        return []
+    return {}
+
+class StubTransport:
+    """异步Api客户端的桩传输层，只统计调用次数"""
+
+    def __init__(self):
+        self.calls = {}  # 动作 -> 调用次数
+
+    async def request(self, action, params):
+        self.calls[action] = self.calls.get(action, 0) + 1
+        return {"status": "ok", "retcode": 0, "data": stub_data(action)}
+
+    async def close(self):
+        pass
+
+class StubAdapter(BaseAdapter):
+    """挂到同步Api会话上的桩，OBApi 的请求不会离开本进程"""
+
+    def __init__(self, calls):
+        super().__init__()
+        self.calls = calls
+
+    def send(self, request, **kwargs):
+        action = request.path_url.split('?', 1)[0].rsplit('/', 1)[-1]
+        self.calls[action] = self.calls.get(action, 0) + 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"status": "ok", "retcode": 0, "data": stub_data(action)}).encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+async def replay(bot, path, speed=1.0):
+    """
+    把录制文件中的事件送入 bot 的分发器
+    speed: 回放倍速，0 表示不等待
+    返回值：(回放的事件数, 耗时秒数)
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first = None
+    count = 0
+    for timestamp, raw in read_frames(path):
+        try:
+            data = decode_event(raw)
+        except DecodeError:
+            continue
+        # 录制文件中的Api响应帧不需要回放
+        if 'post_type' not in data:
+            continue
+        if speed:
+            if first is None:
+                first = timestamp
+            delay = start + (timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        # 等待分发器腾出位置，避免事件因队列已满被丢弃
+        while bot.dispatcher.stats()['pending'] >= bot.dispatcher.queue_size:
+            await asyncio.sleep(0.001)
+        if bot.handle_event(data):
+            count += 1
+    # 等待分发器处理完所有事件
+    while bot.dispatcher.processed < count:
+        await asyncio.sleep(0.01)
+    return count, loop.time() - start
+
+async def run(args):
+    bot = Bot(config_path=args.config)
+    calls = {}
+    # 换上Api桩，异步客户端与同步 OBApi 的调用都在本进程内完成；
+    # 桩不需要发送限速与消息合并，回放测量的只是插件与框架本身
+    bot.api = bot.create_client(StubTransport())
+    bot.api.scheduler = bot.api.coalescer = None
+    bot.sender = bot.coalescer = None
+    Api._session.mount("http://", StubAdapter(calls))
+    Api._session.mount("https://", StubAdapter(calls))
+
+    await bot.load_plugins_from_folder("plugins")
+    # 与 Bot.start 相同，进程池插件在工作进程中执行，回放的执行方式与正常运行一致
+    if bot.process_pool.plugins:
+        await bot.process_pool.start()
+    bot.dispatcher.start()
+    if bot.sender is not None:
+        bot.sender.start()
+    try:
+        count, elapsed = await replay(bot, args.capture, args.speed)
+    finally:
+        await bot.dispatcher.stop()
+        await bot.process_pool.stop()
+        await bot.thread_pool.stop()
+        if bot.sender is not None:
+            await bot.sender.stop()
+    for action, number in bot.api.transport.calls.items():
+        calls[action] = calls.get(action, 0) + number
+
+    print(f"回放事件 {count} 个，耗时 {elapsed:.2f}s，{count / elapsed if elapsed else 0:.1f} events/s")
+    print("Api调用: " + (", ".join(f"{action}={number}" for action, number in sorted(calls.items())) or "无"))
+    print(REGISTRY.summary())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放录制的原始帧")
+    parser.add_argument("capture", help="录制文件路径")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示以最快速度回放")
+    parser.add_argument("--config", default="config/config.json", help="配置文件路径")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,114 @@
+import logging
+
+logger = logging.getLogger("LXBotFrame.router")
+
+# 各类上报事件中用于细分类型的字段
+SUBTYPE_FIELDS = {
+    'message': 'message_type',
+    'message_sent': 'message_type',
+    'notice': 'notice_type',
+    'request': 'request_type',
+    'meta_event': 'meta_event_type',
+}
+
+# 插件可以声明的订阅属性，未声明（为None）表示不做限制
+#   post_types: 订阅的上报类型，如 {'message', 'notice'}
+#   message_types / notice_types / request_types: 对应上报类型下的细分类型
+#   groups: 群白名单，只接收这些群的群事件
+#   handle_self: 是否接收Bot自己发出的消息，默认接收以兼容旧插件
+SUBTYPE_ATTRS = {
+    'message': 'message_types',
+    'message_sent': 'message_types',
+    'notice': 'notice_types',
+    'request': 'request_types',
+}
+
+def is_self_event(event):
+    """判断事件是否为Bot自己发出的消息"""
+    post_type = event.get('post_type')
+    if post_type == 'message_sent':
+        return True
+    user_id = event.get('user_id')
+    return post_type == 'message' and user_id is not None and user_id == event.get('self_id')
+
+def _as_set(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, int)):
+        return frozenset([value])
+    return frozenset(value)
+
+class Subscription:
+    """单个插件处理函数的订阅信息，在插件加载时生成"""
+    __slots__ = ('name', 'handler', 'post_types', 'subtypes', 'groups', 'handle_self')
+
+    def __init__(self, name, plugin_instance, handler):
+        self.name = name
+        self.handler = handler
+        self.post_types = _as_set(getattr(plugin_instance, 'post_types', None))
+        self.subtypes = {post_type: _as_set(getattr(plugin_instance, attr, None))
+                         for post_type, attr in SUBTYPE_ATTRS.items()}
+        self.groups = _as_set(getattr(plugin_instance, 'groups', None))
+        self.handle_self = getattr(plugin_instance, 'handle_self', True)
+        if self.handle_self and self.post_types is not None and 'message' in self.post_types:
+            # 订阅消息且处理自身消息时，同时订阅 message_sent 上报
+            self.post_types = self.post_types | {'message_sent'}
+
+    def accepts(self, post_type, subtype):
+        if self.post_types is not None and post_type not in self.post_types:
+            return False
+        subtypes = self.subtypes.get(post_type)
+        return subtypes is None or subtype in subtypes
+
+class EventRouter:
+    """
+    事件路由表
+    插件加载完成后把各插件声明的订阅编译成以 (post_type, 细分类型) 为键的索引，
+    分发时只需一次字典查找即可得到感兴趣的处理函数
+    """
+
+    def __init__(self):
+        self.subscriptions = []
+        self._index = {}
+
+    def compile(self, loaded_plugins):
+        """
+        根据已加载的插件重新生成路由表
+        loaded_plugins: 插件类名 -> 插件实例
+        """
+        self.subscriptions = [Subscription(class_name, plugin_instance, plugin_instance.on_message)
+                              for class_name, plugin_instance in loaded_plugins.items()
+                              if hasattr(plugin_instance, 'on_message')]
+        self._index = {}
+        # 预先生成所有插件显式声明过的键，其余键在第一次出现时生成
+        for subscription in self.subscriptions:
+            for post_type in subscription.post_types or ():
+                for subtype in subscription.subtypes.get(post_type) or ():
+                    self._build((post_type, subtype))
+        logger.debug("路由表已生成，共 %s 个处理函数，%s 个索引键", len(self.subscriptions), len(self._index))
+
+    def _build(self, key):
+        post_type, subtype = key
+        routes = tuple(s for s in self.subscriptions if s.accepts(post_type, subtype))
+        self._index[key] = routes
+        return routes
+
+    def route(self, event):
+        """
+        查找应该接收该事件的处理函数
+        返回值：[(插件类名, 处理函数), ...]，按插件加载顺序排列
+        """
+        post_type = event.get('post_type')
+        subtype_field = SUBTYPE_FIELDS.get(post_type)
+        key = (post_type, event.get(subtype_field) if subtype_field else None)
+        routes = self._index.get(key)
+        if routes is None:
+            routes = self._build(key)
+        if not routes:
+            return []
+
+        group_id = event.get('group_id')
+        is_self = is_self_event(event)
+        return [(s.name, s.handler) for s in routes
+                if (s.groups is None or group_id is None or group_id in s.groups)
+                and (s.handle_self or not is_self)]
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("LXBotFrame.scheduler")
+
+# 发送优先级，数值越小越先发送
+PRIORITY_ADMIN = 0
+PRIORITY_REPLY = 1
+PRIORITY_NORMAL = 2
+PRIORITY_BROADCAST = 3
+
+class TokenBucket:
+    """令牌桶，rate 为每秒补充的令牌数，burst 为桶容量"""
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def delay(self, now):
+        """返回值：距离下一个令牌可用还需等待的秒数，0 表示现在即可发送"""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+class _Outgoing:
+    __slots__ = ('action', 'params', 'target', 'future', 'enqueued')
+
+    def __init__(self, action, params, target, future, enqueued):
+        self.action = action
+        self.params = params
+        self.target = target
+        self.future = future
+        self.enqueued = enqueued
+
+class SendScheduler:
+    """
+    发送调度器
+    所有发送动作先进入按优先级划分的队列，再受全局令牌桶与每个会话的令牌桶限速后发出，
+    避免突发消息触发风控；同一会话的消息按顺序逐条发送，不同会话之间轮流发送
+    """
+
+    def __init__(self, client, rate=5, burst=10, target_rate=1, target_burst=3, max_inflight=8):
+        """
+        client: 实际发送请求的 AsyncOneBotClient
+        rate / burst: 全局每秒发送条数与突发上限
+        target_rate / target_burst: 单个群或好友每秒发送条数与突发上限
+        max_inflight: 同时在途的发送请求上限
+        """
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.target_rate = target_rate
+        self.target_burst = target_burst
+        self.max_inflight = max_inflight
+        self._queues = {}  # 优先级 -> OrderedDict(会话 -> deque[_Outgoing])
+        self._buckets = {}  # 会话 -> TokenBucket
+        self._busy = set()  # 有发送请求在途的会话
+        self._global = None
+        self._wakeup = None
+        self._inflight = None
+        self._task = None
+        # 统计信息
+        self.depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.wait_last = 0.0
+        self.wait_max = 0.0
+        self.wait_avg = 0.0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._global = TokenBucket(self.rate, self.burst, loop.time())
+        self._wakeup = asyncio.Event()
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止调度，尚未发送的消息以异常结束"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for targets in self._queues.values():
+            for items in targets.values():
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(ConnectionError("发送调度器已停止"))
+        self._queues.clear()
+        self.depth = 0
+
+    def submit(self, action, params, target, priority=PRIORITY_NORMAL):
+        """
+        提交一个发送动作，立即返回
+        target: 会话标识，如 ('group', 群号)
+        返回值：Future，结果为Api返回的data字段，失败时为None
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        targets = self._queues.get(priority)
+        if targets is None:
+            targets = self._queues[priority] = OrderedDict()
+        items = targets.get(target)
+        if items is None:
+            items = targets[target] = deque()
+        items.append(_Outgoing(action, params, target, future, loop.time()))
+        self.depth += 1
+        self._wakeup.set()
+        return future
+
+    def send_private_msg(self, user_id, message, auto_escape=False, priority=PRIORITY_NORMAL):
+        """发送私聊消息，返回值：结果为 message_id 的 Future"""
+        future = self.submit("send_private_msg", {"user_id": user_id, "message": message, "auto_escape": auto_escape},
+                             ('user', user_id), priority)
+        return self._message_id(future)
+
+    def send_group_msg(self, group_id, message, auto_escape=False, priority=PRIORITY_NORMAL):
+        """发送群消息，返回值：结果为 message_id 的 Future"""
+        future = self.submit("send_group_msg", {"group_id": group_id, "message": message, "auto_escape": auto_escape},
+                             ('group', group_id), priority)
+        return self._message_id(future)
+
+    def _message_id(self, future):
+        result = asyncio.get_running_loop().create_future()
+
+        def done(f):
+            if result.done():
+                return
+            if f.cancelled():
+                result.cancel()
+            elif f.exception() is not None:
+                result.set_exception(f.exception())
+            else:
+                data = f.result()
+                result.set_result(data.get("message_id") if data else None)
+        future.add_done_callback(done)
+        return result
+
+    def stats(self):
+        """返回队列深度与排队等待时间"""
+        return {
+            "depth": self.depth,
+            "inflight": len(self._busy),
+            "sent": self.sent,
+            "failed": self.failed,
+            "wait_last": self.wait_last,
+            "wait_max": self.wait_max,
+            "wait_avg": self.wait_avg,
+        }
+
+    def _pick(self, now):
+        """
+        按优先级找出第一条所属会话空闲且有令牌的消息
+        返回值：(消息, 无可发送消息时建议等待的秒数)
+        """
+        min_delay = None
+        for priority in sorted(self._queues):
+            targets = self._queues[priority]
+            for target, items in targets.items():
+                if target in self._busy:
+                    continue
+                bucket = self._buckets.get(target)
+                if bucket is None:
+                    bucket = self._buckets[target] = TokenBucket(self.target_rate, self.target_burst, now)
+                delay = bucket.delay(now)
+                if delay:
+                    min_delay = delay if min_delay is None else min(min_delay, delay)
+                    continue
+                bucket.consume()
+                item = items.popleft()
+                if items:
+                    # 轮到下一个会话，保证同优先级的会话之间公平
+                    targets.move_to_end(target)
+                else:
+                    del targets[target]
+                if not targets:
+                    del self._queues[priority]
+                return item, 0
+        return None, min_delay
+
+    async def _sleep(self, timeout):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.depth:
+                await self._sleep(None)
+                continue
+            now = loop.time()
+            delay = self._global.delay(now)
+            if delay:
+                await self._sleep(delay)
+                continue
+            item, delay = self._pick(now)
+            if item is None:
+                # 所有会话都在限速或有请求在途，等待令牌补充或在途请求完成
+                await self._sleep(delay)
+                continue
+            self._global.consume()
+            self.depth -= 1
+            wait = now - item.enqueued
+            self.wait_last = wait
+            self.wait_max = max(self.wait_max, wait)
+            self.wait_avg = self.wait_avg * 0.9 + wait * 0.1
+            await self._inflight.acquire()
+            self._busy.add(item.target)
+            asyncio.create_task(self._send(item))
+            if len(self._buckets) > 4096:
+                self._prune(now)
+
+    async def _send(self, item):
+        try:
+            data = await self.client.call_api(item.action, item.params)
+            if data is None:
+                self.failed += 1
+            else:
+                self.sent += 1
+            if not item.future.done():
+                item.future.set_result(data)
+        except Exception as e:
+            self.failed += 1
+            logger.error("发送%s时出错: %s", item.action, e)
+            if not item.future.done():
+                item.future.set_exception(e)
+        finally:
+            self._busy.discard(item.target)
+            self._inflight.release()
+            self._wakeup.set()
+
+    def _prune(self, now):
+        # 丢弃已经补满且没有待发消息的会话令牌桶
+        pending = {target for targets in self._queues.values() for target in targets}
+        for target in [t for t, b in self._buckets.items()
+                       if t not in pending and t not in self._busy and b.delay(now) == 0 and b.tokens >= b.burst]:
+            del self._buckets[target]
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+from aiohttp import web, WSMsgType
+from transport import WebSocketTransport
+from event import decode_event, DecodeError
+
+logger = logging.getLogger("LXBotFrame.server")
+
+class ReportServer:
+    """
+    OneBot HTTP POST 上报接收服务器
+    监听 report_port，校验签名后把事件送入与 WebSocket 相同的分发流程；
+    插件在处理期间设置的快速操作会直接写在 HTTP 响应中返回给 OneBot 实现
+    """
+
+    def __init__(self, bot, host="127.0.0.1", port=18080, secret="", quick_operation_timeout=1.0):
+        """
+        bot: Bot 实例
+        host / port: 监听地址与端口
+        secret: OneBot 上报签名密钥，为空时不校验签名
+        quick_operation_timeout: 等待插件处理以收集快速操作的最长时间（秒）
+        """
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.secret = secret.encode() if secret else b""
+        self.quick_operation_timeout = quick_operation_timeout
+        self.app = web.Application()
+        self.app.router.add_post("/{tail:.*}", self.handle_report)
+        self._runner = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("上报接收服务器已启动: http://%s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def verify(self, request, body):
+        """
+        校验签名与Token
+        配置了签名密钥时签名必须正确；配置了Token时必须携带正确的 Authorization 头，
+        只有签名已经校验通过时才允许省略该请求头
+        """
+        signed = False
+        if self.secret:
+            signature = request.headers.get("X-Signature", "")
+            expected = "sha1=" + hmac.new(self.secret, body, hashlib.sha1).hexdigest()
+            if not hmac.compare_digest(signature, expected):
+                return False
+            signed = True
+        if not self.bot.token:
+            return True
+        authorization = request.headers.get("Authorization")
+        if authorization is None:
+            return signed
+        return hmac.compare_digest(authorization, f"Bearer {self.bot.token}")
+
+    async def handle_report(self, request):
+        body = await request.read()
+        if not self.verify(request, body):
+            logger.warning("拒绝来自 %s 的上报: 签名或Token校验失败", request.remote)
+            return web.Response(status=403)
+        if self.bot.recorder is not None:
+            self.bot.recorder.record(body)
+        try:
+            data = decode_event(body)
+        except DecodeError:
+            logger.error("无法解析上报的 JSON 数据")
+            return web.Response(status=400)
+
+        waiter = asyncio.get_running_loop().create_future()
+        operation = self.bot.begin_quick_operation(data)
+        try:
+            if self.bot.handle_event(data, waiter):
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), self.quick_operation_timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # 先结束快速操作，此后插件设置的回复会改走Api
+            self.bot.end_quick_operation(data)
+        if operation:
+            return web.json_response(operation)
+        return web.Response(status=204)
+
+class ReverseWebSocketServer:
+    """
+    OneBot 反向 WebSocket 服务器
+    由 OneBot 实现主动连接本框架，支持 Universal 连接以及分离的 /event 与 /api 连接；
+    每个连接按 X-Self-ID 区分账号，该账号的Api调用经由它自己的连接发回
+    """
+
+    def __init__(self, bot, host="127.0.0.1", port=18081, path="/onebot/v11/ws"):
+        """
+        bot: Bot 实例
+        host / port: 监听地址与端口
+        path: Universal 连接路径，分离连接使用 path/event 与 path/api
+        """
+        self.bot = bot
+        self.host = host
+        self.port = port
+        path = path.rstrip("/")
+        self.app = web.Application()
+        self.app.router.add_get(path or "/", lambda request: self.handle_connection(request, "universal"))
+        self.app.router.add_get(f"{path}/event", lambda request: self.handle_connection(request, "event"))
+        self.app.router.add_get(f"{path}/api", lambda request: self.handle_connection(request, "api"))
+        self._runner = None
+        self._connections = set()
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("反向WebSocket服务器已启动: ws://%s:%s", self.host, self.port)
+
+    async def stop(self):
+        for websocket in list(self._connections):
+            await websocket.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        for client in self.bot.clients.values():
+            if client.scheduler is not None:
+                await client.scheduler.stop()
+
+    def authorized(self, request):
+        if not self.bot.token:
+            return True
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith(("Bearer ", "Token ")):
+            token = authorization.split(" ", 1)[1]
+        else:
+            token = request.query.get("access_token", "")
+        return hmac.compare_digest(token, self.bot.token)
+
+    def client_for(self, self_id):
+        """取得账号对应的Api客户端，第一次连接时创建，断线重连后继续使用"""
+        client = self.bot.clients.get(self_id)
+        if client is None:
+            if not self.bot.ws_enabled and self.bot.api_transport == 'ws' and not self.bot.clients:
+                # 只有反向WebSocket连接时，第一个连接的账号使用 bot.api，连接前通过它发起的调用会等待连接后发出
+                client = self.bot.api
+                if client.coalescer is not None:
+                    client.coalescer.self_id = self_id
+            else:
+                client = self.bot.create_client(WebSocketTransport(timeout=self.bot.config.get('api_timeout', 30)), self_id)
+                if client.scheduler is not None:
+                    client.scheduler.start()
+            self.bot.clients[self_id] = client
+        return client
+
+    async def handle_connection(self, request, role):
+        if not self.authorized(request):
+            logger.warning("拒绝来自 %s 的反向WebSocket连接: Token校验失败", request.remote)
+            return web.Response(status=401)
+        self_id = request.headers.get("X-Self-ID", "")
+        if not self_id.isdigit():
+            return web.Response(status=400, text="missing X-Self-ID")
+        self_id = int(self_id)
+        role = request.headers.get("X-Client-Role", role).lower()
+
+        websocket = web.WebSocketResponse(heartbeat=None)
+        await websocket.prepare(request)
+        self._connections.add(websocket)
+        client = self.client_for(self_id)
+        transport = client.transport
+        if role in ("universal", "api"):
+            transport.attach(websocket, websocket.send_str)
+        logger.info("账号 %s 已通过反向WebSocket连接 (%s)", self_id, role)
+
+        try:
+            async for message in websocket:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                if self.bot.recorder is not None:
+                    self.bot.recorder.record(message.data)
+                try:
+                    data = decode_event(message.data)
+                except DecodeError:
+                    logger.error("无法解析反向WebSocket消息的 JSON 数据")
+                    continue
+                if 'post_type' not in data:
+                    transport.feed(data)
+                else:
+                    self.bot.handle_event(data)
+        finally:
+            self._connections.discard(websocket)
+            if role in ("universal", "api") and transport.websocket is websocket:
+                transport.detach()
+            logger.info("账号 %s 的反向WebSocket连接 (%s) 已断开", self_id, role)
+        return websocket
+
+class MetricsServer:
+    """
+    本地指标接口，GET /metrics 按 Prometheus 文本格式返回所有指标
+    """
+
+    def __init__(self, registry, host="127.0.0.1", port=18082):
+        """
+        registry: 指标注册表
+        host / port: 监听地址与端口，默认只监听本机
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("指标接口已启动: http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
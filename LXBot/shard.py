@@ -0,0 +1,460 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import signal
+import socket
+import struct
+from logging.handlers import QueueListener
+from client import send_target
+from dispatcher import conversation_key
+from event import decode, make_event
+from log import ForwardHandler, access_logger, setup_worker_logging
+from metrics import REGISTRY, metrics_delta
+from scheduler import PRIORITY_NORMAL
+
+logger = logging.getLogger("LXBotFrame.shard")
+
+# 优先使用更快的 JSON 编码库，与 event 中的解析保持一致
+try:
+    import orjson
+
+    def encode(obj):
+        """把对象编码为 JSON 字节串"""
+        return orjson.dumps(obj)
+except ImportError:
+    try:
+        import msgspec
+
+        encode = msgspec.json.Encoder().encode
+    except ImportError:
+        def encode(obj):
+            """把对象编码为 JSON 字节串"""
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# 帧格式：4 字节大端负载长度 + 1 字节帧类型 + JSON 负载
+HEADER = struct.Struct('>IB')
+EVENT = 1  # 主进程 -> 工作进程：事件
+API_REQUEST = 2  # 工作进程 -> 主进程：[请求编号, self_id, 动作, 参数, 发送优先级(非发送动作为null)]
+API_RESPONSE = 3  # 主进程 -> 工作进程：[请求编号, OneBot响应包]
+READY = 4  # 工作进程 -> 主进程：[分片编号, 已加载的插件列表]
+METRICS = 5  # 工作进程 -> 主进程：上次汇报以来的指标增量，格式见 metrics.metrics_delta
+
+# 工作进程不汇报的指标：事件数在主进程收到事件时已经计入，分片指标只在主进程中记录
+WORKER_METRICS_EXCLUDE = ("lxbot_events_total", "lxbot_shard_")
+
+SHARD_EVENTS = REGISTRY.counter("lxbot_shard_events_total", "分发给各分片的事件数", ("shard",))
+SHARD_DROPPED = REGISTRY.counter("lxbot_shard_events_dropped_total", "分片不可用或积压过多时丢弃的事件数", ("shard",))
+SHARD_API_CALLS = REGISTRY.counter("lxbot_shard_api_calls_total", "各分片转发的Api调用次数", ("shard",))
+SHARD_RESTARTS = REGISTRY.counter("lxbot_shard_restarts_total", "分片工作进程意外退出后重启的次数", ("shard",))
+
+def pack(kind, obj):
+    """编码一帧"""
+    payload = encode(obj)
+    return HEADER.pack(len(payload), kind) + payload
+
+def ring_hash(key):
+    """一致性哈希使用的 64 位哈希值"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+class HashRing:
+    """
+    一致性哈希环，每个节点在环上放置 replicas 个虚拟节点
+    使用 blake2b 而不是 hash()，同一会话在每次运行中都落到同一个节点；
+    crc32 对只差几位数字的群号分布很不均匀
+    """
+
+    def __init__(self, nodes, replicas=64):
+        self.ring = sorted((ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.keys = [point for point, _ in self.ring]
+
+    def get(self, key):
+        """返回值：key 所属的节点"""
+        index = bisect.bisect(self.keys, ring_hash(key)) % len(self.keys)
+        return self.ring[index][1]
+
+class ShardChannel:
+    """
+    主进程与工作进程之间的双向通道，建立在 Unix 套接字对上
+    两端都可以发出Api请求帧，响应按请求编号匹配回对应的 Future；
+    同一轮事件循环中发出的帧合并为一次写入，突发流量下不必每帧一次系统调用
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._pending = {}  # 请求编号 -> Future
+        self._ids = itertools.count(1)
+        self._frames = []  # 等待写入的帧
+        self._frames_size = 0
+
+    @property
+    def closed(self):
+        return self.writer.is_closing()
+
+    @property
+    def buffered(self):
+        """已写入但尚未被对端读走的字节数"""
+        return self.writer.transport.get_write_buffer_size() + self._frames_size
+
+    def send(self, kind, obj):
+        frame = pack(kind, obj)
+        if not self._frames:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._frames.append(frame)
+        self._frames_size += len(frame)
+
+    def _flush(self):
+        if not self.writer.is_closing():
+            self.writer.write(b''.join(self._frames))
+        self._frames.clear()
+        self._frames_size = 0
+
+    async def recv(self):
+        """
+        读取一帧，对端关闭时抛出 asyncio.IncompleteReadError
+        返回值：(帧类型, 负载)
+        """
+        length, kind = HEADER.unpack(await self.reader.readexactly(HEADER.size))
+        return kind, decode(await self.reader.readexactly(length))
+
+    async def request(self, self_id, action, params, priority=None):
+        """
+        发出一次Api请求并等待响应
+        priority: 发送类动作的优先级，为None时主进程直接发出请求
+        返回值：OneBot响应包
+        """
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            self.send(API_REQUEST, [request_id, self_id, action, params, priority])
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    def resolve(self, request_id, response):
+        future = self._pending.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def close(self):
+        """关闭通道，并让所有在途请求失败"""
+        self._flush()
+        self.writer.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("分片通道已关闭"))
+        self._pending.clear()
+
+class ShardTransport:
+    """工作进程中的Api传输层，请求经通道交给主进程发出"""
+
+    def __init__(self, channel, self_id=None):
+        self.channel = channel
+        self.self_id = self_id
+
+    async def request(self, action, params):
+        """
+        发送一次Api请求
+        返回值：OneBot响应包 {status, retcode, data, ...}，失败时为None
+        """
+        try:
+            return await self.channel.request(self.self_id, action, params)
+        except ConnectionError as e:
+            logger.error("请求过程中发生错误:%s", e)
+            return None
+
+    async def close(self):
+        pass
+
+class ShardSender:
+    """
+    工作进程中代替发送调度器的对象，把发送动作连同优先级交给主进程，
+    由主进程的消息合并器与发送调度器对所有分片统一排队限速
+    """
+    depth = 0  # 排队在主进程中进行，本进程没有积压
+
+    def __init__(self, client, channel, self_id=None):
+        self.client = client
+        self.channel = channel
+        self.self_id = self_id
+
+    def submit(self, action, params, target, priority=PRIORITY_NORMAL):
+        """返回值：Future，结果为Api返回的data字段，失败时为None"""
+        return asyncio.ensure_future(self._request(action, params, priority))
+
+    async def _request(self, action, params, priority):
+        try:
+            response = await self.channel.request(self.self_id, action, params, priority)
+        except ConnectionError as e:
+            logger.error("请求过程中发生错误:%s", e)
+            response = None
+        return self.client.unwrap(action, response)
+
+class Shard:
+    """主进程中记录的一个工作进程"""
+
+    def __init__(self, index, process, channel):
+        self.index = index
+        self.label = str(index)
+        self.process = process
+        self.channel = channel
+        self.task = None  # 接收工作进程Api请求的任务
+
+class ShardSupervisor:
+    """
+    分片模式的主进程部分
+    主进程只保持与 OneBot 的连接，事件按会话(group_id/user_id)一致性哈希到固定的工作进程，
+    同一会话的事件总是由同一个工作进程按到达顺序处理；工作进程的Api调用转发回主进程发出，
+    发送限速、消息合并与多账号选择都在主进程中统一完成
+    HTTP 上报事件的快速操作无法跨进程收集，插件的回复总是通过Api发出
+    """
+
+    def __init__(self, bot, workers=2, start_method="spawn", max_buffer=8 * 1024 * 1024):
+        """
+        bot: 主进程的 Bot 实例
+        workers: 工作进程数
+        start_method: 工作进程的启动方式
+        max_buffer: 单个工作进程积压的未读事件字节数上限，超出时新事件会被丢弃
+        """
+        self.bot = bot
+        self.workers = workers
+        self.start_method = start_method
+        self.max_buffer = max_buffer
+        self.ring = HashRing(range(workers))
+        self.shards = [None] * workers
+        self._context = multiprocessing.get_context(start_method)
+        self._round_robin = itertools.count()
+        self._calls = set()  # 正在执行的转发Api调用
+        self._log_queue = None
+        self._log_listener = None
+        self._stopping = False
+        self._respawns = set()  # 正在重试启动意外退出的工作进程的任务
+
+    async def start(self):
+        """启动所有工作进程，等待它们加载完插件"""
+        # 工作进程的日志经队列交回主进程写出
+        self._log_queue = self._context.Queue()
+        self._log_listener = QueueListener(self._log_queue, ForwardHandler())
+        self._log_listener.start()
+        await asyncio.gather(*(self.spawn(index) for index in range(self.workers)))
+
+    async def spawn(self, index):
+        """启动第 index 个工作进程"""
+        parent, child = socket.socketpair()
+        # 工作进程内还可能启动插件进程池，不能是守护进程
+        process = self._context.Process(target=run_worker, name=f"lxbot-shard-{index}",
+                                        args=(index, child, self.bot.config_path, self._log_queue,
+                                              logging.getLogger().level, access_logger.level))
+        process.start()
+        child.close()
+        reader, writer = await asyncio.open_connection(sock=parent)
+        channel = ShardChannel(reader, writer)
+        try:
+            kind, payload = await channel.recv()
+        except asyncio.IncompleteReadError:
+            channel.close()
+            await asyncio.to_thread(process.join, 5)
+            logger.error("分片工作进程 %s 启动失败，退出码 %s", index, process.exitcode)
+            return False
+        shard = Shard(index, process, channel)
+        shard.task = asyncio.create_task(self._serve(shard))
+        self.shards[index] = shard
+        logger.info("分片工作进程 %s 已启动，pid %s，已加载插件: %s", index, process.pid, ", ".join(payload[1]) or "无")
+        return True
+
+    async def stop(self):
+        """关闭所有通道，工作进程读到连接关闭后自行退出"""
+        self._stopping = True
+        for task in list(self._respawns):
+            task.cancel()
+        shards = [shard for shard in self.shards if shard is not None]
+        for shard in shards:
+            shard.channel.close()
+        for shard in shards:
+            await asyncio.to_thread(shard.process.join, 5)
+            if shard.process.is_alive():
+                logger.warning("分片工作进程 %s 未能按时退出，强制结束", shard.index)
+                shard.process.terminate()
+            shard.task.cancel()
+        self.shards = [None] * self.workers
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+    def put(self, event, waiter=None):
+        """
+        把事件交给所属会话的工作进程，不会阻塞接收循环
+        waiter: 可选的 Future，事件发出后立即被设置结果
+        返回值：是否成功发出
+        """
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        key = conversation_key(event)
+        if key is None:
+            # 不属于任何会话的事件没有顺序要求，轮流分给各工作进程
+            index = next(self._round_robin) % self.workers
+        else:
+            index = self.ring.get(f"{key[0]}:{key[1]}")
+        shard = self.shards[index]
+        if shard is None or shard.channel.closed or shard.channel.buffered > self.max_buffer:
+            SHARD_DROPPED.inc(str(index))
+            logger.warning("分片 %s 不可用或积压过多，丢弃事件: %s", index, event.get('post_type'))
+            return False
+        shard.channel.send(EVENT, event)
+        SHARD_EVENTS.inc(shard.label)
+        return True
+
+    def stats(self):
+        """返回各工作进程的积压字节数"""
+        return {shard.index: shard.channel.buffered for shard in self.shards if shard is not None}
+
+    async def _serve(self, shard):
+        """接收工作进程发来的Api请求，工作进程意外退出时重启"""
+        try:
+            while True:
+                kind, payload = await shard.channel.recv()
+                if kind == API_REQUEST:
+                    # 不同会话的请求并发执行；同一会话的请求由插件依次等待，顺序不变
+                    task = asyncio.create_task(self._call(shard, *payload))
+                    self._calls.add(task)
+                    task.add_done_callback(self._calls.discard)
+                elif kind == METRICS:
+                    REGISTRY.merge(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        if self._stopping:
+            return
+        shard.channel.close()
+        self.shards[shard.index] = None
+        await asyncio.to_thread(shard.process.join, 5)
+        logger.error("分片工作进程 %s 意外退出，退出码 %s，正在重启", shard.index, shard.process.exitcode)
+        SHARD_RESTARTS.inc(shard.label)
+        await self._respawn(shard.index)
+
+    async def _respawn(self, index, base_delay=1.0, max_delay=60.0):
+        """重启工作进程，失败时按指数退避重试，直到成功或主进程停止"""
+        task = asyncio.current_task()
+        self._respawns.add(task)
+        try:
+            delay = base_delay
+            while not self._stopping:
+                try:
+                    if await self.spawn(index):
+                        return
+                except Exception as e:
+                    logger.error("启动分片工作进程 %s 时出错: %s", index, e)
+                logger.error("分片工作进程 %s 重启失败，%.0fs 后重试，期间该分片的事件会被丢弃", index, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+        finally:
+            self._respawns.discard(task)
+
+    async def _call(self, shard, request_id, self_id, action, params, priority=None):
+        SHARD_API_CALLS.inc(shard.label)
+        client = self.bot.api_for({'self_id': self_id})
+        try:
+            if priority is not None:
+                # 工作进程的发送动作经过主进程的消息合并器与发送调度器
+                data = await client.send(action, params, priority)
+                if data is None:
+                    response = {"status": "failed", "retcode": -1, "data": None, "msg": f"{action} 发送失败"}
+                else:
+                    response = {"status": "ok", "retcode": 0, "data": data}
+            else:
+                # 经过 request 发出，主进程照常记录Api耗时、失败次数与访问日志
+                response = await client.request(action, params)
+        except Exception as e:
+            logger.error("执行分片 %s 转发的Api调用 %s 时出错: %s", shard.index, action, e)
+            response = None
+        if not shard.channel.closed:
+            shard.channel.send(API_RESPONSE, [request_id, response])
+
+class ShardWorker:
+    """
+    分片模式的工作进程部分
+    加载全部插件，处理主进程分来的事件，Api调用经通道交给主进程发出
+    """
+
+    def __init__(self, index, sock, config_path):
+        self.index = index
+        self.sock = sock
+        self.config_path = config_path
+        self.channel = None
+        self.bot = None
+
+    def client(self, self_id=None):
+        """创建经由主进程发出请求的Api客户端，查询缓存留在本进程，发送限速与合并由主进程负责"""
+        client = self.bot.create_client(ShardTransport(self.channel, self_id), self_id)
+        # 转发的调用由主进程记录，这里不再重复记录
+        client.record = False
+        client.coalescer = None
+        client.scheduler = ShardSender(client, self.channel, self_id)
+        return client
+
+    async def run(self):
+        # bot 模块导入了本模块，在这里导入避免循环导入
+        from bot import Bot
+        reader, writer = await asyncio.open_connection(sock=self.sock)
+        self.channel = ShardChannel(reader, writer)
+        bot = self.bot = Bot(config_path=self.config_path)
+        bot.shard_index = self.index
+        bot.shards = bot.metrics_server = bot.recorder = None
+        bot.api = self.client()
+        bot.sender = bot.coalescer = None
+
+        await bot.load_plugins_from_folder("plugins")
+        if bot.process_pool.plugins:
+            await bot.process_pool.start()
+        bot.dispatcher.start()
+        if bot.watchdog is not None:
+            bot.watchdog.start()
+        reporter = asyncio.create_task(self.report_metrics(bot.config.get('shard_metrics_interval', 5)))
+        self.channel.send(READY, [self.index, list(bot.loaded_plugins)])
+        try:
+            while True:
+                kind, payload = await self.channel.recv()
+                if kind == EVENT:
+                    # 多账号时每个账号的Api调用都要带上 self_id，主进程据此选择账号
+                    self_id = payload.get('self_id')
+                    if self_id is not None and self_id not in bot.clients:
+                        bot.clients[self_id] = self.client(self_id)
+                    # 与接收循环中的 decode_event 一致，插件拿到的是 MessageEvent 等事件类
+                    bot.handle_event(make_event(payload))
+                elif kind == API_RESPONSE:
+                    self.channel.resolve(*payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # 主进程关闭了通道
+            pass
+        finally:
+            reporter.cancel()
+            self.channel.close()
+            if bot.watchdog is not None:
+                await bot.watchdog.stop()
+            await bot.dispatcher.stop()
+            await bot.process_pool.stop()
+            await bot.thread_pool.stop()
+
+    async def report_metrics(self, interval):
+        """
+        定时把本进程指标的增量发给主进程，主进程的 /metrics 与统计命令因此包含插件耗时、错误数等数据
+        插件的Api调用由主进程转发时记录，队列深度等当前值(gauge)不汇报；退出前最后不到一个周期的增量会丢失
+        """
+        last = {}
+        while True:
+            await asyncio.sleep(interval)
+            snapshot = REGISTRY.snapshot(WORKER_METRICS_EXCLUDE)
+            delta = metrics_delta(snapshot, last)
+            last = snapshot
+            if delta and not self.channel.closed:
+                self.channel.send(METRICS, delta)
+
+def run_worker(index, sock, config_path, log_queue, log_level, access_level):
+    """工作进程入口"""
+    # Ctrl+C 只由主进程处理，工作进程在通道关闭后退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_worker_logging(log_queue, log_level, access_level)
+    asyncio.run(ShardWorker(index, sock, config_path).run())
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import random
+import websockets
+from event import decode_event, DecodeError
+
+logger = logging.getLogger("LXBotFrame")
+
+# websockets 14 起默认的 asyncio 客户端用 additional_headers 传请求头，旧版客户端为 extra_headers
+_HEADERS_ARG = "additional_headers" if int(websockets.__version__.split('.')[0]) >= 14 else "extra_headers"
+
+def connect(url, token=None):
+    """按安装的 websockets 版本建立连接，token 不为空时带上 Authorization 请求头"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    return websockets.connect(url, **{_HEADERS_ARG: headers})
+
+if hasattr(asyncio, "timeout"):
+    async def _recv(websocket, timeout):
+        # Python 3.11 的 wait_for 在消息与取消同时到达时会返回消息而吞掉取消，
+        # 高负载下关闭时接收循环会一直运行下去，有 asyncio.timeout 时改用它
+        async with asyncio.timeout(timeout):
+            return await websocket.recv()
+else:
+    def _recv(websocket, timeout):
+        return asyncio.wait_for(websocket.recv(), timeout)
+
+class ConnectionSupervisor:
+    """
+    WebSocket 连接守护
+    用循环代替递归重连：第一次重试很快，之后按指数退避并加入随机抖动；
+    根据心跳元事件的 interval 字段检测连接假死，并记录重连次数与断线时长
+    """
+
+    def __init__(self, bot, first_retry=0.5, base_delay=1.0, max_delay=60.0, stall_factor=2.5):
+        """
+        bot: Bot 实例
+        first_retry: 断线后第一次重连前的等待时间（秒）
+        base_delay / max_delay: 指数退避的初始与最大等待时间（秒）
+        stall_factor: 超过心跳间隔的多少倍没有收到任何消息即视为连接假死
+        """
+        self.bot = bot
+        self.first_retry = first_retry
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stall_factor = stall_factor
+        self.heartbeat_interval = None  # 由心跳元事件得到的心跳间隔（秒）
+        # 统计信息
+        self.connects = 0
+        self.reconnects = 0
+        self.stalls = 0
+        self.last_downtime = 0.0
+        self.total_downtime = 0.0
+        self.heartbeat_rtt = None
+        self._rtt_task = None
+
+    def backoff(self, attempt):
+        """返回第 attempt 次重连前的等待时间"""
+        if attempt == 0:
+            return self.first_retry
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def stats(self):
+        return {
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "stalls": self.stalls,
+            "last_downtime": self.last_downtime,
+            "total_downtime": self.total_downtime,
+            "heartbeat_interval": self.heartbeat_interval,
+            "heartbeat_rtt": self.heartbeat_rtt,
+        }
+
+    async def run(self):
+        bot = self.bot
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        disconnected_at = None
+        logger.info("消息接收服务器启动中...")
+        while True:
+            logger.info("尝试连接到 WebSocket 地址: %s", bot.ws_url)
+            try:
+                async with connect(bot.ws_url, bot.token) as websocket:
+                    self.connects += 1
+                    if disconnected_at is not None:
+                        self.reconnects += 1
+                        self.last_downtime = loop.time() - disconnected_at
+                        self.total_downtime += self.last_downtime
+                        logger.info("WebSocket 已重连，断线 %.1fs，累计重连 %s 次", self.last_downtime, self.reconnects)
+                    logger.info("成功连接到 OneBot WebSocket 地址: %s", bot.ws_url)
+                    attempt = 0
+                    bot.ws_transport.attach(websocket)
+                    logger.info("开始接收消息")
+                    await self.receive(websocket)
+            except asyncio.CancelledError:
+                raise
+            except TypeError:
+                # 参数错误是调用方式的问题而不是网络故障，重试没有意义
+                logger.critical("WebSocket 连接参数错误，停止重连", exc_info=True)
+                raise
+            except Exception as e:
+                logger.error("WebSocket 连接失败: %s", e)
+            finally:
+                bot.ws_transport.detach()
+                if self._rtt_task is not None:
+                    self._rtt_task.cancel()
+                    self._rtt_task = None
+
+            if disconnected_at is None or attempt == 0:
+                disconnected_at = loop.time()
+            delay = self.backoff(attempt)
+            attempt += 1
+            logger.info("%.1f秒后重连 (第%s次)", delay, attempt)
+            await asyncio.sleep(delay)
+
+    async def receive(self, websocket):
+        """持续接收消息，超过心跳间隔若干倍没有收到任何消息时断开连接"""
+        bot = self.bot
+        while True:
+            timeout = self.heartbeat_interval * self.stall_factor if self.heartbeat_interval else None
+            try:
+                message = await _recv(websocket, timeout)
+            except asyncio.TimeoutError:
+                self.stalls += 1
+                logger.warning("超过 %.1fs 未收到心跳，连接可能已假死，准备重连", timeout)
+                await websocket.close()
+                return
+            logger.debug("收到 WebSocket 消息原文: %s", message)
+            if bot.recorder is not None:
+                bot.recorder.record(message)
+
+            try:
+                # 解析收到的消息
+                data = decode_event(message)
+                # 不含 post_type 的是Api响应帧，交给传输层匹配对应的请求
+                if 'post_type' not in data:
+                    bot.ws_transport.feed(data)
+                    continue
+                if data.get('meta_event_type') == 'heartbeat':
+                    self.on_heartbeat(websocket, data)
+                bot.handle_event(data)
+            except DecodeError:
+                logger.error("无法解析 WebSocket 消息的 JSON 数据")
+            except Exception as e:
+                logger.error("处理 WebSocket 消息时出错: %s", e)
+
+    def on_heartbeat(self, websocket, data):
+        interval = data.get('interval')
+        if interval:
+            self.heartbeat_interval = interval / 1000
+        # 借心跳的时机测一次 WebSocket ping 往返时间
+        if self._rtt_task is None or self._rtt_task.done():
+            self._rtt_task = asyncio.create_task(self.measure_rtt(websocket))
+
+    async def measure_rtt(self, websocket):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            pong = await websocket.ping()
+            await asyncio.wait_for(pong, self.heartbeat_interval or 10)
+        except Exception:
+            return
+        self.heartbeat_rtt = loop.time() - started
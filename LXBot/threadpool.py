@@ -0,0 +1,118 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from command import TRIGGER_ATTR
+from metrics import REGISTRY
+from procpool import deliver_result
+
+logger = logging.getLogger("LXBotFrame.threadpool")
+
+# 插件方法上的线程池标记属性名
+BLOCKING_ATTR = '_lx_blocking'
+
+THREAD_TASKS = REGISTRY.counter("lxbot_thread_tasks_total", "在线程池中执行的插件处理次数", ("plugin",))
+THREAD_WAIT = REGISTRY.histogram("lxbot_thread_wait_seconds", "插件处理等待空闲线程的时间", ("plugin",))
+
+def blocking(func):
+    """
+    标记插件方法在线程池中执行，用于内部调用同步 OBApi、读写文件等会阻塞的 async 处理函数
+    被标记的协程在工作线程自己的事件循环中运行，不能 await bot 的异步Api方法，
+    需要回复时使用同步 OBApi，或者像普通函数处理函数一样返回要发送的内容
+    普通函数（非 async）的处理函数不需要标记，加载时会自动放到线程池中执行
+    插件类也可以声明 blocking = True，使 on_message 在线程池中执行
+    """
+    setattr(func, BLOCKING_ATTR, True)
+    return func
+
+class PluginThreadPool:
+    """
+    插件线程池
+    普通函数的处理函数与标记为阻塞的处理函数在加载时替换为协程包装，包装把调用交给有上限的线程池执行，
+    返回值与进程池相同：消息会回复到事件来源的会话，{"action": ..., "params": ...} 会作为Api调用执行
+    超时只能取消等待，已经开始执行的处理函数会在线程中运行到结束
+    """
+
+    def __init__(self, bot, size=8):
+        """
+        bot: Bot 实例
+        size: 线程数上限
+        """
+        self.bot = bot
+        self.size = size
+        self.executor = None
+        self.busy = 0  # 正在执行的处理数
+        self._lock = threading.Lock()
+        REGISTRY.gauge("lxbot_thread_pool_busy", "线程池中正在执行的插件处理数", func=lambda: self.busy)
+        REGISTRY.gauge("lxbot_thread_pool_queued", "等待空闲线程的插件处理数", func=self.queued)
+
+    def queued(self):
+        if self.executor is None:
+            return 0
+        return self.executor._work_queue.qsize()
+
+    def register(self, class_name, plugin_instance):
+        """
+        把插件中的同步处理函数与标记为阻塞的处理函数替换为协程包装
+        已经被进程池替换的方法是协程函数，不会再被替换
+        返回值：是否有方法被替换
+        """
+        plugin_class = type(plugin_instance)
+        methods = []
+        for name in dir(plugin_class):
+            attr = getattr(plugin_class, name, None)
+            if name != 'on_message' and not getattr(attr, TRIGGER_ATTR, None):
+                continue
+            func = getattr(plugin_instance, name)
+            if not callable(func):
+                continue
+            if not inspect.iscoroutinefunction(func):
+                methods.append((name, func, False))
+            elif getattr(func, BLOCKING_ATTR, False) or (name == 'on_message' and getattr(plugin_instance, 'blocking', False)):
+                # 实例上的属性是进程池的包装时，插件类上的标记不再生效
+                if name not in vars(plugin_instance):
+                    methods.append((name, func, True))
+        if not methods:
+            return False
+        for name, func, is_coroutine in methods:
+            setattr(plugin_instance, name, self._wrap(class_name, func, is_coroutine))
+        logger.info("插件 %s 的 %s 将在线程池中执行", class_name, ", ".join(name for name, _, _ in methods))
+        return True
+
+    def _wrap(self, class_name, func, is_coroutine):
+        if is_coroutine:
+            # 在工作线程中新建事件循环运行协程
+            def target(*args):
+                return asyncio.run(func(*args))
+        else:
+            target = func
+
+        async def wrapper(event, *args):
+            THREAD_TASKS.inc(class_name)
+            result = await self.submit(class_name, target, event, *args)
+            await deliver_result(self.bot, event, result)
+        return wrapper
+
+    async def submit(self, class_name, func, *args):
+        """在线程池中执行，第一次使用时创建线程池"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="plugin")
+        submitted = time.perf_counter()
+
+        def run():
+            THREAD_WAIT.observe(time.perf_counter() - submitted, class_name)
+            with self._lock:
+                self.busy += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.busy -= 1
+        return await asyncio.get_running_loop().run_in_executor(self.executor, run)
+
+    async def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
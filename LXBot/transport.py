@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import json
+import logging
+import aiohttp
+
+logger = logging.getLogger("api")
+
+class HttpTransport:
+    """
+    HTTP Api传输层
+    所有请求共用一个 aiohttp 连接池，连接保持 keep-alive
+    """
+
+    def __init__(self, base_url, token=None, limit=100, limit_per_host=32, timeout=30):
+        """
+        base_url: Bot API地址
+        token: Bot Token
+        limit: 连接池最大连接数
+        limit_per_host: 每个主机的最大连接数
+        timeout: 单次请求超时时间（秒）
+        """
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self._session = None
+
+    @property
+    def session(self):
+        # 会话必须在事件循环中创建，因此延迟到第一次请求时再初始化
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+        return self._session
+
+    async def request(self, action, params):
+        """
+        发送一次Api请求
+        返回值：OneBot响应包 {status, retcode, data, ...}，失败时为None
+        """
+        url = f"{self.base_url}/{action}"
+        try:
+            async with self.session.post(url, json=params) as response:
+                if response.status != 200:
+                    logger.error("请求失败，状态码:%s", response.status)
+                    return None
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("请求过程中发生错误:%s", e)
+            return None
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+class WebSocketTransport:
+    """
+    WebSocket Api传输层
+    在已建立的 OneBot WebSocket 连接上发送 {action, params, echo} 帧，
+    多个请求可以同时在途，响应按 echo 字段匹配回对应的 Future
+    """
+
+    def __init__(self, timeout=30, offline_timeout=60, max_buffered=1000):
+        """
+        timeout: 等待单次响应的超时时间（秒）
+        offline_timeout: 断线期间发起的请求最多等待重连的时间（秒）
+        max_buffered: 断线期间最多缓存的请求数量
+        """
+        self.timeout = timeout
+        self.offline_timeout = offline_timeout
+        self.max_buffered = max_buffered
+        self.buffered = 0  # 正在等待重连的请求数量
+        self.websocket = None
+        self._send = None
+        self._pending = {}  # echo -> Future
+        self._echo_counter = itertools.count(1)
+        self._connected = None
+
+    @property
+    def connected(self):
+        # asyncio.Event 需要在事件循环中创建
+        if self._connected is None:
+            self._connected = asyncio.Event()
+        return self._connected
+
+    def attach(self, websocket, send=None):
+        """
+        绑定新建立的 WebSocket 连接
+        send: 发送文本帧的协程函数，默认为 websocket.send
+        """
+        self.websocket = websocket
+        self._send = send or websocket.send
+        self.connected.set()
+
+    def detach(self):
+        """连接断开时解除绑定，并让所有在途请求失败"""
+        self.websocket = None
+        self._send = None
+        self.connected.clear()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("WebSocket 连接已断开"))
+        self._pending.clear()
+
+    def feed(self, data):
+        """
+        接收循环收到的非事件帧交给这里处理
+        返回值：该帧是否为Api响应
+        """
+        echo = data.get("echo")
+        if echo is None:
+            return False
+        future = self._pending.pop(echo, None)
+        if future is not None and not future.done():
+            future.set_result(data)
+        return True
+
+    async def request(self, action, params):
+        """
+        发送一次Api请求
+        返回值：OneBot响应包 {status, retcode, data, echo}，失败时为None
+        """
+        if not self.connected.is_set():
+            # 断线期间的请求先缓存起来，重连后按发起顺序发出
+            if self.buffered >= self.max_buffered:
+                logger.error("WebSocket 未连接且缓存的请求已满，无法执行操作%s", action)
+                return None
+            self.buffered += 1
+            try:
+                await asyncio.wait_for(self.connected.wait(), self.offline_timeout)
+            except asyncio.TimeoutError:
+                logger.error("WebSocket 未连接，无法执行操作%s", action)
+                return None
+            finally:
+                self.buffered -= 1
+
+        echo = str(next(self._echo_counter))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[echo] = future
+        try:
+            await self._send(json.dumps({"action": action, "params": params, "echo": echo}))
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            logger.error("等待操作%s的响应超时", action)
+        except Exception as e:
+            logger.error("请求过程中发生错误:%s", e)
+        finally:
+            self._pending.pop(echo, None)
+            if future.done() and not future.cancelled():
+                # 发送失败时 detach 设置的异常没有被等待过，这里取走它
+                future.exception()
+        return None
+
+    async def close(self):
+        self.detach()
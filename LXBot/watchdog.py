@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from metrics import REGISTRY
+from profiler import plugin_files, walk_stack
+
+logger = logging.getLogger("LXBotFrame.watchdog")
+
+LOOP_LAG = REGISTRY.histogram("lxbot_loop_lag_seconds", "事件循环调度延迟",
+                              buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+LOOP_STALLS = REGISTRY.counter("lxbot_loop_stalls_total", "事件循环阻塞次数", ("plugin", "action"))
+LOOP_STALL_SECONDS = REGISTRY.counter("lxbot_loop_stall_seconds_total", "事件循环阻塞的总时长", ("plugin", "action"))
+
+class LoopWatchdog:
+    """
+    事件循环阻塞监视器
+    事件循环中的协程定时打点并记录调度延迟；辅助线程发现打点停止超过阈值时，
+    抓取事件循环线程的调用栈，把这次阻塞归到栈上的插件与Api函数，写入日志与指标
+    """
+
+    def __init__(self, bot, interval=0.1, threshold=0.5):
+        """
+        bot: Bot 实例
+        interval: 打点间隔（秒）
+        threshold: 判定为阻塞的延迟（秒）
+        """
+        self.bot = bot
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = 0
+        self._beat = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, args=(threading.get_ident(),),
+                                        name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _tick(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(loop.time() - expected, 0.0))
+            self._beat = time.monotonic()
+
+    def _watch(self, thread_id):
+        """辅助线程：检查打点是否停止"""
+        stall = None  # 当前这次阻塞: [开始打点时间, 插件, Api函数]
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            lag = time.monotonic() - beat
+            if stall is not None and stall[0] != beat:
+                # 事件循环已恢复，记录这次阻塞的总时长
+                duration = beat - stall[0] - self.interval
+                LOOP_STALL_SECONDS.inc(stall[1], stall[2], value=duration)
+                logger.warning("事件循环已恢复，阻塞约 %.3fs (插件: %s, Api: %s)", duration, stall[1], stall[2])
+                stall = None
+            if stall is None and lag - self.interval > self.threshold:
+                frame = sys._current_frames().get(thread_id)
+                if frame is None:
+                    continue
+                _, plugin, action, event_type = walk_stack(frame, plugin_files(self.bot.loaded_plugins))
+                stack = "".join(traceback.format_stack(frame, limit=15)).rstrip()
+                del frame
+                plugin = plugin or "unknown"
+                action = action or "none"
+                stall = [beat, plugin, action]
+                self.stalls += 1
+                LOOP_STALLS.inc(plugin, action)
+                logger.warning("事件循环已阻塞 %.3fs，插件: %s，Api: %s，事件: %s\n调用栈:\n%s",
+                               lag - self.interval, plugin, action, event_type, stack)